@@ -0,0 +1,202 @@
+import hashlib
+import logging
+import threading
+import time
+import uuid
+from collections import Counter
+from functools import wraps
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+
+from rest_framework.renderers import JSONRenderer
+from rest_framework.response import Response
+
+from .metrics import observe_cache
+from .snapshot import bypasses_snapshot
+
+# Single-flight coalescing for the read views.
+#
+# Identical GET requests arriving while one is being computed wait for that
+# computation and answer with a copy of its response instead of running the
+# same queries again. Flights are keyed by path, sorted query string and the
+# catalog generation, which every committed catalog change bumps, so a request
+# made after a write never joins a flight started before it. The bump waits for
+# the commit: bumped earlier, a flight started before the commit could read the
+# old rows under the new generation. With REQUEST_COALESCING_CACHE_LOCK, a lock
+# in the cache backend extends this to other processes, which pick the finished
+# response up from the cache. Their keys carry a generation counted in the
+# cache, which every process bumps, since each process's own count differs.
+# Clients whose reads skip a stale catalog snapshot (see snapshot.py) get
+# flights of their own, apart from those answered from the snapshot.
+
+logger = logging.getLogger('CoalescingLog: ')
+
+renderer = JSONRenderer()
+
+POLL_INTERVAL = 0.02
+
+stats = Counter()
+_stats_lock = threading.Lock()
+
+_generation = 0
+
+GENERATION_KEY = 'coalesce:generation'
+
+
+def count(name):
+    with _stats_lock:
+        stats[name] += 1
+
+
+def bump_generation():
+    # Called once every catalog change is committed
+    global _generation
+    _generation += 1
+
+    if settings.REQUEST_COALESCING_CACHE_LOCK:
+        try:
+            cache.incr(GENERATION_KEY)
+        except ValueError:
+            # First change since the cache was cleared
+            if not cache.add(GENERATION_KEY, 1, timeout=None):
+                cache.incr(GENERATION_KEY)
+
+
+class _Flight:
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.payload = None
+
+
+class SingleFlight:
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._flights = {}
+
+    def do(self, key, compute, timeout):
+        # Returns (payload, shared); compute() returns (result, payload) and only runs in the leader
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+
+        if not leader:
+            if flight.done.wait(timeout) and flight.payload is not None:
+                count('coalesced')
+                return flight.payload, True
+            # The leader failed or is too slow: compute without coalescing
+            logger.debug(f'Flight {key} gave no response, computing it.')
+            count('fallback')
+            return compute(), False
+
+        try:
+            result = compute()
+            flight.payload = result[1]
+            return result, False
+        finally:
+            with self._lock:
+                del self._flights[key]
+            flight.done.set()
+
+
+flights = SingleFlight()
+
+
+def _payload(response):
+    # Immutable copy of a response for other requests, or None when it must not be shared.
+    # Streamed responses are produced lazily, so each waiter streams its own
+    if response.status_code >= 500 or response.streaming:
+        return None
+    if isinstance(response, Response):
+        return response.status_code, renderer.render(response.data), 'application/json'
+    return response.status_code, response.content, response['Content-Type']
+
+
+def _copy(payload):
+    status, content, content_type = payload
+    response = HttpResponse(content, status=status, content_type=content_type)
+    response['X-Coalesced'] = '1'
+    return response
+
+
+def _request_key(request):
+    query = urlencode(sorted(request.GET.lists()), doseq=True)
+    key = f'{request.method} {request.path}?{query}'
+    if bypasses_snapshot():
+        # A client reading its own writes must not join a flight answered from the stale snapshot
+        key += ' database'
+    return key
+
+
+def _across_processes(key, compute):
+    # Cache-backed single flight: one process computes, the others poll for its payload.
+    # Each flight stores its payload under its own token, so waiters never pick up an older result
+    digest = hashlib.sha256(f'{cache.get(GENERATION_KEY, 0)} {key}'.encode()).hexdigest()
+    lock_key = f'coalesce:lock:{digest}'
+    wait = settings.REQUEST_COALESCING_WAIT
+    token = uuid.uuid4().hex
+
+    if not cache.add(lock_key, token, timeout=wait):
+        deadline = time.monotonic() + wait
+        leader = cache.get(lock_key)
+        while leader is not None:
+            # Checked before reading the result, which the leader stores before releasing the lock
+            finished = cache.get(lock_key) != leader
+            payload = cache.get(f'coalesce:result:{leader}')
+            if payload is not None:
+                count('coalesced_across_processes')
+                return None, payload
+            if finished or time.monotonic() >= deadline:
+                break
+            time.sleep(POLL_INTERVAL)
+
+        logger.debug(f'No shared response for {key}, computing it.')
+        count('fallback')
+        response = compute()
+        return response, _payload(response)
+
+    try:
+        response = compute()
+        payload = _payload(response)
+        if payload is not None:
+            cache.set(f'coalesce:result:{token}', payload, timeout=settings.REQUEST_COALESCING_RESULT_TTL)
+        return response, payload
+    finally:
+        cache.delete(lock_key)
+
+
+def coalesced(method):
+    # Decorator for APIView.get methods
+
+    @wraps(method)
+    def wrapper(view, request, *args, **kwargs):
+        if not settings.REQUEST_COALESCING:
+            return method(view, request, *args, **kwargs)
+
+        count('requests')
+        key = _request_key(request)
+
+        def compute():
+            count('computed')
+            if settings.REQUEST_COALESCING_CACHE_LOCK:
+                return _across_processes(key, lambda: method(view, request, *args, **kwargs))
+
+            response = method(view, request, *args, **kwargs)
+            return response, _payload(response)
+
+        result, shared = flights.do((_generation, key), compute, settings.REQUEST_COALESCING_WAIT)
+        if shared:
+            observe_cache('coalescing', hits=1)
+            return _copy(result)
+
+        response, payload = result
+        observe_cache('coalescing', hits=response is None, misses=response is not None)
+        return response if response is not None else _copy(payload)
+
+    return wrapper
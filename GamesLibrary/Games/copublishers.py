@@ -0,0 +1,69 @@
+from collections import Counter
+from itertools import permutations
+
+from django.db import connections, transaction
+
+from .models import CoPublisher, Game
+from .rollups import apply_count_deltas
+from .sharding import game_databases, ids_by_shard
+
+# Publisher co-publishing graph.
+#
+# CoPublisher holds, for every pair of publishers sharing at least one game,
+# the number of games they share, in both directions so a publisher's
+# neighbours are one indexed range scan. Signal handlers capture the publisher
+# sets of the affected games before a link change and apply the difference in
+# pairs afterwards; rebuild_copublishers() recomputes everything with one
+# self-join of the Game <-> Publisher through table.
+
+LINKS_TABLE = Game.publisher.through._meta.db_table
+
+
+def publisher_sets(game_ids):
+    # game id -> set of linked publisher ids
+    sets = {game_id: set() for game_id in game_ids}
+    for alias, shard_ids in ids_by_shard(sets).items():
+        links = Game.publisher.through.objects.using(alias).filter(game_id__in=shard_ids)
+        for game_id, publisher_id in links.values_list('game_id', 'publisher_id'):
+            sets[game_id].add(publisher_id)
+    return sets
+
+
+def pair_counts(sets):
+    counts = Counter()
+    for publishers in sets:
+        counts.update(permutations(sorted(publishers), 2))
+    return counts
+
+
+def apply_changes(before, after):
+    # before/after: game id -> publisher ids, as returned by publisher_sets
+    deltas = pair_counts(after.values())
+    deltas.subtract(pair_counts(before.values()))
+    apply_count_deltas(CoPublisher, ('publisher_id', 'other_id'), deltas, count_field='shared_games')
+
+
+def rebuild_copublishers():
+    counts = Counter()
+
+    for alias in game_databases():
+        connection = connections[alias]
+        table = connection.ops.quote_name(LINKS_TABLE)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT a.publisher_id, b.publisher_id, COUNT(*) FROM {table} a '
+                f'JOIN {table} b ON a.game_id = b.game_id AND a.publisher_id <> b.publisher_id '
+                f'GROUP BY a.publisher_id, b.publisher_id'
+            )
+            counts.update({(publisher_id, other_id): shared for publisher_id, other_id, shared in cursor.fetchall()})
+
+    rows = [
+        CoPublisher(publisher_id=publisher_id, other_id=other_id, shared_games=shared)
+        for (publisher_id, other_id), shared in counts.items()
+    ]
+
+    with transaction.atomic():
+        CoPublisher.objects.all().delete()
+        CoPublisher.objects.bulk_create(rows, batch_size=1000)
+
+    return len(rows)
@@ -0,0 +1,178 @@
+import heapq
+from itertools import islice
+
+from django.http import HttpResponse, StreamingHttpResponse
+
+from rest_framework.renderers import JSONRenderer
+
+from .metrics import observe_cache
+from .models import Game, GameDescription, GameDocument
+from .serializers import GameSummarySerializer
+from .sharding import game_databases, ids_by_shard
+
+# Materialized read model for games.
+#
+# Each game's GameSummarySerializer output is stored as rendered JSON in
+# GameDocument, so read endpoints can join the stored fragments into a response
+# without instantiating models or running the serializer. Descriptions are not
+# part of the documents: when a response needs them, they are read compressed
+# in the same query and appended to the fragments.
+
+renderer = JSONRenderer()
+
+
+def render_game(game):
+    return renderer.render(GameSummarySerializer(game).data).decode()
+
+
+def with_description(fragment, description_json):
+    # Adds an encoded description to a stored fragment, which is always a non-empty JSON object
+    return f'{fragment[:-1]},"description":{description_json}}}'
+
+
+def refresh_game_documents(game_ids, chunk_size=1000):
+    # Re-renders and upserts the documents for the given game ids, in the shard of each game
+    for alias, shard_ids in ids_by_shard(game_ids).items():
+        for start in range(0, len(shard_ids), chunk_size):
+            chunk = shard_ids[start:start + chunk_size]
+            games = Game.objects.using(alias).filter(id__in=chunk).prefetch_related('publisher')
+
+            GameDocument.objects.using(alias).bulk_create(
+                [GameDocument(game_id=game.id, data=render_game(game)) for game in games],
+                update_conflicts=True,
+                unique_fields=['game'],
+                update_fields=['data'],
+            )
+
+
+def rebuild_game_documents(chunk_size=1000):
+    for alias in game_databases():
+        GameDocument.objects.using(alias).all().delete()
+        ids = Game.objects.using(alias).order_by('id').values_list('id', flat=True)
+        refresh_game_documents(ids.iterator(chunk_size=chunk_size), chunk_size=chunk_size)
+
+
+def _fill_missing(rows, using):
+    # Renders the documents missing from (id, stored JSON, ...) rows
+    missing = [row[0] for row in rows if row[1] is None]
+    observe_cache('game_documents', hits=len(rows) - len(missing), misses=len(missing))
+    if not missing:
+        return rows
+
+    refresh_game_documents(missing)
+    rendered = dict(GameDocument.objects.using(using).filter(game_id__in=missing).values_list('game_id', 'data'))
+    return [(row[0], rendered.get(row[0]) if row[1] is None else row[1], *row[2:]) for row in rows]
+
+
+def _values(games, fields, descriptions):
+    if descriptions:
+        return games.values_list('id', 'document__data', 'compressed_description__data', *fields)
+    return games.values_list('id', 'document__data', *fields)
+
+
+def _add_descriptions(rows, descriptions):
+    # Folds the compressed description read as row[2] into the fragment
+    if not descriptions:
+        return rows
+    return [
+        (row[0], with_description(row[1], GameDescription.decompress_json(row[2])) if row[1] is not None else None,
+         *row[3:])
+        for row in rows
+    ]
+
+
+def _fragment_rows(games, fields=(), descriptions=False):
+    # (id, JSON, *fields) for each game in the queryset, rendering any missing documents on the fly
+    rows = _fill_missing(list(_values(games, fields, descriptions)), games.db)
+    return _add_descriptions(rows, descriptions)
+
+
+def _iter_fragment_rows(games, fields, chunk_size, descriptions=False):
+    # Same rows as _fragment_rows, read through a server-side cursor chunk_size rows at a time
+    rows = _values(games, fields, descriptions).iterator(chunk_size=chunk_size)
+    while chunk := list(islice(rows, chunk_size)):
+        yield from _add_descriptions(_fill_missing(chunk, games.db), descriptions)
+
+
+def game_fragments(games, descriptions=False):
+    # JSON for each game in the queryset
+    return [row[1] for row in _fragment_rows(games, descriptions=descriptions) if row[1] is not None]
+
+
+class _Descending:
+    # Sort key wrapper reversing the comparison of one field
+
+    __slots__ = ('value',)
+
+    def __init__(self, value):
+        self.value = value
+
+    def __eq__(self, other):
+        return self.value == other.value
+
+    def __lt__(self, other):
+        return other.value < self.value
+
+
+def _merge_shards(shards, ordering):
+    # Merges per-database (id, stored JSON, *ordering fields) rows already sorted by ordering
+    if len(shards) == 1:
+        return shards[0]
+
+    descending = [value.startswith('-') for value in ordering]
+
+    def sort_key(row):
+        return tuple(_Descending(value) if reverse else value for value, reverse in zip(row[2:], descending))
+
+    return heapq.merge(*shards, key=sort_key)
+
+
+def gather_game_fragments(games, ordering, descriptions=False):
+    # game_fragments(games.order_by(*ordering)) across every game database, merging the ordered shards
+    databases = game_databases()
+    if len(databases) == 1:
+        return game_fragments(games.using(databases[0]).order_by(*ordering), descriptions)
+
+    fields = [value.lstrip('-') for value in ordering]
+    shards = [_fragment_rows(games.using(alias).order_by(*ordering), fields, descriptions) for alias in databases]
+    return [row[1] for row in _merge_shards(shards, ordering) if row[1] is not None]
+
+
+def iter_game_fragments(games, ordering, chunk_size, descriptions=False):
+    # Lazy gather_game_fragments: memory stays bounded by chunk_size rows per database
+    databases = game_databases()
+    fields = [value.lstrip('-') for value in ordering] if len(databases) > 1 else []
+
+    shards = [
+        _iter_fragment_rows(games.using(alias).order_by(*ordering), fields, chunk_size, descriptions)
+        for alias in databases
+    ]
+    return (row[1] for row in _merge_shards(shards, ordering) if row[1] is not None)
+
+
+def _json_array_chunks(fragments, buffer_size):
+    buffer, size, separator = ['['], 1, ''
+    for fragment in fragments:
+        buffer.append(separator)
+        buffer.append(fragment)
+        size += len(fragment) + 1
+        separator = ','
+        if size >= buffer_size:
+            yield ''.join(buffer)
+            buffer, size = [], 0
+
+    buffer.append(']')
+    yield ''.join(buffer)
+
+
+def json_array_stream(fragments, buffer_size=64 * 1024):
+    # Streams a JSON array from an iterator of fragments, flushing about buffer_size characters at a time
+    return StreamingHttpResponse(_json_array_chunks(fragments, buffer_size), content_type='application/json')
+
+
+def json_array_response(fragments, status=200):
+    return HttpResponse(f'[{",".join(fragments)}]', content_type='application/json', status=status)
+
+
+def json_object_response(fragment, status=200):
+    return HttpResponse(fragment, content_type='application/json', status=status)
@@ -0,0 +1,244 @@
+import asyncio
+import json
+import logging
+import threading
+import time
+from bisect import bisect_right
+from datetime import timedelta
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.db import transaction
+from django.db.models import Max
+from django.http import HttpResponseNotAllowed, JsonResponse, StreamingHttpResponse
+from django.utils import timezone
+
+from .models import CatalogEvent
+
+# Server-Sent Events stream of catalog changes.
+#
+# Signal handlers store every change in the CatalogEvent table once its
+# transaction commits, which relays it to all processes. In each ASGI process
+# a single poller reads the new rows, encodes each event once and appends it
+# to a shared window of recent events, then wakes every subscriber through one
+# asyncio.Event. A subscriber is only a cursor into that window, so idle
+# connections cost one suspended coroutine. A slow client stalls its own
+# stream (the server's send applies flow control); if the window moves past
+# its cursor it gets a `resync` event and should reload its state. Clients
+# reconnecting with Last-Event-ID get the events they missed while those are
+# still in the window.
+#
+# Ids are assigned at insert but rows become visible at commit, so on MySQL or
+# PostgreSQL id N+1 can be read before id N. The poller only publishes past a
+# gap in the ids once it has stayed open for EVENTS_GAP_TIMEOUT seconds (ids
+# lost to rolled back inserts never fill). Events are recorded whether or not
+# anyone listens, so expired rows are purged from the write path too.
+
+logger = logging.getLogger('EventsLog: ')
+
+RETRY_MILLISECONDS = 2000
+PURGE_INTERVAL = 60
+
+_last_purge = 0.0
+_purge_lock = threading.Lock()
+
+
+def record_event(kind, action, **data):
+    # Stored once the surrounding transaction commits, so rolled back changes are never announced
+    def store():
+        CatalogEvent.objects.create(kind=kind, action=action, data=data)
+        wake_broadcaster()
+        _maybe_purge()
+
+    transaction.on_commit(store)
+
+
+def purge_events():
+    cutoff = timezone.now() - timedelta(seconds=settings.EVENTS_RETENTION)
+    deleted, _ = CatalogEvent.objects.filter(created_at__lt=cutoff).delete()
+    return deleted
+
+
+def _maybe_purge():
+    # At most once per PURGE_INTERVAL in each process
+    global _last_purge
+
+    now = time.monotonic()
+    with _purge_lock:
+        if now - _last_purge < PURGE_INTERVAL:
+            return
+        _last_purge = now
+
+    try:
+        purge_events()
+    except Exception as e:
+        logger.error(f'Error while purging catalog events: {e}')
+
+
+def encode_event(id, kind, action, data):
+    payload = json.dumps(data, separators=(',', ':'))
+    return f'id: {id}\nevent: {kind}.{action}\ndata: {payload}\n\n'.encode()
+
+
+def _latest_event_id():
+    return CatalogEvent.objects.aggregate(latest=Max('id'))['latest'] or 0
+
+
+def _read_events(after, limit):
+    rows = CatalogEvent.objects.filter(id__gt=after).order_by('id').values_list('id', 'kind', 'action', 'data')
+    return [(id, encode_event(id, kind, action, data)) for id, kind, action, data in rows[:limit]]
+
+
+class Broadcaster:
+    # One per event loop, polling only while someone is subscribed
+
+    def __init__(self, loop):
+        self.loop = loop
+        self.subscribers = 0
+        self.last_id = None
+        # Events up to this id are no longer in the window
+        self.dropped_through = None
+
+        self._ids = []
+        self._frames = []
+        self._changed = asyncio.Event()
+        self._wake = asyncio.Event()
+        self._poller = None
+        # (first missing id, monotonic time it was first seen missing)
+        self._gap = None
+
+    async def start(self):
+        if self.last_id is None:
+            self.last_id = self.dropped_through = await sync_to_async(_latest_event_id)()
+        if self._poller is None:
+            self._poller = self.loop.create_task(self._poll())
+
+    def wake(self):
+        # Thread-safe: poll now instead of at the end of the interval
+        self.loop.call_soon_threadsafe(self._wake.set)
+
+    def settled(self, rows):
+        # Leading rows that are safe to publish: up to the first id gap still young enough to be filled
+        ready = []
+        expected = self.last_id + 1
+        for id, frame in rows:
+            if id != expected:
+                if self._gap is None or self._gap[0] != expected:
+                    self._gap = (expected, time.monotonic())
+                if time.monotonic() - self._gap[1] < settings.EVENTS_GAP_TIMEOUT:
+                    break
+            ready.append((id, frame))
+            expected = id + 1
+        return ready
+
+    def publish(self, rows):
+        for id, frame in rows:
+            self._ids.append(id)
+            self._frames.append(frame)
+        self.last_id = self._ids[-1]
+
+        # Trimmed in steps, so the window holds between EVENTS_BUFFER and twice that
+        if len(self._ids) > 2 * settings.EVENTS_BUFFER:
+            cut = len(self._ids) - settings.EVENTS_BUFFER
+            self.dropped_through = self._ids[cut - 1]
+            del self._ids[:cut], self._frames[:cut]
+
+        changed, self._changed = self._changed, asyncio.Event()
+        changed.set()
+
+    async def _poll(self):
+        try:
+            while self.subscribers:
+                self._wake.clear()
+                try:
+                    rows = await sync_to_async(_read_events)(self.last_id, settings.EVENTS_BUFFER)
+                    ready = self.settled(rows)
+                    if ready:
+                        self.publish(ready)
+                        if len(ready) == settings.EVENTS_BUFFER:
+                            continue
+
+                    await sync_to_async(_maybe_purge)()
+                except Exception as e:
+                    logger.error(f'Error while reading catalog events: {e}')
+
+                try:
+                    await asyncio.wait_for(self._wake.wait(), settings.EVENTS_POLL_INTERVAL)
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            self._poller = None
+
+    async def stream(self, last_event_id=None):
+        self.subscribers += 1
+        try:
+            await self.start()
+            cursor = self.last_id if last_event_id is None else last_event_id
+            yield f'retry: {RETRY_MILLISECONDS}\n\n'.encode()
+
+            while True:
+                if cursor < self.dropped_through:
+                    cursor = self.last_id
+                    yield f'id: {cursor}\nevent: resync\ndata: {{}}\n\n'.encode()
+                    continue
+
+                start = bisect_right(self._ids, cursor)
+                if start < len(self._ids):
+                    frames = self._frames[start:]
+                    cursor = self._ids[-1]
+                    yield b''.join(frames)
+                    continue
+
+                try:
+                    await asyncio.wait_for(self._changed.wait(), settings.EVENTS_HEARTBEAT)
+                except asyncio.TimeoutError:
+                    yield b': keepalive\n\n'
+        finally:
+            self.subscribers -= 1
+
+
+_broadcaster = None
+
+
+def get_broadcaster():
+    global _broadcaster
+
+    loop = asyncio.get_running_loop()
+    if _broadcaster is None or _broadcaster.loop is not loop:
+        _broadcaster = Broadcaster(loop)
+    return _broadcaster
+
+
+def wake_broadcaster():
+    broadcaster = _broadcaster
+    if broadcaster is not None and not broadcaster.loop.is_closed():
+        broadcaster.wake()
+
+
+async def event_stream(last_event_id=None):
+    # Picks the broadcaster of the loop that serves the response
+    async for chunk in get_broadcaster().stream(last_event_id):
+        yield chunk
+
+
+async def events_view(request):
+    if request.method != 'GET':
+        return HttpResponseNotAllowed(['GET'])
+
+    if not isinstance(request, ASGIRequest):
+        # A WSGI worker would have to buffer the endless stream
+        logger.debug('Event stream requested through WSGI.')
+        return JsonResponse({'detail': 'The event stream is only served through ASGI.'}, status=501)
+
+    last_event_id = request.headers.get('Last-Event-ID') or request.GET.get('last_event_id')
+    if last_event_id is not None:
+        try:
+            last_event_id = int(last_event_id)
+        except ValueError:
+            return JsonResponse({'error': 'Last-Event-ID must be an event id.'}, status=400)
+
+    response = StreamingHttpResponse(event_stream(last_event_id), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
@@ -13,4 +13,13 @@ class GameIDNotFoundException(APIException):
     status_code = status.HTTP_404_NOT_FOUND
     default_detail = 'Game with given ID not found.'
     default_code = 'not_found'
-    
\ No newline at end of file
+
+
+class VersionConflictException(APIException):
+    status_code = status.HTTP_412_PRECONDITION_FAILED
+    default_detail = 'The resource was modified by another request.'
+    default_code = 'precondition_failed'
+
+    def __init__(self, current_version, detail=None, code=None):
+        super().__init__(detail, code)
+        self.current_version = current_version
@@ -0,0 +1,162 @@
+import hashlib
+import logging
+import threading
+import time
+from datetime import timedelta
+from functools import wraps
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.http import HttpResponse
+from django.utils import timezone
+
+from rest_framework import status
+from rest_framework.renderers import JSONRenderer
+from rest_framework.response import Response
+
+from .metrics import observe_cache
+from .models import IdempotencyKey
+
+# Idempotency-Key support for the create and update views.
+#
+# The first request with a given key (scoped by method and path) claims a row
+# in IdempotencyKey before the view runs, and stores the response in it once
+# the view returns. Retries with the same key get that response back without
+# running the view again; a retry arriving while the first request is still
+# running gets 409. Keys expire after IDEMPOTENCY_KEY_TTL seconds and expired
+# rows are purged from the request path at most once per
+# IDEMPOTENCY_PURGE_INTERVAL, or with `manage.py purge_idempotency_keys`.
+
+logger = logging.getLogger('IdempotencyLog: ')
+
+renderer = JSONRenderer()
+
+HEADER = 'Idempotency-Key'
+MAX_KEY_LENGTH = 255
+
+_last_purge = 0.0
+_purge_lock = threading.Lock()
+
+
+def purge_expired_keys():
+    cutoff = timezone.now() - timedelta(seconds=settings.IDEMPOTENCY_KEY_TTL)
+    deleted, _ = IdempotencyKey.objects.filter(created_at__lt=cutoff).delete()
+    return deleted
+
+
+def _maybe_purge():
+    global _last_purge
+
+    now = time.monotonic()
+    if now - _last_purge < settings.IDEMPOTENCY_PURGE_INTERVAL:
+        return
+    with _purge_lock:
+        if now - _last_purge < settings.IDEMPOTENCY_PURGE_INTERVAL:
+            return
+        _last_purge = now
+
+    deleted = purge_expired_keys()
+    if deleted:
+        logger.debug(f'Purged {deleted} expired idempotency keys.')
+
+
+def _claim(key, fingerprint):
+    # Returns None when this request owns the key, else the existing row
+    for _ in range(2):
+        try:
+            with transaction.atomic():
+                IdempotencyKey.objects.create(key=key, fingerprint=fingerprint)
+            return None
+        except IntegrityError:
+            row = IdempotencyKey.objects.filter(key=key).first()
+            if row is None:
+                continue
+
+        now = timezone.now()
+        expired = row.created_at < now - timedelta(seconds=settings.IDEMPOTENCY_KEY_TTL)
+        abandoned = row.status_code is None and row.created_at < now - timedelta(
+            seconds=settings.IDEMPOTENCY_LOCK_TIMEOUT
+        )
+        if not (expired or abandoned):
+            return row
+
+        # Only one retry may take an expired or abandoned key over
+        IdempotencyKey.objects.filter(key=key, created_at=row.created_at).delete()
+
+    return IdempotencyKey.objects.filter(key=key).first()
+
+
+def _replay(row):
+    response = HttpResponse(bytes(row.content), status=row.status_code, content_type=row.content_type)
+    response['Idempotent-Replayed'] = 'true'
+    return response
+
+
+def _store(key, response):
+    if isinstance(response, Response):
+        content, content_type = renderer.render(response.data), 'application/json'
+    else:
+        content, content_type = response.content, response['Content-Type']
+
+    IdempotencyKey.objects.filter(key=key).update(
+        status_code=response.status_code, content=content, content_type=content_type
+    )
+
+
+def idempotent(method):
+    # Decorator for APIView.post and APIView.put methods
+
+    @wraps(method)
+    def wrapper(view, request, *args, **kwargs):
+        header = request.headers.get(HEADER)
+        if header is None:
+            return method(view, request, *args, **kwargs)
+
+        if not header or len(header) > MAX_KEY_LENGTH:
+            return Response(
+                {'error': f'{HEADER} must be between 1 and {MAX_KEY_LENGTH} characters.'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        _maybe_purge()
+
+        key = hashlib.sha256(f'{request.method} {request.path} {header}'.encode()).hexdigest()
+        fingerprint = hashlib.sha256(request.body).hexdigest()
+
+        row = _claim(key, fingerprint)
+        if row is not None:
+            if row.fingerprint != fingerprint:
+                logger.debug(f'{HEADER} {header} reused with a different body.')
+                return Response(
+                    {'error': f'{HEADER} was already used with a different request body.'},
+                    status=status.HTTP_422_UNPROCESSABLE_ENTITY
+                )
+
+            if row.status_code is None:
+                response = Response(
+                    {'error': f'A request with this {HEADER} is still being processed.'},
+                    status=status.HTTP_409_CONFLICT
+                )
+                response['Retry-After'] = '1'
+                return response
+
+            observe_cache('idempotency', hits=1)
+            return _replay(row)
+
+        observe_cache('idempotency', misses=1)
+
+        try:
+            response = method(view, request, *args, **kwargs)
+        except BaseException:
+            IdempotencyKey.objects.filter(key=key).delete()
+            raise
+
+        # Server errors are not final: the key is released so the client can retry
+        if response.status_code >= 500 or response.streaming:
+            IdempotencyKey.objects.filter(key=key).delete()
+        else:
+            _store(key, response)
+
+        return response
+
+    return wrapper
@@ -0,0 +1,258 @@
+import inspect
+import logging
+import os
+import socket
+import threading
+import time
+import traceback
+from datetime import timedelta
+from pathlib import Path
+
+from django.conf import settings
+from django.db import close_old_connections, connections
+from django.db.models import Q
+from django.utils import timezone
+
+from .documents import game_fragments, rebuild_game_documents
+from .models import Game, Job, Publisher
+
+# Database-backed job queue.
+#
+# Jobs are rows in the Job table. Workers (`manage.py run_workers`) claim a job
+# with a conditional UPDATE on its status, so several processes can poll the
+# same table without a broker or row locks. Failed jobs are retried with
+# exponential backoff up to max_attempts. While a handler runs, a background
+# thread refreshes the job's heartbeat every JOBS_HEARTBEAT_INTERVAL seconds;
+# running jobs whose heartbeat is older than JOBS_STALE_AFTER seconds are
+# considered abandoned and reclaimed. A worker only writes to jobs it still owns,
+# so a worker whose job was reclaimed cannot overwrite the new owner's outcome.
+
+logger = logging.getLogger('JobsLog: ')
+
+JOB_HANDLERS = {}
+
+
+class PermanentJobError(Exception):
+    # Raised by handlers for failures that retrying cannot fix; the job fails without retries
+    pass
+
+
+def register_job(kind):
+    def decorator(handler):
+        JOB_HANDLERS[kind] = handler
+        return handler
+
+    return decorator
+
+
+def check_params(kind, params):
+    # Raises ValueError unless the handler of `kind` accepts params as keyword arguments
+    if not isinstance(params, dict):
+        raise ValueError('Job params must be a JSON object.')
+
+    try:
+        inspect.signature(JOB_HANDLERS[kind]).bind(None, **params)
+    except TypeError as e:
+        raise ValueError(f'Invalid params for {kind} job: {e}.') from None
+
+
+def submit_job(kind, params=None):
+    if kind not in JOB_HANDLERS:
+        raise ValueError(f'Unknown job kind: {kind}. Allowed: {", ".join(sorted(JOB_HANDLERS))}.')
+
+    params = {} if params is None else params
+    check_params(kind, params)
+
+    return Job.objects.create(kind=kind, params=params, max_attempts=settings.JOBS_MAX_ATTEMPTS)
+
+
+class JobContext:
+    # Passed to handlers for progress reporting and result files
+
+    def __init__(self, job):
+        self.job = job
+
+    def set_progress(self, progress):
+        now = timezone.now()
+        owned(self.job).update(progress=min(max(progress, 0), 1), heartbeat_at=now)
+
+    def result_path(self, suffix):
+        directory = Path(settings.JOBS_RESULT_DIR)
+        directory.mkdir(parents=True, exist_ok=True)
+        return directory / f'{self.job.kind}-{self.job.id}{suffix}'
+
+
+class Heartbeat:
+    # Refreshes heartbeat_at from a background thread while the job runs, so long handlers are not reclaimed
+
+    def __init__(self, job):
+        self.job = job
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stopped.set()
+        self._thread.join()
+
+    def _run(self):
+        try:
+            while not self._stopped.wait(settings.JOBS_HEARTBEAT_INTERVAL):
+                try:
+                    owned(self.job).update(heartbeat_at=timezone.now())
+                except Exception as e:
+                    logger.error(f'Heartbeat of job {self.job.id} failed: {e}')
+        finally:
+            connections.close_all()
+
+
+def owned(job):
+    # The job's row while it is still running on the worker that claimed it
+    return Job.objects.filter(id=job.id, status=Job.RUNNING, worker=job.worker)
+
+
+def worker_name():
+    return f'{socket.gethostname()}:{os.getpid()}'
+
+
+def claim_job(worker):
+    # Returns a job now owned by this worker, or None when nothing is runnable
+    now = timezone.now()
+    stale = now - timedelta(seconds=settings.JOBS_STALE_AFTER)
+
+    candidates = (
+        Job.objects
+        .filter(
+            Q(status=Job.QUEUED, run_after__lte=now)
+            | Q(status=Job.RUNNING, heartbeat_at__lt=stale)
+        )
+        .order_by('run_after', 'id')
+        .values_list('id', 'status', 'heartbeat_at')[:10]
+    )
+
+    for id, current_status, heartbeat_at in candidates:
+        claimed = Job.objects.filter(id=id, status=current_status, heartbeat_at=heartbeat_at).update(
+            status=Job.RUNNING, worker=worker, heartbeat_at=now, progress=0
+        )
+        if claimed:
+            return Job.objects.get(id=id)
+
+    return None
+
+
+def run_job(job):
+    if not owned(job).update(attempts=job.attempts + 1):
+        logger.warning(f'Job {job.id} ({job.kind}) was reclaimed before it started.')
+        return
+    job.attempts += 1
+
+    try:
+        check_params(job.kind, job.params)
+    except ValueError as e:
+        # Retrying cannot fix the params
+        logger.error(f'Job {job.id} ({job.kind}) failed: {e}')
+        finish(job, status=Job.FAILED, error=str(e), finished_at=timezone.now())
+        return
+
+    try:
+        with Heartbeat(job):
+            result_file = JOB_HANDLERS[job.kind](JobContext(job), **job.params)
+
+    except Exception as e:
+        logger.error(f'Job {job.id} ({job.kind}) failed: {e}')
+
+        if job.attempts < job.max_attempts and not isinstance(e, PermanentJobError):
+            retry_at = timezone.now() + timedelta(seconds=settings.JOBS_RETRY_DELAY * 2 ** (job.attempts - 1))
+            finish(job, status=Job.QUEUED, run_after=retry_at, error=traceback.format_exc(), heartbeat_at=None)
+        else:
+            finish(job, status=Job.FAILED, error=traceback.format_exc(), finished_at=timezone.now())
+        return
+
+    finish(
+        job, status=Job.DONE, progress=1, result_file=str(result_file or ''), error='', finished_at=timezone.now()
+    )
+
+
+def finish(job, **fields):
+    # Records the outcome unless another worker reclaimed the job meanwhile; that worker's outcome stands
+    if not owned(job).update(**fields):
+        logger.warning(f'Job {job.id} ({job.kind}) was reclaimed by another worker; its outcome is dropped.')
+
+
+def work(poll_interval=None, once=False):
+    # Worker loop: claims and runs jobs until interrupted (or the queue is empty with once=True)
+    poll_interval = settings.JOBS_POLL_INTERVAL if poll_interval is None else poll_interval
+    worker = worker_name()
+
+    while True:
+        close_old_connections()
+        job = claim_job(worker)
+
+        if job is None:
+            if once:
+                return
+            time.sleep(poll_interval)
+            continue
+
+        logger.debug(f'Worker {worker} running job {job.id} ({job.kind}).')
+        run_job(job)
+
+
+# -=-=- Job handlers -=-=-
+
+
+@register_job('export_games')
+def export_games(context, genre=None, chunk_size=1000):
+    # Writes the games (optionally of one genre) as a JSON array file
+    games = Game.objects.order_by('id')
+    if genre:
+        games = games.filter(genre=genre)
+
+    total = games.count() or 1
+    path = context.result_path('.json')
+    written = 0
+    last_id = 0
+
+    with open(path, 'w') as export_file:
+        export_file.write('[')
+        while True:
+            ids = list(games.filter(id__gt=last_id).values_list('id', flat=True)[:chunk_size])
+            if not ids:
+                break
+
+            if written:
+                export_file.write(',')
+            export_file.write(','.join(game_fragments(Game.objects.filter(id__in=ids).order_by('id'))))
+
+            written += len(ids)
+            last_id = ids[-1]
+            context.set_progress(written / total)
+
+        export_file.write(']')
+
+    return path
+
+
+@register_job('compute_similar_games')
+def compute_similar_games(context, full=False, k=10):
+    from .similarity import refresh_similar_games
+
+    refresh_similar_games(full=full, k=k)
+
+
+@register_job('rebuild_game_documents')
+def rebuild_documents(context):
+    rebuild_game_documents()
+
+
+@register_job('delete_publisher')
+def delete_publisher(context, publisher_id):
+    try:
+        publisher = Publisher.objects.get(id=publisher_id)
+    except Publisher.DoesNotExist:
+        raise PermanentJobError(f'Publisher {publisher_id} does not exist.') from None
+
+    publisher.delete()
@@ -0,0 +1,99 @@
+from contextlib import ExitStack
+from itertools import product
+
+from django.db import DEFAULT_DB_ALIAS, transaction
+from django.db.models import F
+from django.dispatch import Signal
+
+from .models import Game
+from .sharding import game_databases, ids_by_shard
+
+# Set-based changes to the Game <-> Publisher links.
+#
+# Adding, removing or moving the links of many games at once runs one SELECT,
+# one DELETE and one bulk INSERT on the through table per chunk of games in
+# each game database, in a single transaction, instead of a publisher.set()
+# per game. The per-game m2m_changed signals are not sent: `links_changed` is
+# sent once with every (game id, publisher id) pair added and removed, and the
+# handlers in signals.py update the documents, rollups, co-publishing graph and
+# change events from it. Changed games get their version bumped, as a PUT of
+# their publishers would.
+
+links_changed = Signal()
+
+Link = Game.publisher.through
+
+CHUNK_SIZE = 500
+
+
+def _chunks(ids):
+    for start in range(0, len(ids), CHUNK_SIZE):
+        yield ids[start:start + CHUNK_SIZE]
+
+
+def _atomic():
+    # One transaction on every database written: the games' and 'default' for the derived data
+    stack = ExitStack()
+    for alias in sorted({DEFAULT_DB_ALIAS, *game_databases()}):
+        stack.enter_context(transaction.atomic(using=alias))
+    return stack
+
+
+def existing_game_ids(game_ids):
+    found = set()
+    for alias, shard_ids in ids_by_shard(game_ids).items():
+        for chunk in _chunks(shard_ids):
+            found.update(Game.objects.using(alias).filter(id__in=chunk).values_list('id', flat=True))
+    return found
+
+
+def change_links(game_ids, add=(), remove=()):
+    # Links every game to the `add` publishers and unlinks it from the `remove` ones; returns (added, removed) pairs
+    add, remove = set(add), set(remove)
+    added, removed = [], []
+
+    with _atomic():
+        for alias, shard_ids in ids_by_shard(dict.fromkeys(game_ids)).items():
+            links = Link.objects.using(alias)
+
+            for chunk in _chunks(shard_ids):
+                existing = set(
+                    links.filter(game_id__in=chunk, publisher_id__in=add | remove)
+                    .values_list('game_id', 'publisher_id')
+                )
+                new = [pair for pair in product(chunk, sorted(add)) if pair not in existing]
+                gone = sorted(pair for pair in existing if pair[1] in remove)
+
+                if gone:
+                    links.filter(game_id__in=chunk, publisher_id__in=remove).delete()
+                if new:
+                    links.bulk_create(
+                        [Link(game_id=game_id, publisher_id=publisher_id) for game_id, publisher_id in new],
+                        batch_size=CHUNK_SIZE, ignore_conflicts=True
+                    )
+
+                changed = {game_id for game_id, _ in new + gone}
+                if changed:
+                    Game.objects.using(alias).filter(id__in=changed).update(version=F('version') + 1)
+
+                added.extend(new)
+                removed.extend(gone)
+
+        if added or removed:
+            links_changed.send(sender=Game, added=added, removed=removed)
+
+    return added, removed
+
+
+def move_links(source_id, target_id, game_ids=None):
+    # Re-links the games of the source publisher, or only the given ones among them, to the target
+    with _atomic():
+        linked = [
+            game_id for alias in game_databases()
+            for game_id in Link.objects.using(alias).filter(publisher_id=source_id).values_list('game_id', flat=True)
+        ]
+        if game_ids is not None:
+            requested = set(game_ids)
+            linked = [game_id for game_id in linked if game_id in requested]
+
+        return change_links(sorted(linked), add=[target_id], remove=[source_id])
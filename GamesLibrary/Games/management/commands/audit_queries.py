@@ -0,0 +1,77 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connection
+from django.test.utils import setup_databases, teardown_databases
+
+from Games.query_audit import audit, load_baseline, regressions, save_baseline, seed_catalog
+
+
+class Command(BaseCommand):
+    help = (
+        'Request every read endpoint against a seeded temporary database, EXPLAIN the queries they run and '
+        'fail when a plan has full table scans or temporary sorts that are not in the baseline.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--games', type=int, default=1000, help='Games in the seeded database.')
+        parser.add_argument(
+            '--current', action='store_true', help='Audit the configured database as it is instead of a seeded copy.'
+        )
+        parser.add_argument('--baseline', default=settings.QUERY_AUDIT_BASELINE, help='Baseline file.')
+        parser.add_argument(
+            '--update-baseline', action='store_true', help='Store the current findings as the baseline.'
+        )
+
+    def handle(self, *args, **options):
+        if options['current']:
+            results, skipped = audit()
+        else:
+            old_config = setup_databases(
+                verbosity=0, interactive=False, aliases={DEFAULT_DB_ALIAS, *settings.GAME_SHARDS},
+                serialized_aliases=set()
+            )
+            try:
+                seed_catalog(options['games'])
+                results, skipped = audit()
+            finally:
+                teardown_databases(old_config, verbosity=0)
+
+        vendor = connection.vendor
+        baseline_path = options['baseline']
+
+        if options['update_baseline']:
+            save_baseline(baseline_path, vendor, results)
+            known = {key: result['findings'] for key, result in results.items()}
+        else:
+            try:
+                known = load_baseline(baseline_path, vendor)
+            except FileNotFoundError:
+                known = None
+            if known is None:
+                raise CommandError(f'No {vendor} baseline in {baseline_path}, run with --update-baseline first.')
+
+        changes = regressions(results, known)
+
+        for key, result in results.items():
+            self.stdout.write(f'{key}  ({result["path"]}, {len(result["statements"])} statements)')
+            if options['verbosity'] > 1:
+                for sql in result['statements']:
+                    self.stdout.write(f'    {sql}')
+            for finding in result['findings']:
+                if finding in changes.get(key, []):
+                    self.stdout.write(self.style.ERROR(f'    REGRESSION {finding}'))
+                else:
+                    self.stdout.write(f'    {finding}')
+
+        for key in sorted(set(known) - set(results)):
+            self.stdout.write(self.style.WARNING(f'{key} is in the baseline but was not audited'))
+        for key, reason in skipped.items():
+            self.stdout.write(self.style.WARNING(f'{key} skipped: {reason}'))
+
+        if changes:
+            raise CommandError(f'{sum(map(len, changes.values()))} query plan regressions in {len(changes)} requests.')
+
+        if options['update_baseline']:
+            self.stdout.write(self.style.SUCCESS(f'Stored the {vendor} baseline for {len(results)} requests.'))
+        else:
+            self.stdout.write(self.style.SUCCESS(f'No query plan regressions in {len(results)} requests.'))
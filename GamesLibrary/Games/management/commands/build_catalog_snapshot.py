@@ -0,0 +1,16 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from Games.snapshot import write_snapshot
+
+
+class Command(BaseCommand):
+    help = 'Write the memory-mapped catalog snapshot and atomically replace the current one.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--file', default=None, help='Output path (defaults to settings.CATALOG_SNAPSHOT_PATH).')
+
+    def handle(self, *args, **options):
+        path = options['file'] or settings.CATALOG_SNAPSHOT_PATH
+        write_snapshot(path)
+        self.stdout.write(self.style.SUCCESS(f'Catalog snapshot written to {path}'))
@@ -0,0 +1,18 @@
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    help = 'Generate the OpenAPI schema once into API_SCHEMA_FILE so /api/schema/ can serve it statically.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--file', default=None, help='Output path (defaults to settings.API_SCHEMA_FILE).')
+        parser.add_argument('--validate', action='store_true', help='Validate the schema against the OpenAPI spec.')
+
+    def handle(self, *args, **options):
+        path = options['file'] or settings.API_SCHEMA_FILE
+        file_format = 'openapi-json' if str(path).endswith('.json') else 'openapi'
+
+        call_command('spectacular', file=str(path), format=file_format, validate=options['validate'], fail_on_warn=False)
+        self.stdout.write(self.style.SUCCESS(f'Schema written to {path}'))
@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from Games.similarity import refresh_similar_games
+
+
+class Command(BaseCommand):
+    help = 'Precompute the top-k similar games; only games queued by changes are refreshed unless --full is given.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--full', action='store_true', help='Recompute every game instead of only changed ones.')
+        parser.add_argument('--k', type=int, default=10, help='Number of similar games stored per game.')
+        parser.add_argument('--batch-size', type=int, default=None, help='Rows scored per vectorized batch.')
+
+    def handle(self, *args, **options):
+        refreshed = refresh_similar_games(full=options['full'], k=options['k'], batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Refreshed similar games for {refreshed} games.'))
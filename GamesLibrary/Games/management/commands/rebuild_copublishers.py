@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from Games.copublishers import rebuild_copublishers
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the publisher co-publishing graph from the Game <-> Publisher links.'
+
+    def handle(self, *args, **options):
+        rows = rebuild_copublishers()
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt {rows} co-publisher pairs.'))
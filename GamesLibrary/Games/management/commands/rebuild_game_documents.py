@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from Games.documents import rebuild_game_documents
+from Games.models import GameDocument
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the pre-serialized JSON document of every game.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=1000, help='Games rendered per batch.')
+
+    def handle(self, *args, **options):
+        rebuild_game_documents(chunk_size=options['chunk_size'])
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt {GameDocument.objects.count()} game documents.'))
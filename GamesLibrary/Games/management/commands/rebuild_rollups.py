@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from Games.rollups import rebuild_rollups
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the release rollups from the Game table and its publisher links.'
+
+    def handle(self, *args, **options):
+        rows = rebuild_rollups()
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt {rows} rollup rows.'))
@@ -0,0 +1,54 @@
+import multiprocessing
+import signal
+
+import django
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+
+def _worker(poll_interval, once):
+    # Under the spawn and forkserver start methods the child starts without the parent's
+    # Django setup, so it sets Django up before importing any model
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    django.setup()
+    # Connections inherited through fork belong to the parent
+    connections.close_all()
+
+    from Games.jobs import work
+
+    work(poll_interval=poll_interval, once=once)
+
+
+class Command(BaseCommand):
+    help = 'Run background job workers against the project database.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=1, help='Number of worker processes.')
+        parser.add_argument('--poll-interval', type=float, default=None, help='Seconds between polls when idle.')
+        parser.add_argument('--once', action='store_true', help='Exit when no runnable job is left.')
+
+    def handle(self, *args, **options):
+        from Games.jobs import work
+
+        if options['workers'] <= 1:
+            work(poll_interval=options['poll_interval'], once=options['once'])
+            return
+
+        # Children must open their own database connections
+        connections.close_all()
+
+        processes = [
+            multiprocessing.Process(target=_worker, args=(options['poll_interval'], options['once']), daemon=True)
+            for _ in range(options['workers'])
+        ]
+        for process in processes:
+            process.start()
+
+        self.stdout.write(f'Started {len(processes)} workers.')
+
+        try:
+            for process in processes:
+                process.join()
+        except KeyboardInterrupt:
+            for process in processes:
+                process.terminate()
@@ -0,0 +1,278 @@
+import json
+import mmap
+import os
+import struct
+import threading
+import time
+from contextlib import ExitStack
+from pathlib import Path
+
+from django.conf import settings
+from django.db import connections
+from django.http import HttpResponse, HttpResponseNotFound
+
+# Prometheus-style request metrics shared by every worker process.
+#
+# Each process increments float64 slots in its own memory-mapped file under
+# METRICS_DIR (one file per pid), so a counter update is a dict lookup and an
+# in-place write, with no syscall and no lock shared between processes.
+# /metrics reads every file in the directory and sums the slots, so the output
+# covers all workers, including ones that have exited since. The directory
+# should be emptied when the server starts.
+
+HEADER = struct.Struct('<Q')
+LENGTH = struct.Struct('<I')
+DOUBLE = struct.Struct('<d')
+
+INITIAL_SIZE = 64 * 1024
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+METRICS = {
+    'http_requests_total': ('counter', 'Requests by URL name, method and status code.'),
+    'http_request_duration_seconds': ('histogram', 'Time spent in the view and middleware, by URL name.'),
+    'db_queries_total': ('counter', 'SQL statements executed while handling requests, by URL name.'),
+    'cache_requests_total': ('counter', 'Lookups in the application caches, by cache and result.'),
+}
+
+
+def _padded(size):
+    return (size + 7) & ~7
+
+
+def _entries(buffer):
+    # (key, value offset) for every slot in a metrics file
+    used, = HEADER.unpack_from(buffer, 0)
+    position = HEADER.size
+    while position < used:
+        length, = LENGTH.unpack_from(buffer, position)
+        key = bytes(buffer[position + LENGTH.size:position + LENGTH.size + length]).decode()
+        offset = position + _padded(LENGTH.size + length)
+        yield key, offset
+        position = offset + DOUBLE.size
+
+
+class ValueFile:
+    # Append-only key -> float64 slots in a memory-mapped file written by a single process
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.pid = os.getpid()
+        self._lock = threading.Lock()
+        self._offsets = {}
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._file = open(self.path, 'a+b')
+        size = os.fstat(self._file.fileno()).st_size
+        if size < INITIAL_SIZE:
+            self._file.truncate(INITIAL_SIZE)
+            size = INITIAL_SIZE
+        self._mmap = mmap.mmap(self._file.fileno(), size)
+
+        self._used, = HEADER.unpack_from(self._mmap, 0)
+        if self._used == 0:
+            self._used = HEADER.size
+            HEADER.pack_into(self._mmap, 0, self._used)
+        for key, offset in _entries(self._mmap):
+            self._offsets[key] = offset
+
+    def _add(self, key):
+        encoded = key.encode()
+        offset = self._used + _padded(LENGTH.size + len(encoded))
+        end = offset + DOUBLE.size
+
+        if end > len(self._mmap):
+            size = max(end, len(self._mmap) * 2)
+            self._mmap.close()
+            self._file.truncate(size)
+            self._mmap = mmap.mmap(self._file.fileno(), size)
+
+        LENGTH.pack_into(self._mmap, self._used, len(encoded))
+        self._mmap[self._used + LENGTH.size:self._used + LENGTH.size + len(encoded)] = encoded
+        DOUBLE.pack_into(self._mmap, offset, 0.0)
+
+        # Published last, so readers never see a half written slot
+        self._used = end
+        HEADER.pack_into(self._mmap, 0, self._used)
+        self._offsets[key] = offset
+        return offset
+
+    def inc(self, key, amount):
+        with self._lock:
+            offset = self._offsets.get(key)
+            if offset is None:
+                offset = self._add(key)
+            value, = DOUBLE.unpack_from(self._mmap, offset)
+            DOUBLE.pack_into(self._mmap, offset, value + amount)
+
+
+_store = None
+_store_lock = threading.Lock()
+_keys = {}
+
+
+def _values():
+    # This process' value file; reopened after a fork or when METRICS_DIR changes
+    global _store
+
+    store, pid = _store, os.getpid()
+    path = Path(settings.METRICS_DIR) / f'metrics-{pid}.db'
+    if store is not None and store.pid == pid and store.path == path:
+        return store
+
+    with _store_lock:
+        if _store is None or _store.pid != pid or _store.path != path:
+            _store = ValueFile(path)
+        return _store
+
+
+def _key(name, labels):
+    # Metric keys are JSON encoded once per distinct label set
+    cache_key = (name, *sorted(labels.items()))
+    key = _keys.get(cache_key)
+    if key is None:
+        key = _keys[cache_key] = json.dumps([name, dict(sorted(labels.items()))])
+    return key
+
+
+def inc(name, amount=1, **labels):
+    if settings.METRICS_ENABLED and amount:
+        _values().inc(_key(name, labels), amount)
+
+
+def observe(name, value, **labels):
+    # Histogram observation; buckets are stored cumulative so files add up directly
+    if not settings.METRICS_ENABLED:
+        return
+
+    values = _values()
+    for bound in LATENCY_BUCKETS:
+        if value <= bound:
+            values.inc(_key(f'{name}_bucket', {**labels, 'le': str(bound)}), 1)
+    values.inc(_key(f'{name}_bucket', {**labels, 'le': '+Inf'}), 1)
+    values.inc(_key(f'{name}_sum', labels), value)
+    values.inc(_key(f'{name}_count', labels), 1)
+
+
+def observe_cache(cache, hits=0, misses=0):
+    inc('cache_requests_total', hits, cache=cache, result='hit')
+    inc('cache_requests_total', misses, cache=cache, result='miss')
+
+
+def collect(directory=None):
+    # Sums the slots of every process' file: {(name, labels tuple): value}
+    totals = {}
+    for path in sorted(Path(directory or settings.METRICS_DIR).glob('metrics-*.db')):
+        try:
+            buffer = path.read_bytes()
+        except OSError:
+            continue
+
+        for key, offset in _entries(buffer):
+            name, labels = json.loads(key)
+            series = (name, tuple(labels.items()))
+            totals[series] = totals.get(series, 0.0) + DOUBLE.unpack_from(buffer, offset)[0]
+
+    return totals
+
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    escaped = (
+        (name, str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n'))
+        for name, value in labels
+    )
+    return '{' + ','.join(f'{name}="{value}"' for name, value in escaped) + '}'
+
+
+def _format_value(value):
+    return str(int(value)) if value.is_integer() else repr(value)
+
+
+def _family(name):
+    for suffix in ('_bucket', '_sum', '_count'):
+        if name.endswith(suffix) and name[:-len(suffix)] in METRICS:
+            return name[:-len(suffix)]
+    return name
+
+
+def _bucket_order(item):
+    (name, labels), _ = item
+    bound = dict(labels).get('le')
+    rest = tuple(label for label in labels if label[0] != 'le')
+    return name, rest, float(bound) if bound is not None else 0.0
+
+
+def render(totals):
+    families = {}
+    for series, value in sorted(totals.items(), key=_bucket_order):
+        families.setdefault(_family(series[0]), []).append((series, value))
+
+    cache_totals = {}
+    for (name, labels), value in totals.items():
+        if name == 'cache_requests_total':
+            labels = dict(labels)
+            hits, lookups = cache_totals.get(labels['cache'], (0.0, 0.0))
+            cache_totals[labels['cache']] = (hits + value * (labels['result'] == 'hit'), lookups + value)
+
+    lines = []
+    for family, samples in sorted(families.items()):
+        kind, description = METRICS.get(family, ('untyped', ''))
+        lines.append(f'# HELP {family} {description}')
+        lines.append(f'# TYPE {family} {kind}')
+        lines.extend(f'{name}{_format_labels(labels)} {_format_value(value)}' for (name, labels), value in samples)
+
+    if cache_totals:
+        lines.append('# HELP cache_hit_ratio Share of cache lookups that were hits, by cache.')
+        lines.append('# TYPE cache_hit_ratio gauge')
+        for cache, (hits, lookups) in sorted(cache_totals.items()):
+            ratio = hits / lookups if lookups else 0.0
+            lines.append(f'cache_hit_ratio{_format_labels([("cache", cache)])} {_format_value(ratio)}')
+
+    return '\n'.join(lines) + '\n'
+
+
+def metrics_view(request):
+    if not settings.METRICS_ENABLED:
+        return HttpResponseNotFound()
+
+    return HttpResponse(render(collect()), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+
+class _QueryCounter:
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+class MetricsMiddleware:
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not settings.METRICS_ENABLED:
+            return self.get_response(request)
+
+        queries = _QueryCounter()
+        start = time.perf_counter()
+
+        with ExitStack() as stack:
+            for alias in connections:
+                stack.enter_context(connections[alias].execute_wrapper(queries))
+            response = self.get_response(request)
+
+        elapsed = time.perf_counter() - start
+        match = getattr(request, 'resolver_match', None)
+        view = match.url_name if match is not None and match.url_name else 'unmatched'
+
+        inc('http_requests_total', view=view, method=request.method, status=str(response.status_code))
+        observe('http_request_duration_seconds', elapsed, view=view)
+        inc('db_queries_total', queries.count, view=view)
+
+        return response
@@ -0,0 +1,45 @@
+# Generated by Django 5.1.2 on 2026-10-19 10:00
+
+import unicodedata
+
+from django.db import migrations, models
+
+
+def normalize_location(location):
+    # Copy of Games.models.normalize_location as of this migration
+    decomposed = unicodedata.normalize('NFKD', location.strip())
+    stripped = ''.join(c for c in decomposed if not unicodedata.combining(c))
+    return ' '.join(stripped.casefold().split())
+
+
+def populate_location_key(apps, schema_editor):
+    Publisher = apps.get_model('Games', 'Publisher')
+
+    publishers = Publisher.objects.only('id', 'location')
+    batch = []
+    for publisher in publishers.iterator(chunk_size=1000):
+        publisher.location_key = normalize_location(publisher.location)
+        batch.append(publisher)
+
+        if len(batch) >= 1000:
+            Publisher.objects.bulk_update(batch, ['location_key'])
+            batch = []
+
+    if batch:
+        Publisher.objects.bulk_update(batch, ['location_key'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Games', '0002_remove_game_publisher_game_publisher'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='publisher',
+            name='location_key',
+            field=models.CharField(db_index=True, default='', editable=False, max_length=100),
+        ),
+        migrations.RunPython(populate_location_key, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-19 17:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Games', '0003_publisher_location_key'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='game',
+            name='genre',
+            field=models.CharField(db_index=True, max_length=100),
+        ),
+        migrations.AlterField(
+            model_name='game',
+            name='release_date',
+            field=models.DateField(db_index=True),
+        ),
+    ]
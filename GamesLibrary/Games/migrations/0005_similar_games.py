@@ -0,0 +1,34 @@
+# Generated by Django 5.2.18 on 2026-10-19 17:54
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Games', '0004_game_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SimilarityRefresh',
+            fields=[
+                ('game_id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('queued_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='SimilarGame',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('rank', models.PositiveSmallIntegerField()),
+                ('score', models.FloatField()),
+                ('game', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='similar_games', to='Games.game')),
+                ('similar', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='Games.game')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('game', 'rank'), name='unique_similar_game_rank')],
+            },
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.2.18 on 2026-10-19 17:56
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Games', '0005_similar_games'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GameDocument',
+            fields=[
+                ('game', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='document', serialize=False, to='Games.game')),
+                ('data', models.TextField()),
+            ],
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-19 18:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Games', '0006_game_documents'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='game',
+            index=models.Index(fields=['-release_date', 'title'], name='game_release_title_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='game',
+            index=models.Index(fields=['genre', 'title'], name='game_genre_title_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='game',
+            index=models.Index(fields=['genre', '-release_date', 'title'], name='game_genre_release_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='publisher',
+            index=models.Index(fields=['location', 'name'], name='publisher_location_name_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='publisher',
+            index=models.Index(fields=['location_key', 'name'], name='publisher_lockey_name_idx'),
+        ),
+    ]
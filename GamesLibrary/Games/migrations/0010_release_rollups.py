@@ -0,0 +1,26 @@
+# Generated by Django 5.2.18 on 2026-10-19 18:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Games', '0009_versions'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReleaseRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('dimension', models.CharField(choices=[('genre', 'Genre'), ('publisher', 'Publisher'), ('platform', 'Platform')], max_length=10)),
+                ('year', models.SmallIntegerField()),
+                ('key', models.CharField(max_length=100)),
+                ('count', models.IntegerField(default=0)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('dimension', 'year', 'key'), name='unique_release_rollup')],
+            },
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.2.18 on 2026-10-19 18:19
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Games', '0011_id_sequence'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CoPublisher',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('shared_games', models.IntegerField(default=0)),
+                ('other', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='Games.publisher')),
+                ('publisher', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='copublishers', to='Games.publisher')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['publisher', '-shared_games', 'other'], name='copublisher_top_idx')],
+                'constraints': [models.UniqueConstraint(fields=('publisher', 'other'), name='unique_copublisher')],
+            },
+        ),
+    ]
@@ -0,0 +1,92 @@
+# Generated by Django 5.2.18 on 2026-10-19 18:26
+
+import json
+import zlib
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+BATCH_SIZE = 1000
+
+# The encoding as of this migration (GameDescription.compress at the time), frozen so
+# later changes to the model or to GAME_DESCRIPTION_COMPRESSION_LEVEL do not alter it
+COMPRESSION_LEVEL = 6
+
+
+def compress(text):
+    return zlib.compress(json.dumps(text, ensure_ascii=False).encode(), COMPRESSION_LEVEL)
+
+
+def decompress(data):
+    return json.loads(zlib.decompress(data))
+
+
+def compress_descriptions(apps, schema_editor):
+    Game = apps.get_model('Games', 'Game')
+    GameDescription = apps.get_model('Games', 'GameDescription')
+    GameDocument = apps.get_model('Games', 'GameDocument')
+    using = schema_editor.connection.alias
+
+    games = Game.objects.using(using).order_by('id').values_list('id', 'description')
+    batch = []
+    for id, description in games.iterator(chunk_size=BATCH_SIZE):
+        batch.append(GameDescription(game_id=id, data=compress(description)))
+
+        if len(batch) >= BATCH_SIZE:
+            GameDescription.objects.using(using).bulk_create(batch)
+            batch = []
+
+    if batch:
+        GameDescription.objects.using(using).bulk_create(batch)
+
+    # Stored documents still embed the descriptions; they are rendered again on first read
+    GameDocument.objects.using(using).all().delete()
+
+
+def restore_descriptions(apps, schema_editor):
+    Game = apps.get_model('Games', 'Game')
+    GameDescription = apps.get_model('Games', 'GameDescription')
+    GameDocument = apps.get_model('Games', 'GameDocument')
+    using = schema_editor.connection.alias
+
+    descriptions = GameDescription.objects.using(using).order_by('game_id').values_list('game_id', 'data')
+    batch = []
+    for game_id, data in descriptions.iterator(chunk_size=BATCH_SIZE):
+        batch.append(Game(id=game_id, description=decompress(data)))
+
+        if len(batch) >= BATCH_SIZE:
+            Game.objects.using(using).bulk_update(batch, ['description'])
+            batch = []
+
+    if batch:
+        Game.objects.using(using).bulk_update(batch, ['description'])
+
+    GameDocument.objects.using(using).all().delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Games', '0013_idempotency_keys'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GameDescription',
+            fields=[
+                ('game', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='compressed_description', serialize=False, to='Games.game')),
+                ('data', models.BinaryField()),
+            ],
+        ),
+        # Lets the column be added back with a value when unapplying
+        migrations.AlterField(
+            model_name='game',
+            name='description',
+            field=models.TextField(default=''),
+        ),
+        migrations.RunPython(compress_descriptions, restore_descriptions),
+        migrations.RemoveField(
+            model_name='game',
+            name='description',
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.2.18 on 2026-10-19 18:34
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Games', '0014_compressed_descriptions'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CatalogEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('game', 'Game'), ('publisher', 'Publisher'), ('link', 'Link')], max_length=10)),
+                ('action', models.CharField(max_length=10)),
+                ('data', models.JSONField(default=dict)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['created_at'], name='catalog_event_created_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 5.2.18 on 2026-10-19 18:54
+
+from django.db import migrations, models
+
+
+def populate_title_key(apps, schema_editor):
+    Game = apps.get_model('Games', 'Game')
+    using = schema_editor.connection.alias
+
+    games = Game.objects.using(using).only('id', 'title')
+    batch = []
+    for game in games.iterator(chunk_size=1000):
+        game.title_key = game.title.casefold()
+        batch.append(game)
+
+        if len(batch) >= 1000:
+            Game.objects.using(using).bulk_update(batch, ['title_key'])
+            batch = []
+
+    if batch:
+        Game.objects.using(using).bulk_update(batch, ['title_key'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Games', '0015_catalog_events'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='game',
+            name='title_key',
+            field=models.CharField(default='', editable=False, max_length=300),
+        ),
+        migrations.RunPython(populate_title_key, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='game',
+            index=models.Index(fields=['title_key', 'title'], name='game_title_key_idx'),
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.2.18 on 2026-10-19 19:15
+
+from django.db import migrations, models
+
+
+def populate_name_key(apps, schema_editor):
+    Publisher = apps.get_model('Games', 'Publisher')
+    using = schema_editor.connection.alias
+
+    publishers = Publisher.objects.using(using).only('id', 'name')
+    batch = []
+    for publisher in publishers.iterator(chunk_size=1000):
+        publisher.name_key = publisher.name.casefold()
+        batch.append(publisher)
+
+        if len(batch) >= 1000:
+            Publisher.objects.using(using).bulk_update(batch, ['name_key'])
+            batch = []
+
+    if batch:
+        Publisher.objects.using(using).bulk_update(batch, ['name_key'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Games', '0016_game_title_key'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='publisher',
+            name='name_key',
+            field=models.CharField(db_index=True, default='', editable=False, max_length=150),
+        ),
+        migrations.RunPython(populate_name_key, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 19:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Games', '0017_publisher_name_key'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='publisher',
+            name='location_key',
+            field=models.CharField(db_index=True, default='', editable=False, max_length=300),
+        ),
+    ]
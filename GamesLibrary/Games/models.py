@@ -1,31 +1,148 @@
+import json
+import unicodedata
+import zlib
+
+from django.conf import settings
+from django.core.exceptions import ObjectDoesNotExist
 from django.db import models
+from django.utils import timezone
 
 # Create your models here.
 
+def normalize_location(location):
+    # Case- and accent-insensitive key used for indexed location lookups
+    decomposed = unicodedata.normalize('NFKD', location.strip())
+    stripped = ''.join(c for c in decomposed if not unicodedata.combining(c))
+    return ' '.join(stripped.casefold().split())
+
+
 class Publisher(models.Model):
     name = models.CharField(max_length=50, unique=True)
+    # Casefolded name for indexed, case-insensitive prefix searches (casefold can lengthen a name)
+    name_key = models.CharField(max_length=150, db_index=True, editable=False, default='')
     location = models.CharField(max_length=100)
+    # normalize_location(location); NFKD and casefold can lengthen a location ('ß' -> 'ss', ligatures)
+    location_key = models.CharField(max_length=300, db_index=True, editable=False, default='')
     website = models.URLField(unique=True)
+    version = models.PositiveIntegerField(default=1)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['location', 'name'], name='publisher_location_name_idx'),
+            models.Index(fields=['location_key', 'name'], name='publisher_lockey_name_idx'),
+        ]
 
     def __str__(self):
         return self.name
+
+    def derived_changes(self, changes):
+        # Extra columns a single-statement update must write along with `changes`
+        derived = {}
+        if 'name' in changes:
+            derived['name_key'] = changes['name'].casefold()
+        if 'location' in changes:
+            derived['location_key'] = normalize_location(changes['location'])
+        return derived
+
+    def save(self, *args, **kwargs):
+        self.name_key = self.name.casefold()
+        self.location_key = normalize_location(self.location)
+
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            update_fields = set(update_fields)
+            if 'name' in update_fields:
+                update_fields.add('name_key')
+            if 'location' in update_fields:
+                update_fields.add('location_key')
+            kwargs['update_fields'] = update_fields
+
+        super().save(*args, **kwargs)
     
 
 class Game(models.Model):
     title = models.CharField(max_length=100, unique=True)
+    # Casefolded title for indexed, case-insensitive prefix lookups (casefold can lengthen a title)
+    title_key = models.CharField(max_length=300, editable=False, default='')
     publisher = models.ManyToManyField(Publisher, related_name='games')
 
-    description = models.TextField()
-    release_date = models.DateField()
-    genre = models.CharField(max_length=100)
+    release_date = models.DateField(db_index=True)
+    genre = models.CharField(max_length=100, db_index=True)
 
     onWindows = models.BooleanField()
     onMac = models.BooleanField()
     onLinux = models.BooleanField()
+
+    version = models.PositiveIntegerField(default=1)
     
+    class Meta:
+        indexes = [
+            models.Index(fields=['-release_date', 'title'], name='game_release_title_idx'),
+            models.Index(fields=['genre', 'title'], name='game_genre_title_idx'),
+            models.Index(fields=['genre', '-release_date', 'title'], name='game_genre_release_idx'),
+            models.Index(fields=['title_key', 'title'], name='game_title_key_idx'),
+        ]
+
+    # The description lives compressed in GameDescription and is read on first access
+    _description = None
+    _description_changed = False
 
     def __str__(self):
         return self.title
+
+    @property
+    def description(self):
+        if self._description is None:
+            try:
+                self._description = self.compressed_description.text
+            except ObjectDoesNotExist:
+                self._description = ''
+        return self._description
+
+    @description.setter
+    def description(self, value):
+        self._description = value
+        self._description_changed = True
+
+    def save_description(self):
+        # Writes a description set since the last save
+        if not self._description_changed:
+            return
+
+        GameDescription.objects.using(self._state.db).update_or_create(
+            game_id=self.pk, defaults={'data': GameDescription.compress(self._description)}
+        )
+        self._description_changed = False
+
+    def derived_changes(self, changes):
+        # Extra columns a single-statement update must write along with `changes`
+        if 'title' in changes:
+            return {'title_key': changes['title'].casefold()}
+        return {}
+
+    def save(self, *args, **kwargs):
+        self.title_key = self.title.casefold()
+
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'title' in update_fields:
+            kwargs['update_fields'] = {*update_fields, 'title_key'}
+
+        # With GAME_SHARDS set, ids come from the global allocator and pick the shard
+        if settings.GAME_SHARDS:
+            from .sharding import allocate_game_ids, shard_for
+
+            if self.pk is None:
+                self.pk = allocate_game_ids(1)[0]
+            kwargs['using'] = shard_for(self.pk)
+
+        super().save(*args, **kwargs)
+        self.save_description()
+
+    def refresh_from_db(self, using=None, fields=None, **kwargs):
+        super().refresh_from_db(using=using, fields=fields, **kwargs)
+        if fields is None:
+            self._description = None
+            self._description_changed = False
     
     def get_platforms(self):
         platforms = []
@@ -36,4 +153,182 @@ class Game(models.Model):
         if self.onLinux:
             platforms.append('Linux')
         return platforms
-    
\ No newline at end of file
+    
+
+class IdSequence(models.Model):
+    # Global id allocator for rows spread over several databases, always in 'default'
+    name = models.CharField(max_length=50, primary_key=True)
+    next_value = models.BigIntegerField()
+
+
+class CoPublisher(models.Model):
+    # Publishers sharing games, stored in both directions; maintained by copublishers.py
+    publisher = models.ForeignKey(Publisher, on_delete=models.CASCADE, related_name='copublishers')
+    other = models.ForeignKey(Publisher, on_delete=models.CASCADE, related_name='+')
+    shared_games = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['publisher', 'other'], name='unique_copublisher'),
+        ]
+        indexes = [
+            models.Index(fields=['publisher', '-shared_games', 'other'], name='copublisher_top_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.publisher_id} <-> {self.other_id} ({self.shared_games})'
+
+
+class SimilarGame(models.Model):
+    # Precomputed top-k "more like this" list, written by `manage.py compute_similar_games`
+    game = models.ForeignKey(Game, on_delete=models.CASCADE, related_name='similar_games')
+    similar = models.ForeignKey(Game, on_delete=models.CASCADE, related_name='+')
+    rank = models.PositiveSmallIntegerField()
+    score = models.FloatField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['game', 'rank'], name='unique_similar_game_rank'),
+        ]
+
+    def __str__(self):
+        return f'{self.game_id} -> {self.similar_id} ({self.score:.3f})'
+
+
+class SimilarityRefresh(models.Model):
+    # Games whose similar list must be recomputed on the next incremental run
+    game_id = models.BigIntegerField(primary_key=True)
+    queued_at = models.DateTimeField(auto_now=True)
+
+
+class GameDescription(models.Model):
+    # Game.description kept out of the game row so listings never read it. Stored as a
+    # zlib-compressed JSON string, so responses can include it without encoding it again
+    game = models.OneToOneField(Game, on_delete=models.CASCADE, primary_key=True, related_name='compressed_description')
+    data = models.BinaryField()
+
+    @staticmethod
+    def compress(text):
+        encoded = json.dumps(text, ensure_ascii=False).encode()
+        return zlib.compress(encoded, settings.GAME_DESCRIPTION_COMPRESSION_LEVEL)
+
+    @staticmethod
+    def decompress_json(data):
+        return zlib.decompress(data).decode() if data is not None else '""'
+
+    @property
+    def text(self):
+        return json.loads(self.decompress_json(self.data))
+
+
+class GameDocument(models.Model):
+    # Ready-to-send JSON for a game without its description, rebuilt from signals and `manage.py rebuild_game_documents`
+    game = models.OneToOneField(Game, on_delete=models.CASCADE, primary_key=True, related_name='document')
+    data = models.TextField()
+
+
+class Job(models.Model):
+    # Background job run by `manage.py run_workers`, see jobs.py
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+
+    STATUS_CHOICES = [
+        (QUEUED, 'Queued'),
+        (RUNNING, 'Running'),
+        (DONE, 'Done'),
+        (FAILED, 'Failed'),
+    ]
+
+    kind = models.CharField(max_length=50)
+    params = models.JSONField(default=dict, blank=True)
+
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=QUEUED)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    max_attempts = models.PositiveSmallIntegerField(default=3)
+    run_after = models.DateTimeField(default=timezone.now)
+
+    progress = models.FloatField(default=0)
+    result_file = models.CharField(max_length=255, blank=True)
+    error = models.TextField(blank=True)
+
+    worker = models.CharField(max_length=100, blank=True)
+    heartbeat_at = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'run_after'], name='job_status_run_after_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.kind} #{self.id} ({self.status})'
+
+
+class IdempotencyKey(models.Model):
+    # First response to a write carrying an Idempotency-Key header, see idempotency.py
+    key = models.CharField(max_length=64, primary_key=True)
+    fingerprint = models.CharField(max_length=64)
+    status_code = models.PositiveSmallIntegerField(null=True, blank=True)
+    content = models.BinaryField(blank=True)
+    content_type = models.CharField(max_length=100, blank=True)
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['created_at'], name='idempotency_created_idx'),
+        ]
+
+
+class CatalogEvent(models.Model):
+    # Change to games, publishers or their links, relayed to /api/events subscribers by events.py
+    GAME = 'game'
+    PUBLISHER = 'publisher'
+    LINK = 'link'
+
+    KIND_CHOICES = [
+        (GAME, 'Game'),
+        (PUBLISHER, 'Publisher'),
+        (LINK, 'Link'),
+    ]
+
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    action = models.CharField(max_length=10)
+    data = models.JSONField(default=dict)
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['created_at'], name='catalog_event_created_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.kind}.{self.action} #{self.id}'
+
+
+class ReleaseRollup(models.Model):
+    # Games released per year along one dimension, maintained by rollups.py
+    GENRE = 'genre'
+    PUBLISHER = 'publisher'
+    PLATFORM = 'platform'
+
+    DIMENSION_CHOICES = [
+        (GENRE, 'Genre'),
+        (PUBLISHER, 'Publisher'),
+        (PLATFORM, 'Platform'),
+    ]
+
+    dimension = models.CharField(max_length=10, choices=DIMENSION_CHOICES)
+    year = models.SmallIntegerField()
+    key = models.CharField(max_length=100)
+    count = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['dimension', 'year', 'key'], name='unique_release_rollup'),
+        ]
+
+    def __str__(self):
+        return f'{self.dimension} {self.key} {self.year}: {self.count}'
@@ -0,0 +1,118 @@
+import logging
+import re
+import threading
+import traceback
+from collections import Counter
+from contextlib import ExitStack, contextmanager
+
+from django.conf import settings
+from django.db import connections
+
+# Opt-in N+1 query detector.
+#
+# Every SQL statement is reduced to a fingerprint (literals, parameters and IN
+# lists replaced by '?'); when the same fingerprint runs NPLUSONE_THRESHOLD
+# times within one request or block, the project stack that issued it is
+# reported. NPLUSONE_DETECTION selects 'off', 'log' or 'raise'.
+
+logger = logging.getLogger('NPlusOneLog: ')
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r'\b\d+(?:\.\d+)?\b')
+_IN_LIST = re.compile(r'\bIN\s*\((?:\s*\?\s*,?)+\)', re.IGNORECASE)
+_PLACEHOLDER = re.compile(r'%s|\?')
+_SPACES = re.compile(r'\s+')
+
+
+class NPlusOneError(AssertionError):
+    pass
+
+
+def fingerprint(sql):
+    sql = _STRING.sub('?', sql)
+    sql = _NUMBER.sub('?', sql)
+    sql = _PLACEHOLDER.sub('?', sql)
+    sql = _IN_LIST.sub('IN (?)', sql)
+    return _SPACES.sub(' ', sql).strip()
+
+
+def _project_stack():
+    # Frames from the project itself, without Django, DRF or this module
+    base_dir = str(settings.BASE_DIR)
+    return [
+        frame for frame in traceback.extract_stack()
+        if frame.filename.startswith(base_dir)
+        and 'site-packages' not in frame.filename
+        and frame.filename != __file__
+    ]
+
+
+class QueryWatcher:
+
+    def __init__(self, threshold=None):
+        self.threshold = threshold or settings.NPLUSONE_THRESHOLD
+        self.counts = Counter()
+        self.stacks = {}
+        self._thread = threading.get_ident()
+
+    def __call__(self, execute, sql, params, many, context):
+        # connection.execute_wrapper hook
+        if threading.get_ident() == self._thread:
+            shape = fingerprint(sql)
+            self.counts[shape] += 1
+            if self.counts[shape] == self.threshold:
+                self.stacks[shape] = _project_stack()
+
+        return execute(sql, params, many, context)
+
+    @property
+    def violations(self):
+        return [(shape, self.counts[shape], stack) for shape, stack in self.stacks.items()]
+
+    def report(self):
+        lines = []
+        for shape, count, stack in self.violations:
+            lines.append(f'{count}x {shape}')
+            lines.extend(f'    {line.rstrip()}' for line in traceback.format_list(stack))
+        return '\n'.join(lines)
+
+
+@contextmanager
+def watch_queries(threshold=None):
+    watcher = QueryWatcher(threshold)
+    with ExitStack() as stack:
+        for alias in connections:
+            stack.enter_context(connections[alias].execute_wrapper(watcher))
+        yield watcher
+
+
+@contextmanager
+def assert_no_n_plus_one(threshold=None):
+    # For tests: fails when any query shape repeats threshold times in the block
+    with watch_queries(threshold) as watcher:
+        yield watcher
+
+    if watcher.violations:
+        raise NPlusOneError(f'Repeated queries detected:\n{watcher.report()}')
+
+
+class NPlusOneMiddleware:
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        mode = getattr(settings, 'NPLUSONE_DETECTION', 'off')
+        if mode == 'off':
+            return self.get_response(request)
+
+        with watch_queries() as watcher:
+            response = self.get_response(request)
+
+        if watcher.violations:
+            message = f'Repeated queries in {request.method} {request.path}:\n{watcher.report()}'
+            if mode == 'raise':
+                raise NPlusOneError(message)
+            logger.warning(message)
+
+        return response
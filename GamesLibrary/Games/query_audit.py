@@ -0,0 +1,326 @@
+import json
+import random
+import re
+from contextlib import ExitStack
+from datetime import date, timedelta
+
+from django.db import connections, transaction
+from django.test import Client, override_settings
+from django.urls import reverse
+
+from . import urls
+from .models import Game, Job, Publisher
+from .sharding import game_databases
+from .suggest import title_index
+
+# Query plan audit of the read endpoints (`manage.py audit_queries`).
+#
+# Every GET route in Games/urls.py is requested with sample arguments (and the
+# query variants below), the SELECT statements it runs are captured per
+# database alias and explained with the backend's EXPLAIN. Plans reading a
+# whole table or sorting through a temporary structure become findings such as
+# "Games_game: temp b-tree for ORDER BY", keyed by request. The findings are
+# compared against a baseline file holding the known ones per database vendor,
+# so only new findings count as regressions.
+
+SKIPPED = {
+    'events': 'endless event stream, served through ASGI only',
+    'job-result': 'serves a job result file',
+}
+
+# Query strings requested per URL name besides the plain request; values are formatted with the samples
+VARIANTS = {
+    'publisher': [{'ordering': 'location,name'}, {'ordering': '-name'}],
+    'publisher-batch': [{'ids': '{publisher_ids}'}],
+    'publisher-location': [{'ordering': 'name'}],
+    'publisher-games': [{'ordering': '-release_date,title'}, {'stream': 'true'}],
+    'publisher-related': [{'hops': '2'}],
+    'game': [{'ordering': 'title'}, {'ordering': '-release_date,title'}, {'include': 'description'},
+             {'stream': 'true'}],
+    'game-batch': [{'ids': '{game_ids}', 'include': 'description'}],
+    'game-suggest': [{'q': '{title_prefix}'}],
+    'game-genre': [{'ordering': '-release_date,title'}],
+    'stats-publishers': [{'key': '{publisher}'}],
+}
+
+# Variants replacing the plain request, for routes that need query parameters
+REQUIRED = {'publisher-batch', 'game-batch', 'game-suggest'}
+
+AUDIT_SETTINGS = {
+    'METRICS_ENABLED': False,
+    'REQUEST_COALESCING': False,
+    'CATALOG_SNAPSHOT_READS': False,
+    'SUGGEST_INDEX_ASYNC_BUILD': False,
+}
+
+GENRES = ('Action', 'Adventure', 'Puzzle', 'Racing', 'Strategy', 'Simulation', 'Sports', 'RPG')
+LOCATIONS = ('Seattle, USA', 'Kyoto, Japan', 'Montreal, Canada', 'Warsaw, Poland', 'Stockholm, Sweden')
+
+FROM_TABLE = re.compile(r'\bFROM\s+[`"]?(\w+)', re.IGNORECASE)
+
+
+def seed_catalog(games=1000, seed=0):
+    # Publishers, games with links and descriptions, similar games and a job; signals fill the derived tables
+    from .similarity import refresh_similar_games
+
+    generator = random.Random(seed)
+
+    with transaction.atomic():
+        publishers = [
+            Publisher.objects.create(
+                name=f'Publisher {n:04}',
+                location=LOCATIONS[n % len(LOCATIONS)],
+                website=f'https://publisher{n:04}.example.com',
+            )
+            for n in range(max(5, games // 20))
+        ]
+
+        for n in range(games):
+            game = Game(
+                title=f'Game {n:05}',
+                release_date=date(1995, 1, 1) + timedelta(days=generator.randrange(10000)),
+                genre=generator.choice(GENRES),
+                onWindows=True,
+                onMac=generator.random() < 0.4,
+                onLinux=generator.random() < 0.3,
+            )
+            game.description = f'Seeded game number {n}.'
+            game.save()
+            game.publisher.set(generator.sample(publishers, generator.randint(1, 3)))
+
+        Job.objects.create(kind='export', status=Job.DONE, progress=1)
+
+    refresh_similar_games(full=True)
+    analyze()
+
+
+def analyze():
+    # Planner statistics, so plans match a database that has been in use
+    for alias in {'default', *game_databases()}:
+        connection = connections[alias]
+        if connection.vendor in ('sqlite', 'postgresql'):
+            with connection.cursor() as cursor:
+                cursor.execute('ANALYZE')
+
+
+def samples():
+    game = Game.objects.using(game_databases()[0]).order_by('id').values('id', 'title', 'genre').first()
+    publisher = Publisher.objects.order_by('id').values('id', 'location').first()
+    job = Job.objects.order_by('id').values_list('id', flat=True).first()
+
+    game_ids = sorted(
+        id for alias in game_databases()
+        for id in Game.objects.using(alias).order_by('id').values_list('id', flat=True)[:50]
+    )[:50]
+    publisher_ids = Publisher.objects.order_by('id').values_list('id', flat=True)[:50]
+
+    return {
+        'game': game['id'] if game else 0,
+        'title_prefix': game['title'][:4] if game else 'a',
+        'genre': game['genre'] if game else 'none',
+        'publisher': publisher['id'] if publisher else 0,
+        'location': publisher['location'] if publisher else 'none',
+        'job': job or 0,
+        'game_ids': ','.join(map(str, game_ids)) or '0',
+        'publisher_ids': ','.join(map(str, publisher_ids)) or '0',
+    }
+
+
+def read_routes():
+    # URL patterns of the routes answering GET
+    for pattern in urls.urlpatterns:
+        view_class = getattr(pattern.callback, 'view_class', None)
+        if view_class is None or hasattr(view_class, 'get'):
+            yield pattern
+
+
+def route_kwargs(pattern, values):
+    # Sample URL arguments; an `id` belongs to the resource named by the URL name prefix
+    kwargs = {}
+    for name in pattern.pattern.converters:
+        key = pattern.name.split('-')[0] if name == 'id' else name
+        if key not in values:
+            return None
+        kwargs[name] = values[key]
+    return kwargs
+
+
+def audit_requests(values):
+    # Yields (request key, path, query) for every audited request and (request key, None, reason) for skipped ones
+    for pattern in read_routes():
+        if pattern.name in SKIPPED:
+            yield pattern.name, None, SKIPPED[pattern.name]
+            continue
+
+        kwargs = route_kwargs(pattern, values)
+        if kwargs is None:
+            yield pattern.name, None, 'no sample value for its URL arguments'
+            continue
+
+        path = reverse(pattern.name, kwargs=kwargs)
+        variants = VARIANTS.get(pattern.name, [])
+        if pattern.name not in REQUIRED:
+            variants = [{}, *variants]
+
+        for variant in variants:
+            query = {name: value.format(**values) for name, value in variant.items()}
+            key = pattern.name
+            if variant:
+                key += '?' + '&'.join(f'{name}={value}' for name, value in variant.items())
+            yield key, path, query
+
+
+class _StatementRecorder:
+
+    def __init__(self, alias, statements):
+        self.alias = alias
+        self.statements = statements
+
+    def __call__(self, execute, sql, params, many, context):
+        if not many and sql.lstrip().upper().startswith(('SELECT', 'WITH')):
+            self.statements.append((self.alias, sql, params))
+        return execute(sql, params, many, context)
+
+
+def capture(client, path, query):
+    # (response status, [(alias, sql, params)]) of one request, streamed bodies included
+    statements = []
+    with ExitStack() as stack:
+        for alias in connections:
+            stack.enter_context(connections[alias].execute_wrapper(_StatementRecorder(alias, statements)))
+        response = client.get(path, query)
+        if response.streaming:
+            b''.join(response.streaming_content)
+    return response.status_code, statements
+
+
+def explain(alias, sql, params):
+    connection = connections[alias]
+    vendor = connection.vendor
+
+    with connection.cursor() as cursor:
+        if vendor == 'sqlite':
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}', params)
+            return sqlite_findings(detail for _, _, _, detail in cursor.fetchall())
+
+        if vendor == 'postgresql':
+            cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+            plan = cursor.fetchone()[0]
+            if isinstance(plan, str):
+                plan = json.loads(plan)
+            return postgresql_findings(plan[0]['Plan'])
+
+        if vendor == 'mysql':
+            cursor.execute(f'EXPLAIN {sql}', params)
+            columns = [column[0].lower() for column in cursor.description]
+            return mysql_findings(dict(zip(columns, row)) for row in cursor.fetchall())
+
+    raise NotImplementedError(f'No query plan audit for {vendor} databases.')
+
+
+def sqlite_findings(details):
+    findings = []
+    for detail in details:
+        # "SCAN Games_game" reads the whole table, "SCAN Games_game USING INDEX ..." walks an index in order
+        match = re.match(r'SCAN (?:TABLE )?(\S+)(.*)', detail)
+        if match and 'USING' not in match.group(2) and match.group(1) != 'CONSTANT':
+            findings.append(f'full scan {match.group(1)}')
+
+        match = re.match(r'USE TEMP B-TREE FOR (.+)', detail)
+        if match:
+            findings.append(f'temp b-tree for {match.group(1)}')
+    return findings
+
+
+def postgresql_findings(node):
+    findings = []
+    if node['Node Type'] == 'Seq Scan':
+        findings.append(f'full scan {node["Relation Name"]}')
+    elif node['Node Type'] in ('Sort', 'Incremental Sort'):
+        findings.append(f'sort on {", ".join(node.get("Sort Key", []))}')
+
+    for child in node.get('Plans', []):
+        findings.extend(postgresql_findings(child))
+    return findings
+
+
+def mysql_findings(rows):
+    findings = []
+    for row in rows:
+        extra = row.get('extra') or ''
+        if row.get('type') == 'ALL':
+            findings.append(f'full scan {row["table"]}')
+        if 'Using filesort' in extra:
+            findings.append(f'filesort on {row["table"]}')
+        if 'Using temporary' in extra:
+            findings.append(f'temporary table for {row["table"]}')
+    return findings
+
+
+def audit():
+    # {request key: {'path', 'status', 'statements', 'findings'}} plus {request key: skip reason}
+    results, skipped = {}, {}
+    client = Client(SERVER_NAME='localhost')
+
+    with override_settings(**AUDIT_SETTINGS):
+        title_index.clear()
+        values = samples()
+
+        for key, path, query in audit_requests(values):
+            if path is None:
+                skipped[key] = query
+                continue
+
+            status_code, statements = capture(client, path, query)
+
+            findings, explained = set(), []
+            for alias, sql, params in statements:
+                if (alias, sql) in explained:
+                    continue
+                explained.append((alias, sql))
+
+                match = FROM_TABLE.search(sql)
+                table = match.group(1) if match else '?'
+                findings.update(f'{table}: {finding}' for finding in explain(alias, sql, params))
+
+            if status_code >= 400:
+                findings.add(f'status {status_code}')
+
+            results[key] = {
+                'path': path,
+                'status': status_code,
+                'statements': [sql for _, sql in explained],
+                'findings': sorted(findings),
+            }
+
+        title_index.clear()
+
+    return results, skipped
+
+
+def load_baseline(path, vendor):
+    with open(path) as file:
+        return json.load(file).get(vendor)
+
+
+def save_baseline(path, vendor, results):
+    try:
+        with open(path) as file:
+            baselines = json.load(file)
+    except FileNotFoundError:
+        baselines = {}
+
+    baselines[vendor] = {key: result['findings'] for key, result in sorted(results.items())}
+    with open(path, 'w') as file:
+        json.dump(baselines, file, indent=2, sort_keys=True)
+        file.write('\n')
+
+
+def regressions(results, baseline):
+    # {request key: findings not in the baseline}
+    changes = {}
+    for key, result in results.items():
+        new = sorted(set(result['findings']) - set(baseline.get(key, [])))
+        if new:
+            changes[key] = new
+    return changes
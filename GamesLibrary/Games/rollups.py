@@ -0,0 +1,146 @@
+from collections import Counter
+
+from django.db import transaction
+from django.db.models import Case, Count, F, IntegerField, Q, Value, When
+from django.db.models.functions import ExtractYear
+
+from .models import Game, ReleaseRollup
+from .sharding import game_databases, ids_by_shard, shard_for, shard_games
+
+# Incrementally maintained release rollups.
+#
+# Every game contributes 1 to (genre, year, genre), (platform, year, platform)
+# for each of its platforms and (publisher, year, publisher id) for each of its
+# publishers. Signal handlers compute the contributions before and after a
+# change and apply only the difference, so dashboards never scan Game.
+
+PLATFORMS = (('onWindows', 'Windows'), ('onMac', 'Mac'), ('onLinux', 'Linux'))
+
+
+def game_contributions(release_date, genre, on_windows, on_mac, on_linux):
+    # Contributions of a game's own columns; publishers are handled through the links
+    year = release_date.year
+    contributions = Counter({(ReleaseRollup.GENRE, year, genre): 1})
+    for enabled, (_, platform) in zip((on_windows, on_mac, on_linux), PLATFORMS):
+        if enabled:
+            contributions[(ReleaseRollup.PLATFORM, year, platform)] += 1
+    return contributions
+
+
+def instance_contributions(game):
+    return game_contributions(game.release_date, game.genre, game.onWindows, game.onMac, game.onLinux)
+
+
+def stored_contributions(game_id):
+    # (contributions, release year) of the game as currently stored
+    row = shard_games(game_id).filter(id=game_id).values_list(
+        'release_date', 'genre', 'onWindows', 'onMac', 'onLinux'
+    ).first()
+    return (Counter(), None) if row is None else (game_contributions(*row), row[0].year)
+
+
+def linked_pairs(game_id):
+    return [
+        (game_id, publisher_id) for publisher_id in
+        Game.publisher.through.objects.using(shard_for(game_id))
+        .filter(game_id=game_id).values_list('publisher_id', flat=True)
+    ]
+
+
+def publisher_contributions(pairs, years):
+    # pairs: (game_id, publisher_id); years: game_id -> release year
+    return Counter(
+        (ReleaseRollup.PUBLISHER, years[game_id], str(publisher_id))
+        for game_id, publisher_id in pairs if game_id in years
+    )
+
+
+def release_years(game_ids):
+    years = {}
+    for alias, shard_ids in ids_by_shard(game_ids).items():
+        years.update(
+            Game.objects.using(alias).filter(id__in=shard_ids)
+            .annotate(year=ExtractYear('release_date'))
+            .values_list('id', 'year')
+        )
+    return years
+
+
+DELTA_BATCH_SIZE = 100
+
+
+def _matching(key_fields, keys):
+    condition = Q()
+    for key in keys:
+        condition |= Q(**dict(zip(key_fields, key)))
+    return condition
+
+
+def apply_count_deltas(model, key_fields, deltas, count_field='count'):
+    # Adds each non-zero delta to the row matching its key, creating rows as needed and dropping empty ones.
+    # Per batch of keys: one INSERT of the missing rows, one UPDATE adding a CASE of the deltas and
+    # one DELETE of the rows left empty, whatever the number of keys
+    changed = [(key, delta) for key, delta in deltas.items() if delta]
+
+    for start in range(0, len(changed), DELTA_BATCH_SIZE):
+        batch = changed[start:start + DELTA_BATCH_SIZE]
+
+        with transaction.atomic():
+            # Rows created concurrently are left alone and get their delta from the UPDATE
+            model.objects.bulk_create(
+                [model(**dict(zip(key_fields, key)), **{count_field: 0}) for key, delta in batch if delta > 0],
+                ignore_conflicts=True
+            )
+
+            rows = model.objects.filter(_matching(key_fields, [key for key, _ in batch]))
+            rows.update(**{count_field: F(count_field) + Case(
+                *[When(**dict(zip(key_fields, key)), then=Value(delta)) for key, delta in batch],
+                default=Value(0), output_field=IntegerField()
+            )})
+
+            if any(delta < 0 for _, delta in batch):
+                rows.filter(**{f'{count_field}__lte': 0}).delete()
+
+
+def apply_deltas(deltas):
+    apply_count_deltas(ReleaseRollup, ('dimension', 'year', 'key'), deltas)
+
+
+def difference(new, old):
+    deltas = Counter(new)
+    deltas.subtract(old)
+    return deltas
+
+
+def rebuild_rollups():
+    # Recounts every rollup from the games, summing over the shards when sharding is enabled
+    counts = Counter()
+
+    for alias in game_databases():
+        games = Game.objects.using(alias).annotate(year=ExtractYear('release_date'))
+
+        genres = games.values_list('year', 'genre').annotate(count=Count('id'))
+        counts.update({(ReleaseRollup.GENRE, year, genre): count for year, genre, count in genres})
+
+        links = (
+            Game.publisher.through.objects.using(alias).annotate(year=ExtractYear('game__release_date'))
+            .values_list('year', 'publisher_id').annotate(count=Count('id'))
+        )
+        counts.update({
+            (ReleaseRollup.PUBLISHER, year, str(publisher_id)): count for year, publisher_id, count in links
+        })
+
+        for field, platform in PLATFORMS:
+            platforms = games.filter(**{field: True}).values_list('year').annotate(count=Count('id'))
+            counts.update({(ReleaseRollup.PLATFORM, year, platform): count for year, count in platforms})
+
+    rows = [
+        ReleaseRollup(dimension=dimension, year=year, key=key, count=count)
+        for (dimension, year, key), count in counts.items()
+    ]
+
+    with transaction.atomic():
+        ReleaseRollup.objects.all().delete()
+        ReleaseRollup.objects.bulk_create(rows, batch_size=1000)
+
+    return len(rows)
@@ -1,14 +1,66 @@
+from django.conf import settings
 from rest_framework import serializers
-from .models import Publisher, Game
+from .models import Publisher, Game, Job
 
 
 class PublisherSerializer(serializers.ModelSerializer):
    class Meta:
        model = Publisher
-       fields = '__all__'
+       exclude = ['name_key', 'location_key']
+       read_only_fields = ['version']
 
 
 class GameSerializer(serializers.ModelSerializer):
+   platforms = serializers.ReadOnlyField(source='get_platforms')
+   description = serializers.CharField()
+
    class Meta:
        model = Game
-       fields = '__all__'
+       exclude = ['title_key']
+       read_only_fields = ['version']
+
+
+class GameSummarySerializer(GameSerializer):
+   # Games as listed: the description is only sent when asked for
+   description = None
+
+
+class JobSerializer(serializers.ModelSerializer):
+   class Meta:
+       model = Job
+       fields = [
+           'id', 'kind', 'params', 'status', 'attempts', 'max_attempts', 'progress',
+           'error', 'created_at', 'finished_at',
+       ]
+       read_only_fields = [field for field in fields if field not in ('kind', 'params')]
+
+
+class PublisherLinksSerializer(serializers.Serializer):
+   # Bulk link change: add/remove `publishers` on `games`, or move `games` (all by default) between two publishers
+   action = serializers.ChoiceField(choices=['add', 'remove', 'move'])
+   games = serializers.ListField(child=serializers.IntegerField(min_value=1), required=False, allow_empty=False)
+   publishers = serializers.ListField(child=serializers.IntegerField(min_value=1), required=False, allow_empty=False)
+   from_publisher = serializers.IntegerField(min_value=1, required=False)
+   to_publisher = serializers.IntegerField(min_value=1, required=False)
+
+   def validate_games(self, games):
+       games = list(dict.fromkeys(games))
+       if len(games) > settings.PUBLISHER_LINKS_MAX_GAMES:
+           raise serializers.ValidationError(f'At most {settings.PUBLISHER_LINKS_MAX_GAMES} games can be changed at once.')
+       return games
+
+   def validate_publishers(self, publishers):
+       publishers = list(dict.fromkeys(publishers))
+       if len(publishers) > settings.BATCH_MAX_IDS:
+           raise serializers.ValidationError(f'At most {settings.BATCH_MAX_IDS} publishers can be given at once.')
+       return publishers
+
+   def validate(self, data):
+       if data['action'] == 'move':
+           if 'from_publisher' not in data or 'to_publisher' not in data:
+               raise serializers.ValidationError('move needs from_publisher and to_publisher.')
+           if data['from_publisher'] == data['to_publisher']:
+               raise serializers.ValidationError('from_publisher and to_publisher must differ.')
+       elif 'games' not in data or 'publishers' not in data:
+           raise serializers.ValidationError(f'{data["action"]} needs games and publishers.')
+       return data
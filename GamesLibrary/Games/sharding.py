@@ -0,0 +1,128 @@
+import zlib
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, IntegrityError, transaction
+from django.db.models import F, Max
+
+from .models import Game, IdSequence, Publisher
+
+# Optional hash-sharded storage for games.
+#
+# With GAME_SHARDS set, every game lives in the shard picked by a hash of its
+# id, together with its publisher links, description and GameDocument. Ids
+# come from a global sequence in 'default' so they stay unique across shards.
+# Publishers stay in 'default' and are replicated to every shard, so links can
+# keep their foreign keys. Reads by id go straight to one shard; list reads
+# query every shard and merge the ordered results (see
+# documents.gather_game_fragments).
+# Links must be written from the game side (game.publisher.add/set/remove).
+
+SHARDED_MODELS = {'games.game', 'games.game_publisher', 'games.gamedescription', 'games.gamedocument'}
+
+GAME_SEQUENCE = 'game'
+
+
+def game_databases():
+    return list(settings.GAME_SHARDS) or [DEFAULT_DB_ALIAS]
+
+
+def shard_for(game_id):
+    shards = settings.GAME_SHARDS
+    if not shards:
+        return DEFAULT_DB_ALIAS
+    return shards[zlib.crc32(int(game_id).to_bytes(8, 'little', signed=True)) % len(shards)]
+
+
+def shard_games(game_id):
+    # Game queryset on the database holding game_id
+    return Game.objects.using(shard_for(game_id))
+
+
+def ids_by_shard(game_ids):
+    groups = {}
+    for game_id in game_ids:
+        groups.setdefault(shard_for(game_id), []).append(game_id)
+    return groups
+
+
+def _first_free_game_id():
+    highest = (
+        Game.objects.using(alias).aggregate(highest=Max('id'))['highest'] or 0
+        for alias in {DEFAULT_DB_ALIAS, *game_databases()}
+    )
+    return max(highest) + 1
+
+
+def allocate_game_ids(count):
+    # Reserves count consecutive game ids; the UPDATE runs first so concurrent callers serialize on it
+    sequences = IdSequence.objects.using(DEFAULT_DB_ALIAS).filter(name=GAME_SEQUENCE)
+
+    with transaction.atomic(using=DEFAULT_DB_ALIAS):
+        if not sequences.update(next_value=F('next_value') + count):
+            try:
+                with transaction.atomic(using=DEFAULT_DB_ALIAS):
+                    IdSequence.objects.using(DEFAULT_DB_ALIAS).create(
+                        name=GAME_SEQUENCE, next_value=_first_free_game_id() + count
+                    )
+            except IntegrityError:
+                # Created concurrently
+                sequences.update(next_value=F('next_value') + count)
+
+        next_value = sequences.values_list('next_value', flat=True).get()
+
+    return range(next_value - count, next_value)
+
+
+def replicate_publisher(publisher, using):
+    # Copies a publisher saved in 'default' to every shard
+    if using in settings.GAME_SHARDS:
+        return
+
+    fields = {
+        field.attname: getattr(publisher, field.attname)
+        for field in Publisher._meta.concrete_fields if not field.primary_key
+    }
+    for alias in settings.GAME_SHARDS:
+        Publisher.objects.using(alias).update_or_create(id=publisher.pk, defaults=fields)
+
+
+def delete_publisher_replicas(publisher, using):
+    # Deleting each replica cascades to the links in its shard and sends the usual signals
+    if using in settings.GAME_SHARDS:
+        return
+
+    for alias in settings.GAME_SHARDS:
+        for replica in Publisher.objects.using(alias).filter(id=publisher.pk):
+            replica.delete()
+
+
+class GameShardRouter:
+
+    def _shard(self, model, hints):
+        if not settings.GAME_SHARDS or model._meta.label_lower not in SHARDED_MODELS:
+            return None
+
+        instance = hints.get('instance')
+        if isinstance(instance, Game) and instance.pk is not None:
+            return shard_for(instance.pk)
+        if getattr(instance, 'game_id', None) is not None:
+            return shard_for(instance.game_id)
+
+        return None
+
+    def db_for_read(self, model, **hints):
+        return self._shard(model, hints)
+
+    def db_for_write(self, model, **hints):
+        return self._shard(model, hints)
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Publishers exist in every database, so they can be linked to games in any shard
+        if settings.GAME_SHARDS and Publisher in (type(obj1), type(obj2)):
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db in settings.GAME_SHARDS:
+            return app_label == 'Games'
+        return None
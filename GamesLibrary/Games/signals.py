@@ -0,0 +1,303 @@
+from collections import Counter
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+
+from .coalescing import bump_generation
+from .copublishers import apply_changes, publisher_sets
+from .documents import refresh_game_documents
+from .events import record_event
+from .links import links_changed
+from .models import CatalogEvent, Game, Publisher, ReleaseRollup, SimilarGame, SimilarityRefresh
+from .rollups import (
+    apply_deltas, difference, instance_contributions, linked_pairs,
+    publisher_contributions, release_years, stored_contributions,
+)
+from .sharding import delete_publisher_replicas, replicate_publisher
+from .snapshot import schedule_snapshot_rebuild
+from .suggest import title_index
+
+# Signal handlers keeping derived data in sync with the models.
+
+
+def queue_similarity_refresh(game_ids):
+    SimilarityRefresh.objects.bulk_create(
+        [SimilarityRefresh(game_id=game_id) for game_id in game_ids],
+        # A game queued again moves to the new time, so a refresh already under way keeps it queued
+        update_conflicts=True, update_fields=['queued_at'], unique_fields=['game_id']
+    )
+
+
+def catalog_changed():
+    # Called after any change to games, publishers or their links
+    transaction.on_commit(bump_generation)
+    schedule_snapshot_rebuild()
+
+
+def games_linked_changed(game_ids):
+    # Called once per change to the Game <-> Publisher links
+    game_ids = list(game_ids)
+    if not game_ids:
+        return
+
+    queue_similarity_refresh(game_ids)
+    refresh_game_documents(game_ids)
+    catalog_changed()
+
+
+@receiver(post_save, sender=Game)
+def update_title_index(sender, instance, using, **kwargs):
+    # Once committed, so a rolled back save leaves no suggestion behind
+    id, title = instance.id, instance.title
+    transaction.on_commit(lambda: title_index.upsert(id, title), using=using)
+
+
+@receiver(post_delete, sender=Game)
+def remove_from_title_index(sender, instance, using, **kwargs):
+    id = instance.id
+    transaction.on_commit(lambda: title_index.remove(id), using=using)
+
+
+@receiver(post_delete, sender=Game)
+@receiver(post_save, sender=Publisher)
+def catalog_row_changed(sender, instance, **kwargs):
+    catalog_changed()
+
+
+@receiver(post_save, sender=Game)
+def game_saved(sender, instance, **kwargs):
+    queue_similarity_refresh([instance.id])
+    refresh_game_documents([instance.id])
+    catalog_changed()
+
+
+@receiver(pre_delete, sender=Game)
+def game_deleted_refresh_similar(sender, instance, **kwargs):
+    # Lists pointing at the deleted game lose an entry through the cascade
+    queue_similarity_refresh(
+        SimilarGame.objects.filter(similar_id=instance.id).values_list('game_id', flat=True)
+    )
+
+
+@receiver(m2m_changed, sender=Game.publisher.through)
+def game_publishers_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if action == 'pre_clear' and reverse:
+        # Publisher.games.clear() does not report which games were unlinked
+        instance._cleared_game_ids = list(instance.games.values_list('id', flat=True))
+        return
+
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+
+    if not reverse:
+        games_linked_changed([instance.id])
+    elif action == 'post_clear':
+        games_linked_changed(getattr(instance, '_cleared_game_ids', []))
+    else:
+        games_linked_changed(pk_set or [])
+
+
+@receiver(links_changed)
+def links_changed_refresh(sender, added, removed, **kwargs):
+    # Bulk link changes from links.py, sent once for all games
+    games_linked_changed(sorted({game_id for game_id, _ in added + removed}))
+
+
+@receiver(pre_delete, sender=Publisher)
+def publisher_deleting(sender, instance, **kwargs):
+    # The cascade removes the links without sending m2m_changed
+    instance._linked_game_ids = list(instance.games.values_list('id', flat=True))
+
+
+@receiver(post_delete, sender=Publisher)
+def publisher_deleted(sender, instance, **kwargs):
+    games_linked_changed(getattr(instance, '_linked_game_ids', []))
+    catalog_changed()
+
+
+@receiver(post_save, sender=Publisher)
+def publisher_saved_replicas(sender, instance, using, raw=False, **kwargs):
+    if not raw:
+        replicate_publisher(instance, using)
+
+
+@receiver(post_delete, sender=Publisher)
+def publisher_deleted_replicas(sender, instance, using, **kwargs):
+    delete_publisher_replicas(instance, using)
+
+
+# -=-=- Release rollups -=-=-
+
+
+@receiver(pre_save, sender=Game)
+def game_saving_rollups(sender, instance, raw=False, **kwargs):
+    if instance.pk and not raw:
+        contributions, year = stored_contributions(instance.pk)
+        # Pairs counted under the stored year, which post_save moves when the year changes
+        moved = year is not None and year != instance.release_date.year
+        instance._rollup_before = contributions, year, linked_pairs(instance.pk) if moved else []
+
+
+@receiver(post_save, sender=Game)
+def game_saved_rollups(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+
+    before, old_year, pairs = getattr(instance, '_rollup_before', None) or (Counter(), None, [])
+    instance._rollup_before = None
+    deltas = difference(instance_contributions(instance), before)
+
+    new_year = instance.release_date.year
+    if old_year is not None and old_year != new_year:
+        # Publisher rows move to the new release year
+        deltas.update(publisher_contributions(pairs, {instance.id: new_year}))
+        deltas.subtract(publisher_contributions(pairs, {instance.id: old_year}))
+
+    apply_deltas(deltas)
+
+
+@receiver(pre_delete, sender=Game)
+def game_deleting_rollups(sender, instance, **kwargs):
+    contributions, year = stored_contributions(instance.pk)
+    contributions.update(publisher_contributions(linked_pairs(instance.pk), {instance.pk: year}))
+    instance._rollup_before = contributions
+
+
+@receiver(post_delete, sender=Game)
+def game_deleted_rollups(sender, instance, **kwargs):
+    apply_deltas(difference(Counter(), getattr(instance, '_rollup_before', None) or Counter()))
+
+
+@receiver(m2m_changed, sender=Game.publisher.through)
+def game_publishers_changed_rollups(sender, instance, action, reverse, pk_set, **kwargs):
+    def pairs_for(ids):
+        return [(id, instance.pk) if reverse else (instance.pk, id) for id in ids]
+
+    links = Game.publisher.through.objects.filter(**{'publisher_id' if reverse else 'game_id': instance.pk})
+    linked_column = 'game_id' if reverse else 'publisher_id'
+
+    if action == 'pre_remove':
+        # Only links that actually exist are removed
+        instance._rollup_removed = pairs_for(
+            links.filter(**{f'{linked_column}__in': pk_set}).values_list(linked_column, flat=True)
+        )
+    elif action == 'pre_clear':
+        instance._rollup_removed = pairs_for(links.values_list(linked_column, flat=True))
+    elif action == 'post_add' and pk_set:
+        pairs = pairs_for(pk_set)
+        apply_deltas(publisher_contributions(pairs, release_years(game_id for game_id, _ in pairs)))
+    elif action in ('post_remove', 'post_clear'):
+        pairs = getattr(instance, '_rollup_removed', [])
+        instance._rollup_removed = []
+        apply_deltas(difference(
+            Counter(), publisher_contributions(pairs, release_years(game_id for game_id, _ in pairs))
+        ))
+
+
+@receiver(links_changed)
+def links_changed_rollups(sender, added, removed, **kwargs):
+    years = release_years({game_id for game_id, _ in added + removed})
+    apply_deltas(difference(publisher_contributions(added, years), publisher_contributions(removed, years)))
+
+
+@receiver(post_delete, sender=Publisher)
+def publisher_deleted_rollups(sender, instance, **kwargs):
+    ReleaseRollup.objects.filter(dimension=ReleaseRollup.PUBLISHER, key=str(instance.pk)).delete()
+
+
+# -=-=- Co-publishing graph -=-=-
+
+
+@receiver(m2m_changed, sender=Game.publisher.through)
+def game_publishers_changed_copublishers(sender, instance, action, reverse, pk_set, **kwargs):
+    if action in ('pre_add', 'pre_remove'):
+        instance._copublishers_before = publisher_sets(pk_set if reverse else [instance.pk])
+    elif action == 'pre_clear':
+        game_ids = instance.games.values_list('id', flat=True) if reverse else [instance.pk]
+        instance._copublishers_before = publisher_sets(game_ids)
+    elif action in ('post_add', 'post_remove', 'post_clear'):
+        before = getattr(instance, '_copublishers_before', None) or {}
+        instance._copublishers_before = None
+        apply_changes(before, publisher_sets(before))
+
+
+@receiver(links_changed)
+def links_changed_copublishers(sender, added, removed, **kwargs):
+    # The publisher sets before the change follow from the ones after it
+    after = publisher_sets({game_id for game_id, _ in added + removed})
+    before = {game_id: set(publishers) for game_id, publishers in after.items()}
+    for game_id, publisher_id in added:
+        before[game_id].discard(publisher_id)
+    for game_id, publisher_id in removed:
+        before[game_id].add(publisher_id)
+    apply_changes(before, after)
+
+
+@receiver(pre_delete, sender=Game)
+def game_deleting_copublishers(sender, instance, **kwargs):
+    # The cascade removes the links without sending m2m_changed
+    instance._copublishers_before = publisher_sets([instance.pk])
+
+
+@receiver(post_delete, sender=Game)
+def game_deleted_copublishers(sender, instance, **kwargs):
+    before = getattr(instance, '_copublishers_before', None) or {}
+    apply_changes(before, {game_id: set() for game_id in before})
+
+
+# -=-=- Change events -=-=-
+
+
+@receiver(post_save, sender=Game)
+def game_saved_event(sender, instance, created, raw=False, **kwargs):
+    if not raw:
+        record_event(CatalogEvent.GAME, 'created' if created else 'updated', id=instance.id, version=instance.version)
+
+
+@receiver(post_delete, sender=Game)
+def game_deleted_event(sender, instance, **kwargs):
+    record_event(CatalogEvent.GAME, 'deleted', id=instance.id)
+
+
+@receiver(post_save, sender=Publisher)
+def publisher_saved_event(sender, instance, created, using, raw=False, **kwargs):
+    # Replicas written to the game shards are not changes of their own
+    if not raw and using not in settings.GAME_SHARDS:
+        record_event(
+            CatalogEvent.PUBLISHER, 'created' if created else 'updated', id=instance.id, version=instance.version
+        )
+
+
+@receiver(post_delete, sender=Publisher)
+def publisher_deleted_event(sender, instance, using, **kwargs):
+    if using not in settings.GAME_SHARDS:
+        record_event(CatalogEvent.PUBLISHER, 'deleted', id=instance.id)
+
+
+@receiver(m2m_changed, sender=Game.publisher.through)
+def game_publishers_changed_event(sender, instance, action, reverse, pk_set, **kwargs):
+    if action == 'pre_clear':
+        linked = instance.games if reverse else instance.publisher
+        instance._event_cleared_ids = list(linked.values_list('id', flat=True))
+        return
+
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+
+    ids = getattr(instance, '_event_cleared_ids', []) if action == 'post_clear' else sorted(pk_set or [])
+    if not ids:
+        return
+
+    games, publishers = (ids, [instance.pk]) if reverse else ([instance.pk], ids)
+    record_event(
+        CatalogEvent.LINK, 'added' if action == 'post_add' else 'removed', games=games, publishers=publishers
+    )
+
+
+@receiver(links_changed)
+def links_changed_event(sender, added, removed, **kwargs):
+    record_event(
+        CatalogEvent.LINK, 'changed', added=[list(pair) for pair in added], removed=[list(pair) for pair in removed]
+    )
@@ -0,0 +1,166 @@
+import logging
+
+import numpy as np
+from scipy import sparse
+
+from django.db import transaction
+
+from .models import Game, SimilarGame, SimilarityRefresh
+
+# Vectorized "similar games" computation.
+#
+# Every game becomes a sparse row of one-hot genre, multi-hot publishers and
+# platform flags, weighted per block and L2 normalized, so a batch of rows
+# multiplied by the transposed matrix gives cosine similarities against the
+# whole catalog at once. numpy/scipy are only needed here: this module is
+# imported by the management command, never by the views.
+
+logger = logging.getLogger('SimilarityLog: ')
+
+GENRE_WEIGHT = 1.0
+PUBLISHER_WEIGHT = 1.0
+PLATFORM_WEIGHT = 0.5
+
+PLATFORM_FIELDS = ('onWindows', 'onMac', 'onLinux')
+
+
+def build_feature_matrix():
+    # Returns (ids, matrix) where matrix row i describes the game ids[i]
+    rows = list(Game.objects.order_by('id').values_list('id', 'genre', *PLATFORM_FIELDS))
+    ids = np.fromiter((row[0] for row in rows), dtype=np.int64, count=len(rows))
+    position = {id: i for i, id in enumerate(ids.tolist())}
+
+    genres = {}
+    genre_column = np.fromiter(
+        (genres.setdefault(row[1].casefold(), len(genres)) for row in rows),
+        dtype=np.int64, count=len(rows)
+    )
+    platforms = np.array([row[2:] for row in rows], dtype=np.float64).reshape(len(rows), len(PLATFORM_FIELDS))
+
+    links = Game.publisher.through.objects.values_list('game_id', 'publisher_id')
+    link_rows, link_publishers = [], []
+    publishers = {}
+    for game_id, publisher_id in links.iterator(chunk_size=10000):
+        row = position.get(game_id)
+        if row is None:
+            # Game created after the games were read; it is queued for the next incremental run
+            continue
+        link_rows.append(row)
+        link_publishers.append(publishers.setdefault(publisher_id, len(publishers)))
+
+    n = len(rows)
+    genre_block = sparse.csr_matrix(
+        (np.full(n, GENRE_WEIGHT), (np.arange(n), genre_column)), shape=(n, max(len(genres), 1))
+    )
+    publisher_block = sparse.csr_matrix(
+        (np.full(len(link_rows), PUBLISHER_WEIGHT), (link_rows, link_publishers)),
+        shape=(n, max(len(publishers), 1))
+    )
+
+    # Spread the publisher weight over a game's publishers so co-published games don't dominate
+    publisher_counts = np.asarray(publisher_block.getnnz(axis=1), dtype=np.float64)
+    publisher_counts[publisher_counts == 0] = 1
+    publisher_block = sparse.diags(1 / np.sqrt(publisher_counts)) @ publisher_block
+
+    platform_block = sparse.csr_matrix(platforms * PLATFORM_WEIGHT)
+
+    matrix = sparse.hstack([genre_block, publisher_block, platform_block], format='csr')
+
+    norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=1)).ravel())
+    norms[norms == 0] = 1
+    matrix = sparse.diags(1 / norms) @ matrix
+
+    return ids, matrix.tocsr()
+
+
+def top_k_similar(ids, matrix, targets, k, batch_size):
+    # Yields (game_id, [(similar_id, score), ...]) for every target row index
+    transposed = matrix.T.tocsc()
+
+    for start in range(0, len(targets), batch_size):
+        batch = targets[start:start + batch_size]
+        scores = (matrix[batch] @ transposed).toarray()
+        scores[np.arange(len(batch)), batch] = -1
+
+        count = min(k, scores.shape[1] - 1)
+        if count <= 0:
+            for row in batch:
+                yield int(ids[row]), []
+            continue
+
+        # The count-th highest score of each row; among the games tied with it, the lowest ids
+        # (rows are in id order) fill the remaining places, so the cut does not depend on argpartition
+        cutoff = np.partition(scores, scores.shape[1] - count, axis=1)[:, scores.shape[1] - count, None]
+        above = scores > cutoff
+        tied = scores == cutoff
+        remaining = count - above.sum(axis=1, keepdims=True)
+        selected = above | (tied & (np.cumsum(tied, axis=1) <= remaining))
+
+        candidates = np.nonzero(selected)[1].reshape(len(batch), count)
+        candidate_scores = np.take_along_axis(scores, candidates, axis=1)
+
+        # Highest score first, lowest id first among ties
+        order = np.lexsort((ids[candidates], -candidate_scores), axis=1)
+        candidates = np.take_along_axis(candidates, order, axis=1)
+        candidate_scores = np.take_along_axis(candidate_scores, order, axis=1)
+
+        for row, columns, values in zip(batch, candidates, candidate_scores):
+            yield int(ids[row]), [
+                (int(ids[column]), float(value))
+                for column, value in zip(columns, values) if value > 0
+            ]
+
+
+def refresh_similar_games(full=False, k=10, batch_size=None):
+    # Recomputes the stored top-k lists; returns the number of games refreshed
+    if not full and not SimilarGame.objects.exists():
+        full = True
+
+    # Read first: games queued while the matrix is built stay queued for the next run. Queuing
+    # a game again moves its queued_at forward, so only the entries read here are removed
+    queued_at = dict(SimilarityRefresh.objects.values_list('game_id', 'queued_at'))
+    queued = list(queued_at)
+    processed = SimilarityRefresh.objects.filter(game_id__in=queued)
+    if queued:
+        processed = processed.filter(queued_at__lte=max(queued_at.values()))
+
+    ids, matrix = build_feature_matrix()
+    if not len(ids):
+        SimilarGame.objects.all().delete()
+        processed.delete()
+        return 0
+
+    if batch_size is None:
+        # Keep each dense score block around 128MB
+        batch_size = max(1, min(1024, 2 ** 24 // len(ids)))
+
+    if full:
+        target_ids = ids
+    else:
+        # Changed games plus every game whose stored list points at one of them
+        stale = SimilarGame.objects.filter(similar_id__in=queued).values_list('game_id', flat=True)
+        target_ids = np.array(sorted(set(queued) | set(stale)), dtype=np.int64)
+
+    targets = np.flatnonzero(np.isin(ids, target_ids))
+
+    with transaction.atomic():
+        if full:
+            SimilarGame.objects.all().delete()
+        else:
+            SimilarGame.objects.filter(game_id__in=target_ids.tolist()).delete()
+
+        batch = []
+        for game_id, similar in top_k_similar(ids, matrix, targets, k, batch_size):
+            batch.extend(
+                SimilarGame(game_id=game_id, similar_id=similar_id, rank=rank, score=score)
+                for rank, (similar_id, score) in enumerate(similar, start=1)
+            )
+            if len(batch) >= 5000:
+                SimilarGame.objects.bulk_create(batch)
+                batch = []
+
+        SimilarGame.objects.bulk_create(batch)
+        processed.delete()
+
+    logger.debug(f'Refreshed similar games for {len(targets)} games.')
+    return len(targets)
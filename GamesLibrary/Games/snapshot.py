@@ -0,0 +1,431 @@
+import json
+import logging
+import mmap
+import os
+import struct
+import tempfile
+import threading
+import time
+from array import array
+from bisect import bisect_left
+from contextvars import ContextVar
+from datetime import date
+from pathlib import Path
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+
+from .metrics import observe_cache
+from .models import Game, GameDescription, Publisher
+
+# Read-only catalog snapshot shared by every worker through mmap.
+#
+# The file holds fixed-width columns for games and publishers, one deduplicated
+# string table, and the Game <-> Publisher links as CSR adjacency arrays in both
+# directions, plus games grouped by genre and publishers grouped by location key.
+# Writers build a new file next to the old one and os.replace() it; readers
+# notice the new inode on their next lookup and remap. Columns use the host's
+# native byte order, the snapshot is meant to be shared on one machine only.
+#
+# A rebuild runs CATALOG_SNAPSHOT_REBUILD_DELAY seconds after a change commits,
+# and reads lag behind writes until it is swapped in. The client that wrote is
+# not left behind: successful writes set a cookie with the write time, and its
+# reads go to the database while the current snapshot started before that time.
+
+logger = logging.getLogger('SnapshotLog: ')
+
+MAGIC = b'GLSNAP\0\0'
+VERSION = 3
+
+# Wall-clock time of a client's last write, from WRITE_COOKIE
+WRITE_COOKIE = 'catalog_write'
+WRITE_COOKIE_AGE = 3600
+_client_write = ContextVar('catalog_client_write', default=None)
+
+# Section name -> array typecode
+SECTIONS = (
+    ('game_ids', 'q'),
+    ('game_release', 'i'),
+    ('game_flags', 'B'),
+    ('game_version', 'I'),
+    ('game_genre', 'I'),
+    ('game_title', 'I'),
+    ('game_description', 'I'),
+    ('publisher_ids', 'q'),
+    ('publisher_name', 'I'),
+    ('publisher_location', 'I'),
+    ('publisher_website', 'I'),
+    ('publisher_version', 'I'),
+    ('game_publisher_offsets', 'Q'),
+    ('game_publisher_rows', 'I'),
+    ('publisher_game_offsets', 'Q'),
+    ('publisher_game_rows', 'I'),
+    ('genre_names', 'I'),
+    ('genre_offsets', 'Q'),
+    ('genre_rows', 'I'),
+    ('location_keys', 'I'),
+    ('location_offsets', 'Q'),
+    ('location_rows', 'I'),
+    ('string_offsets', 'Q'),
+    ('string_data', 'B'),
+)
+
+# Magic, version, section count and the time the rebuild started reading the catalog
+HEADER = struct.Struct('<8sIId')
+SECTION_ENTRY = struct.Struct('<QQ')
+
+WINDOWS, MAC, LINUX = 1, 2, 4
+
+
+def _align(offset):
+    return (offset + 7) & ~7
+
+
+class _StringTable:
+
+    def __init__(self):
+        self.index = {}
+        self.offsets = array('Q', [0])
+        self.data = bytearray()
+
+    def add(self, value):
+        position = self.index.get(value)
+        if position is None:
+            position = self.index[value] = len(self.offsets) - 1
+            self.data += value.encode()
+            self.offsets.append(len(self.data))
+        return position
+
+
+def _grouped(keys):
+    # CSR grouping of row numbers by key: (sorted distinct keys, offsets, rows)
+    groups = {}
+    for row, key in enumerate(keys):
+        groups.setdefault(key, []).append(row)
+
+    names = sorted(groups)
+    offsets, rows = array('Q', [0]), array('I')
+    for name in names:
+        rows.extend(groups[name])
+        offsets.append(len(rows))
+
+    return names, offsets, rows
+
+
+def write_snapshot(path=None):
+    # Dumps the current catalog and atomically replaces the snapshot file
+    path = Path(path or settings.CATALOG_SNAPSHOT_PATH)
+    started_at = time.time()
+    strings = _StringTable()
+    columns = {name: array(typecode) for name, typecode in SECTIONS}
+
+    game_rows = {}
+    games = Game.objects.order_by('id').values_list(
+        'id', 'release_date', 'onWindows', 'onMac', 'onLinux', 'version', 'genre', 'title',
+        'compressed_description__data'
+    )
+    genres = []
+    for row, (id, release_date, on_windows, on_mac, on_linux, version, genre, title, description) in enumerate(
+        games.iterator(chunk_size=5000)
+    ):
+        game_rows[id] = row
+        columns['game_ids'].append(id)
+        columns['game_release'].append(release_date.toordinal())
+        columns['game_flags'].append(on_windows * WINDOWS | on_mac * MAC | on_linux * LINUX)
+        columns['game_version'].append(version)
+        columns['game_genre'].append(strings.add(genre))
+        columns['game_title'].append(strings.add(title))
+        columns['game_description'].append(strings.add(json.loads(GameDescription.decompress_json(description))))
+        genres.append(genre)
+
+    publisher_rows = {}
+    location_keys = []
+    publishers = Publisher.objects.order_by('id').values_list(
+        'id', 'name', 'location', 'location_key', 'website', 'version'
+    )
+    for row, (id, name, location, location_key, website, version) in enumerate(publishers.iterator(chunk_size=5000)):
+        publisher_rows[id] = row
+        columns['publisher_ids'].append(id)
+        columns['publisher_name'].append(strings.add(name))
+        columns['publisher_location'].append(strings.add(location))
+        columns['publisher_website'].append(strings.add(website))
+        columns['publisher_version'].append(version)
+        location_keys.append(location_key)
+
+    links = Game.publisher.through.objects.values_list('game_id', 'publisher_id')
+    game_links = [[] for _ in game_rows]
+    publisher_links = [[] for _ in publisher_rows]
+    for game_id, publisher_id in links.iterator(chunk_size=10000):
+        game_row, publisher_row = game_rows.get(game_id), publisher_rows.get(publisher_id)
+        if game_row is None or publisher_row is None:
+            continue
+        game_links[game_row].append(publisher_row)
+        publisher_links[publisher_row].append(game_row)
+
+    for prefix, adjacency in (('game_publisher', game_links), ('publisher_game', publisher_links)):
+        offsets, rows = columns[f'{prefix}_offsets'], columns[f'{prefix}_rows']
+        offsets.append(0)
+        for linked in adjacency:
+            rows.extend(sorted(linked))
+            offsets.append(len(rows))
+
+    names, columns['genre_offsets'], columns['genre_rows'] = _grouped(genres)
+    columns['genre_names'].extend(strings.add(name) for name in names)
+
+    names, columns['location_offsets'], columns['location_rows'] = _grouped(location_keys)
+    columns['location_keys'].extend(strings.add(name) for name in names)
+
+    columns['string_offsets'] = strings.offsets
+    columns['string_data'] = array('B', strings.data)
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    descriptor, temporary = tempfile.mkstemp(dir=path.parent, prefix=f'.{path.name}.')
+    try:
+        with os.fdopen(descriptor, 'wb') as snapshot_file:
+            offset = _align(HEADER.size + SECTION_ENTRY.size * len(SECTIONS))
+            directory = []
+            for name, _ in SECTIONS:
+                directory.append((offset, len(columns[name])))
+                offset = _align(offset + len(columns[name]) * columns[name].itemsize)
+
+            snapshot_file.write(HEADER.pack(MAGIC, VERSION, len(SECTIONS), started_at))
+            for entry in directory:
+                snapshot_file.write(SECTION_ENTRY.pack(*entry))
+
+            for (name, _), (offset, _) in zip(SECTIONS, directory):
+                snapshot_file.write(b'\0' * (offset - snapshot_file.tell()))
+                columns[name].tofile(snapshot_file)
+
+            snapshot_file.flush()
+            os.fsync(snapshot_file.fileno())
+
+        os.replace(temporary, path)
+
+    except BaseException:
+        os.unlink(temporary)
+        raise
+
+    logger.debug(f'Catalog snapshot written with {len(game_rows)} games and {len(publisher_rows)} publishers.')
+
+
+class Snapshot:
+
+    def __init__(self, path):
+        with open(path, 'rb') as snapshot_file:
+            stat = os.fstat(snapshot_file.fileno())
+            self.identity = (stat.st_ino, stat.st_mtime_ns)
+            self._mmap = mmap.mmap(snapshot_file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        view = memoryview(self._mmap)
+        magic, version, count, self.started_at = HEADER.unpack_from(view)
+        if magic != MAGIC or version != VERSION or count != len(SECTIONS):
+            raise ValueError(f'{path} is not a version {VERSION} catalog snapshot.')
+
+        for index, (name, typecode) in enumerate(SECTIONS):
+            offset, length = SECTION_ENTRY.unpack_from(view, HEADER.size + index * SECTION_ENTRY.size)
+            itemsize = array(typecode).itemsize
+            setattr(self, name, view[offset:offset + length * itemsize].cast(typecode))
+
+        self._genres = {self.string(index): position for position, index in enumerate(self.genre_names)}
+        self._locations = {self.string(index): position for position, index in enumerate(self.location_keys)}
+
+    def string(self, index):
+        return str(self.string_data[self.string_offsets[index]:self.string_offsets[index + 1]], 'utf-8')
+
+    # -=-=- Games -=-=-
+
+    def game(self, row, description=True):
+        flags = self.game_flags[row]
+        on_windows, on_mac, on_linux = bool(flags & WINDOWS), bool(flags & MAC), bool(flags & LINUX)
+        links = self.game_publisher_rows[self.game_publisher_offsets[row]:self.game_publisher_offsets[row + 1]]
+
+        game = {
+            'id': self.game_ids[row],
+            'platforms': [
+                platform for platform, enabled in
+                (('Windows', on_windows), ('Mac', on_mac), ('Linux', on_linux)) if enabled
+            ],
+            'title': self.string(self.game_title[row]),
+            'release_date': date.fromordinal(self.game_release[row]).isoformat(),
+            'genre': self.string(self.game_genre[row]),
+            'onWindows': on_windows,
+            'onMac': on_mac,
+            'onLinux': on_linux,
+            'version': self.game_version[row],
+            'publisher': [self.publisher_ids[link] for link in links],
+        }
+        if description:
+            game['description'] = self.string(self.game_description[row])
+        return game
+
+    def game_row(self, id):
+        row = bisect_left(self.game_ids, id)
+        if row < len(self.game_ids) and self.game_ids[row] == id:
+            return row
+        return None
+
+    def get_game(self, id):
+        row = self.game_row(id)
+        return None if row is None else self.game(row)
+
+    # Lists leave the descriptions out unless asked for, like the database path
+
+    def all_games(self, description=False):
+        return [self.game(row, description) for row in range(len(self.game_ids))]
+
+    def games_by_genre(self, genre, description=False):
+        position = self._genres.get(genre)
+        if position is None:
+            return []
+        start, end = self.genre_offsets[position], self.genre_offsets[position + 1]
+        return [self.game(row, description) for row in self.genre_rows[start:end]]
+
+    # -=-=- Publishers -=-=-
+
+    def publisher(self, row):
+        return {
+            'id': self.publisher_ids[row],
+            'name': self.string(self.publisher_name[row]),
+            'location': self.string(self.publisher_location[row]),
+            'website': self.string(self.publisher_website[row]),
+            'version': self.publisher_version[row],
+        }
+
+    def publisher_row(self, id):
+        row = bisect_left(self.publisher_ids, id)
+        if row < len(self.publisher_ids) and self.publisher_ids[row] == id:
+            return row
+        return None
+
+    def get_publisher(self, id):
+        row = self.publisher_row(id)
+        return None if row is None else self.publisher(row)
+
+    def all_publishers(self):
+        return [self.publisher(row) for row in range(len(self.publisher_ids))]
+
+    def publishers_by_location_key(self, location_key):
+        position = self._locations.get(location_key)
+        if position is None:
+            return []
+        start, end = self.location_offsets[position], self.location_offsets[position + 1]
+        return [self.publisher(row) for row in self.location_rows[start:end]]
+
+    def publisher_games(self, row, description=False):
+        start, end = self.publisher_game_offsets[row], self.publisher_game_offsets[row + 1]
+        return [self.game(game_row, description) for game_row in self.publisher_game_rows[start:end]]
+
+
+_current = None
+_current_lock = threading.Lock()
+
+
+def get_snapshot():
+    # The current snapshot, remapped when the file was swapped; None when reads are disabled
+    if not getattr(settings, 'CATALOG_SNAPSHOT_READS', False):
+        return None
+
+    snapshot = _load_snapshot()
+    if snapshot is not None and _predates_client_write(snapshot):
+        snapshot = None
+
+    observe_cache('catalog_snapshot', hits=snapshot is not None, misses=snapshot is None)
+    return snapshot
+
+
+def _predates_client_write(snapshot):
+    # Built from rows read before the client's last write
+    written = _client_write.get()
+    return written is not None and written >= snapshot.started_at
+
+
+def bypasses_snapshot():
+    # True when get_snapshot() sends this client's reads to the database although a snapshot is in use
+    if not getattr(settings, 'CATALOG_SNAPSHOT_READS', False) or _client_write.get() is None:
+        return False
+    snapshot = _load_snapshot()
+    return snapshot is not None and _predates_client_write(snapshot)
+
+
+def _load_snapshot():
+    global _current
+
+    try:
+        stat = os.stat(settings.CATALOG_SNAPSHOT_PATH)
+    except OSError:
+        return None
+
+    snapshot = _current
+    if snapshot is not None and snapshot.identity == (stat.st_ino, stat.st_mtime_ns):
+        return snapshot
+
+    with _current_lock:
+        try:
+            _current = Snapshot(settings.CATALOG_SNAPSHOT_PATH)
+        except (OSError, ValueError) as e:
+            logger.error(f'Error while loading catalog snapshot: {e}')
+            _current = None
+
+        return _current
+
+
+class SnapshotWriteMiddleware:
+    # Remembers when each client last wrote, so get_snapshot() can send its reads to the database
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not getattr(settings, 'CATALOG_SNAPSHOT_READS', False):
+            return self.get_response(request)
+
+        try:
+            written = float(request.COOKIES[WRITE_COOKIE])
+        except (KeyError, ValueError):
+            written = None
+
+        token = _client_write.set(written)
+        try:
+            response = self.get_response(request)
+        finally:
+            _client_write.reset(token)
+
+        if request.method not in ('GET', 'HEAD', 'OPTIONS') and response.status_code < 400:
+            # The view has committed by now
+            response.set_cookie(WRITE_COOKIE, repr(time.time()), max_age=WRITE_COOKIE_AGE, httponly=True)
+        return response
+
+
+class _RebuildScheduler:
+    # Coalesces bursts of catalog changes into one rebuild after a short delay
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._timer = None
+
+    def trigger(self):
+        with self._lock:
+            if self._timer is not None:
+                return
+            self._timer = threading.Timer(settings.CATALOG_SNAPSHOT_REBUILD_DELAY, self._run)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def _run(self):
+        with self._lock:
+            self._timer = None
+
+        try:
+            write_snapshot()
+        except Exception as e:
+            logger.error(f'Error while rebuilding catalog snapshot: {e}')
+        finally:
+            close_old_connections()
+
+
+rebuild_scheduler = _RebuildScheduler()
+
+
+def schedule_snapshot_rebuild():
+    if getattr(settings, 'CATALOG_SNAPSHOT_READS', False):
+        transaction.on_commit(rebuild_scheduler.trigger)
@@ -0,0 +1,198 @@
+import heapq
+import logging
+import threading
+from array import array
+from bisect import bisect_left
+from itertools import islice
+
+from django.conf import settings
+from django.db import close_old_connections
+
+from .metrics import observe_cache
+from .models import Game
+from .sharding import game_databases
+
+# In-process prefix index of Game titles used by the suggest endpoint.
+#
+# Entries are kept as one sorted list of "<casefolded title>\0<title>" strings
+# plus a parallel array of ids, so a lookup is a bisect followed by a short
+# forward scan and the whole index is two flat containers. An id -> entry dict
+# finds an entry to replace or remove by bisect as well. Saves and deletes
+# reach the index once their transaction commits. Changes made while
+# the index is being built are queued and replayed on top of the loaded
+# titles. Until the index is ready, lookups go to Game.title_key, the indexed
+# casefolded title, in the same order as the index.
+
+logger = logging.getLogger('SuggestLog: ')
+
+SEPARATOR = '\0'
+
+# Above every character, so [key, key + MAX_CHAR) holds the strings starting with key
+MAX_CHAR = '\U0010ffff'
+
+
+def _entry(title):
+    return f'{title.casefold()}{SEPARATOR}{title}'
+
+
+class TitleIndex:
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries = []
+        self._ids = array('q')
+        self._titles = {}
+        self._pending = []
+        self._ready = False
+        self._building = False
+
+    @property
+    def ready(self):
+        return self._ready
+
+    def build(self):
+        try:
+            self.install(self.load())
+        finally:
+            with self._lock:
+                # Still set when loading failed, so the next lookup tries again
+                if self._building:
+                    self._building = False
+                    self._pending = []
+
+    def load(self):
+        return sorted(
+            (_entry(title), id)
+            for alias in game_databases()
+            for id, title in Game.objects.using(alias).values_list('id', 'title').iterator(chunk_size=5000)
+        )
+
+    def install(self, pairs):
+        with self._lock:
+            self._entries = [entry for entry, _ in pairs]
+            self._ids = array('q', (id for _, id in pairs))
+            self._titles = {id: entry for entry, id in pairs}
+
+            # Saves and deletes that happened while the titles were read
+            for id, title in self._pending:
+                self._remove(id)
+                if title is not None:
+                    self._insert(id, title)
+            self._pending = []
+
+            self._ready = True
+            self._building = False
+
+        logger.debug(f'Title index built with {len(pairs)} entries.')
+
+    def ensure_built(self):
+        # Returns True when the index can answer lookups right now
+        if self._ready:
+            return True
+
+        with self._lock:
+            if self._building:
+                return False
+            self._building = True
+
+        if not getattr(settings, 'SUGGEST_INDEX_ASYNC_BUILD', True):
+            try:
+                self.build()
+            except Exception as e:
+                logger.error(f'Error while building title index: {e}')
+                return False
+            return True
+
+        threading.Thread(target=self._build_in_background, daemon=True).start()
+        return False
+
+    def _build_in_background(self):
+        try:
+            self.build()
+        except Exception as e:
+            logger.error(f'Error while building title index: {e}')
+        finally:
+            close_old_connections()
+
+    def clear(self):
+        with self._lock:
+            self._entries = []
+            self._ids = array('q')
+            self._titles = {}
+            self._pending = []
+            self._ready = False
+            self._building = False
+
+    def search(self, prefix, limit):
+        prefix = prefix.casefold()
+        results = []
+
+        with self._lock:
+            position = bisect_left(self._entries, prefix)
+            while position < len(self._entries) and len(results) < limit:
+                entry = self._entries[position]
+                if not entry.startswith(prefix):
+                    break
+                results.append({'id': self._ids[position], 'title': entry.split(SEPARATOR, 1)[1]})
+                position += 1
+
+        return results
+
+    def upsert(self, id, title):
+        self._change(id, title)
+
+    def remove(self, id):
+        self._change(id, None)
+
+    def _change(self, id, title):
+        # title None removes the game
+        with self._lock:
+            if self._building:
+                self._pending.append((id, title))
+            if not self._ready:
+                return
+
+            self._remove(id)
+            if title is not None:
+                self._insert(id, title)
+
+    def _insert(self, id, title):
+        entry = _entry(title)
+        position = bisect_left(self._entries, entry)
+        self._entries.insert(position, entry)
+        self._ids.insert(position, id)
+        self._titles[id] = entry
+
+    def _remove(self, id):
+        entry = self._titles.pop(id, None)
+        if entry is None:
+            return
+
+        position = bisect_left(self._entries, entry)
+        while self._ids[position] != id:
+            position += 1
+        del self._entries[position]
+        del self._ids[position]
+
+
+title_index = TitleIndex()
+
+
+def prefix_query(alias, prefix):
+    # (title_key, title, id) of the games whose title starts with prefix, ignoring case
+    key = prefix.casefold()
+    return (
+        Game.objects.using(alias).filter(title_key__gte=key, title_key__lt=key + MAX_CHAR)
+        .order_by('title_key', 'title').values_list('title_key', 'title', 'id')
+    )
+
+
+def suggest_titles(prefix, limit):
+    if title_index.ensure_built():
+        observe_cache('title_index', hits=1)
+        return title_index.search(prefix, limit)
+
+    observe_cache('title_index', misses=1)
+    # Cold index: a range scan on the (title_key, title) index, in the index's order
+    shards = [prefix_query(alias, prefix)[:limit] for alias in game_databases()]
+    return [{'id': id, 'title': title} for _, title, id in islice(heapq.merge(*shards), limit)]
@@ -0,0 +1,20 @@
+from datetime import date
+
+from Games.models import Game
+
+# Shared fixtures for the tests; the tests run with this directory as the top-level directory
+
+
+def create_game(title, genre="Puzzle", release_date=date(2022, 1, 1), onMac=False, publishers=()):
+    game = Game.objects.create(
+        title=title,
+        description="Sample description.",
+        release_date=release_date,
+        genre=genre,
+        onWindows=True,
+        onMac=onMac,
+        onLinux=False
+    )
+    if publishers:
+        game.publisher.set(publishers)
+    return game
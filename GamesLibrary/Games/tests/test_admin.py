@@ -0,0 +1,100 @@
+from datetime import date
+
+from django.contrib.admin import site
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from Games.models import Publisher, Game
+
+# Tests for the Game and Publisher admin changelists
+
+
+class GameAdminTest(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_superuser('admin', 'admin@example.com', 'password')
+        self.client.force_login(self.user)
+
+        publishers = [
+            Publisher.objects.create(
+                name=f"Publisher {i}",
+                location="Sample Location",
+                website=f"http://publisher{i}.com"
+            ) for i in range(3)
+        ]
+
+        for i in range(10):
+            game = Game.objects.create(
+                title=f"Game {i}",
+                description="Sample description.",
+                release_date=date(2022, 1, 1),
+                genre="Action",
+                onWindows=True,
+                onMac=False,
+                onLinux=True
+            )
+            game.publisher.set(publishers)
+
+    def test_game_changelist_query_count_independent_of_rows(self):
+        # Publishers are prefetched, so adding rows must not add queries
+        url = reverse('admin:Games_game_changelist')
+
+        with CaptureQueriesContext(connection) as few:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, "Publisher 0, Publisher 1, Publisher 2")
+
+        Game.objects.create(
+            title="Extra Game",
+            description="Sample description.",
+            release_date=date(2023, 1, 1),
+            genre="Action",
+            onWindows=True,
+            onMac=False,
+            onLinux=True
+        ).publisher.add(Publisher.objects.first())
+
+        with CaptureQueriesContext(connection) as more:
+            self.client.get(url)
+        self.assertEqual(len(few), len(more))
+
+    def test_publisher_autocomplete(self):
+        url = reverse('admin:autocomplete')
+        response = self.client.get(url, {
+            'term': 'publ',
+            'app_label': 'Games',
+            'model_name': 'game',
+            'field_name': 'publisher',
+        })
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([r['text'] for r in response.json()['results']], ["Publisher 0", "Publisher 1", "Publisher 2"])
+
+    def explain(self, queryset):
+        sql, params = queryset.query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}', params)
+            return ' '.join(str(row) for row in cursor.fetchall())
+
+    def test_game_search_by_title_prefix(self):
+        url = reverse('admin:Games_game_changelist')
+
+        response = self.client.get(url, {'q': 'GAME 1'})
+        self.assertContains(response, "Game 1")
+        self.assertNotContains(response, "Game 2")
+
+        queryset, _ = site._registry[Game].get_search_results(None, Game.objects.all(), 'game 1')
+        self.assertEqual(list(queryset.values_list('title', flat=True)), ["Game 1"])
+        self.assertNotIn('SCAN Games_game', self.explain(queryset))
+
+    def test_publisher_search_by_name_or_location_prefix(self):
+        Publisher.objects.create(name="Straße Games", location="São Paulo", website="http://strasse.com")
+        publishers = site._registry[Publisher]
+
+        for term, names in (('STRASSE', ["Straße Games"]), ('sao', ["Straße Games"]), ('publisher 1', ["Publisher 1"])):
+            queryset, _ = publishers.get_search_results(None, Publisher.objects.all(), term)
+            self.assertEqual(list(queryset.values_list('name', flat=True)), names, term)
+            self.assertNotIn('SCAN Games_publisher', self.explain(queryset))
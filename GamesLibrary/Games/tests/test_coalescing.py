@@ -0,0 +1,161 @@
+import hashlib
+import threading
+from datetime import date
+
+from django.core.cache import cache
+from django.test import SimpleTestCase, override_settings
+from django.urls import reverse
+
+from Games import coalescing
+from Games.coalescing import GENERATION_KEY, SingleFlight, stats
+from Games.models import Game
+
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+# Tests for single-flight request coalescing
+
+
+class SingleFlightTest(SimpleTestCase):
+
+    def test_concurrent_calls_share_one_computation(self):
+        flights = SingleFlight()
+        started, release = threading.Event(), threading.Event()
+        calls, results = [], []
+
+        def compute():
+            calls.append(1)
+            started.set()
+            release.wait(5)
+            return 'response', 'payload'
+
+        def call():
+            results.append(flights.do('key', compute, timeout=5))
+
+        leader = threading.Thread(target=call)
+        leader.start()
+        started.wait(5)
+
+        waiters = [threading.Thread(target=call) for _ in range(4)]
+        for waiter in waiters:
+            waiter.start()
+        while len(flights._flights['key'].done._cond._waiters) < 4:
+            pass
+
+        release.set()
+        for thread in [leader, *waiters]:
+            thread.join(5)
+
+        self.assertEqual(len(calls), 1)
+        self.assertCountEqual(results, [('payload', True)] * 4 + [(('response', 'payload'), False)])
+        self.assertEqual(flights._flights, {})
+
+    def test_waiters_compute_when_leader_fails(self):
+        flights = SingleFlight()
+        started, release = threading.Event(), threading.Event()
+        results = []
+
+        def failing():
+            started.set()
+            release.wait(5)
+            raise RuntimeError('boom')
+
+        def leader():
+            with self.assertRaises(RuntimeError):
+                flights.do('key', failing, timeout=5)
+
+        thread = threading.Thread(target=leader)
+        thread.start()
+        started.wait(5)
+
+        waiter = threading.Thread(target=lambda: results.append(flights.do('key', lambda: ('own', None), timeout=5)))
+        waiter.start()
+        release.set()
+        for each in (thread, waiter):
+            each.join(5)
+
+        self.assertEqual(results, [(('own', None), False)])
+
+
+class CoalescedViewTest(APITestCase):
+
+    def setUp(self):
+        Game.objects.create(
+            title="Portal",
+            description="Sample description.",
+            release_date=date(2007, 10, 10),
+            genre="Puzzle",
+            onWindows=True,
+            onMac=False,
+            onLinux=False
+        )
+
+    def test_sequential_requests_are_not_shared(self):
+        computed = stats['computed']
+
+        first = self.client.get(reverse('game'))
+        second = self.client.get(reverse('game'))
+
+        self.assertEqual(stats['computed'], computed + 2)
+        self.assertEqual(first.json(), second.json())
+        self.assertNotIn('X-Coalesced', second)
+
+    def lock_key(self):
+        key = f'{cache.get(GENERATION_KEY, 0)} GET {reverse("game")}?'
+        return f'coalesce:lock:{hashlib.sha256(key.encode()).hexdigest()}'
+
+    def test_generation_bumped_on_commit(self):
+        generation = coalescing._generation
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Game.objects.create(
+                title="Portal 2",
+                description="Sample description.",
+                release_date=date(2011, 4, 18),
+                genre="Puzzle",
+                onWindows=True,
+                onMac=False,
+                onLinux=False
+            )
+            # Requests made before the commit still read the old rows
+            self.assertEqual(coalescing._generation, generation)
+
+        self.assertGreater(coalescing._generation, generation)
+
+    @override_settings(REQUEST_COALESCING_CACHE_LOCK=True)
+    def test_response_shared_by_another_process(self):
+        # Another process holds the lock and has published its response
+        lock_key = self.lock_key()
+        cache.set(lock_key, 'other')
+        cache.set('coalesce:result:other', (200, b'[{"id": 1}]', 'application/json'))
+
+        try:
+            with self.assertNumQueries(0):
+                response = self.client.get(reverse('game'))
+        finally:
+            cache.delete_many([lock_key, 'coalesce:result:other'])
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response['X-Coalesced'], '1')
+        self.assertEqual(response.json(), [{'id': 1}])
+
+    @override_settings(REQUEST_COALESCING_CACHE_LOCK=True, REQUEST_COALESCING_WAIT=0.1)
+    def test_response_from_before_a_change_is_not_shared(self):
+        # Another process started its flight before a change committed in a third one
+        lock_key = self.lock_key()
+        cache.set(lock_key, 'other')
+        cache.set('coalesce:result:other', (200, b'[{"id": 1}]', 'application/json'))
+        self.addCleanup(cache.delete_many, [lock_key, 'coalesce:result:other'])
+
+        coalescing.bump_generation()
+        response = self.client.get(reverse('game'))
+
+        self.assertNotIn('X-Coalesced', response)
+        self.assertEqual(response.json()[0]['title'], 'Portal')
+
+    @override_settings(REQUEST_COALESCING_CACHE_LOCK=True)
+    def test_cache_lock_released_after_request(self):
+        response = self.client.get(reverse('game'))
+
+        self.assertEqual(response.json()[0]['title'], 'Portal')
+        self.assertIsNone(cache.get(self.lock_key()))
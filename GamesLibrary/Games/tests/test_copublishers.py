@@ -0,0 +1,99 @@
+from django.urls import reverse
+
+from Games.copublishers import rebuild_copublishers
+from Games.models import CoPublisher, Publisher
+
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from helpers import create_game
+
+# Tests for the publisher co-publishing graph and its endpoint
+
+
+class CoPublisherTest(APITestCase):
+
+    def graph(self):
+        return sorted(CoPublisher.objects.values_list('publisher_id', 'other_id', 'shared_games'))
+
+    def assert_matches_rebuild(self):
+        incremental = self.graph()
+        rebuild_copublishers()
+        self.assertEqual(incremental, self.graph())
+
+    def setUp(self):
+        self.valve = Publisher.objects.create(name="Valve", location="USA", website="http://valve.com")
+        self.ea = Publisher.objects.create(name="EA", location="USA", website="http://ea.com")
+        self.sega = Publisher.objects.create(name="Sega", location="Japan", website="http://sega.com")
+        self.atari = Publisher.objects.create(name="Atari", location="USA", website="http://atari.com")
+
+        self.portal = create_game("Portal")
+        self.portal.publisher.add(self.valve, self.ea)
+        self.orange_box = create_game("The Orange Box")
+        self.orange_box.publisher.add(self.valve, self.ea)
+        self.sonic = create_game("Sonic")
+        self.sonic.publisher.add(self.ea, self.sega)
+        self.pong = create_game("Pong")
+        self.pong.publisher.add(self.sega, self.atari)
+
+    def test_incremental_graph_matches_rebuild(self):
+        self.assertIn((self.valve.id, self.ea.id, 2), self.graph())
+        self.assert_matches_rebuild()
+
+        self.portal.publisher.remove(self.ea)
+        self.assert_matches_rebuild()
+
+        self.sega.games.add(self.portal, self.orange_box)
+        self.assert_matches_rebuild()
+
+        self.sega.games.remove(self.orange_box)
+        self.assert_matches_rebuild()
+
+        self.orange_box.publisher.clear()
+        self.assert_matches_rebuild()
+
+        self.ea.games.clear()
+        self.assert_matches_rebuild()
+
+        self.pong.delete()
+        self.assert_matches_rebuild()
+
+        self.valve.delete()
+        self.assert_matches_rebuild()
+
+        self.assertEqual(self.graph(), [])
+
+    def test_related_publishers(self):
+        response = self.client.get(reverse('publisher-related', args=[self.ea.id]))
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            response.json(),
+            {
+                'related': [
+                    {'id': self.valve.id, 'name': 'Valve', 'shared_games': 2},
+                    {'id': self.sega.id, 'name': 'Sega', 'shared_games': 1},
+                ]
+            }
+        )
+
+    def test_related_publishers_limit_and_two_hops(self):
+        response = self.client.get(reverse('publisher-related', args=[self.valve.id]), {'limit': 1, 'hops': 2})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json()['related'], [{'id': self.ea.id, 'name': 'EA', 'shared_games': 2}])
+        self.assertEqual(
+            response.json()['two_hop'], [{'id': self.sega.id, 'name': 'Sega', 'via': 1, 'shared_games': 1}]
+        )
+
+    def test_related_publishers_bad_parameters(self):
+        response = self.client.get(reverse('publisher-related', args=[self.valve.id]), {'hops': 3})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        response = self.client.get(reverse('publisher-related', args=[self.valve.id]), {'limit': 'many'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_related_publishers_not_found(self):
+        response = self.client.get(reverse('publisher-related', args=[999]))
+
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
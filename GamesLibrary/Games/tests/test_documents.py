@@ -0,0 +1,109 @@
+import json
+from datetime import date
+
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from Games.models import Publisher, Game, GameDocument
+from Games.serializers import GameSummarySerializer
+
+from rest_framework.test import APITestCase
+
+# Tests for the pre-serialized game documents
+
+
+class GameDocumentTest(TestCase):
+
+    def setUp(self):
+        self.publisher = Publisher.objects.create(
+            name="Sample Publisher",
+            location="Sample Location",
+            website="http://samplepublisher.com"
+        )
+        self.game = Game.objects.create(
+            title="Sample Game",
+            description="This is a sample game description.",
+            release_date=date(2022, 1, 1),
+            genre="Action",
+            onWindows=True,
+            onMac=False,
+            onLinux=True
+        )
+
+    def document(self):
+        return json.loads(GameDocument.objects.get(game=self.game).data)
+
+    def test_document_follows_game_and_links(self):
+        self.assertEqual(self.document()['publisher'], [])
+        self.assertEqual(self.document()['platforms'], ['Windows', 'Linux'])
+
+        self.game.publisher.add(self.publisher)
+        self.assertEqual(self.document()['publisher'], [self.publisher.id])
+
+        self.game.genre = "Adventure"
+        self.game.save()
+        self.assertEqual(self.document(), GameSummarySerializer(self.game).data)
+
+    def test_document_follows_reverse_clear_and_publisher_delete(self):
+        self.publisher.games.add(self.game)
+        self.publisher.games.clear()
+        self.assertEqual(self.document()['publisher'], [])
+
+        self.game.publisher.add(self.publisher)
+        self.publisher.delete()
+        self.assertEqual(self.document()['publisher'], [])
+
+    def test_rebuild_command(self):
+        GameDocument.objects.all().delete()
+
+        call_command('rebuild_game_documents', stdout=open('/dev/null', 'w'))
+
+        self.assertEqual(self.document(), GameSummarySerializer(self.game).data)
+
+
+class StreamingListTest(APITestCase):
+
+    def setUp(self):
+        self.publisher = Publisher.objects.create(
+            name="Sample Publisher",
+            location="Sample Location",
+            website="http://samplepublisher.com"
+        )
+        for number in range(5):
+            game = Game.objects.create(
+                title=f"Game {number}",
+                description="Sample description.",
+                release_date=date(2020 + number, 1, 1),
+                genre="Action",
+                onWindows=True,
+                onMac=False,
+                onLinux=True
+            )
+            game.publisher.add(self.publisher)
+
+    def streamed(self, response):
+        self.assertTrue(response.streaming)
+        return json.loads(b''.join(response.streaming_content))
+
+    @override_settings(LIST_STREAM_CHUNK_SIZE=2)
+    def test_stream_matches_full_response(self):
+        # Missing documents are rendered chunk by chunk while streaming
+        GameDocument.objects.filter(game__title__in=["Game 1", "Game 4"]).delete()
+
+        for params in ({}, {'ordering': '-release_date'}):
+            expected = self.client.get(reverse('game'), params).json()
+            streamed = self.streamed(self.client.get(reverse('game'), {**params, 'stream': 'true'}))
+            self.assertEqual(streamed, expected)
+
+        self.assertEqual(len(expected), 5)
+
+    def test_stream_publisher_games(self):
+        response = self.client.get(reverse('publisher-games', args=[self.publisher.id]), {'stream': '1'})
+
+        self.assertEqual([game['title'] for game in self.streamed(response)], [f"Game {n}" for n in range(5)])
+
+    def test_stream_empty_list(self):
+        Game.objects.all().delete()
+
+        self.assertEqual(self.streamed(self.client.get(reverse('game'), {'stream': 'true'})), [])
@@ -0,0 +1,192 @@
+import asyncio
+from datetime import date, timedelta
+
+from asgiref.sync import sync_to_async
+from django.db import transaction
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from Games import events
+from Games.events import Broadcaster, encode_event, get_broadcaster
+from Games.models import CatalogEvent, Game, Publisher
+
+from rest_framework import status
+
+# Tests for the Server-Sent Events stream of catalog changes
+
+
+class CatalogEventSignalsTest(TestCase):
+
+    def events(self):
+        return list(CatalogEvent.objects.order_by('id').values_list('kind', 'action', 'data'))
+
+    def test_changes_are_recorded_on_commit(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            publisher = Publisher.objects.create(name="Valve", location="USA", website="http://valve.com")
+            game = Game.objects.create(
+                title="Portal",
+                description="Sample description.",
+                release_date=date(2007, 10, 10),
+                genre="Puzzle",
+                onWindows=True,
+                onMac=False,
+                onLinux=False
+            )
+            self.assertEqual(self.events(), [])
+
+        game_id = game.id
+        with self.captureOnCommitCallbacks(execute=True):
+            game.publisher.add(publisher)
+            self.client.put(
+                reverse('game-id', args=[game_id]), {'genre': 'Action'}, content_type='application/json'
+            )
+            publisher.games.clear()
+            game.delete()
+
+        self.assertEqual(self.events(), [
+            ('publisher', 'created', {'id': publisher.id, 'version': 1}),
+            ('game', 'created', {'id': game_id, 'version': 1}),
+            ('link', 'added', {'games': [game_id], 'publishers': [publisher.id]}),
+            ('game', 'updated', {'id': game_id, 'version': 2}),
+            ('link', 'removed', {'games': [game_id], 'publishers': [publisher.id]}),
+            ('game', 'deleted', {'id': game_id}),
+        ])
+
+    def test_rolled_back_changes_are_not_recorded(self):
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            try:
+                with transaction.atomic():
+                    Publisher.objects.create(name="Valve", location="USA", website="http://valve.com")
+                    raise RuntimeError('rollback')
+            except RuntimeError:
+                pass
+
+        self.assertEqual(callbacks, [])
+        self.assertEqual(self.events(), [])
+
+    def test_expired_events_are_purged_without_subscribers(self):
+        old = CatalogEvent.objects.create(kind='game', action='deleted', data={'id': 1})
+        CatalogEvent.objects.filter(id=old.id).update(created_at=timezone.now() - timedelta(days=1))
+        events._last_purge = 0.0
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Publisher.objects.create(name="Valve", location="USA", website="http://valve.com")
+
+        self.assertFalse(CatalogEvent.objects.filter(id=old.id).exists())
+        self.assertEqual(CatalogEvent.objects.count(), 1)
+
+
+class EventGapTest(TestCase):
+
+    def frames(self, *ids):
+        return [(id, encode_event(id, 'game', 'updated', {})) for id in ids]
+
+    def test_events_after_a_gap_wait_for_it(self):
+        broadcaster = Broadcaster(None)
+        broadcaster.last_id = 10
+
+        # 12 may still be committing while 13 is already visible
+        self.assertEqual([id for id, _ in broadcaster.settled(self.frames(11, 13))], [11])
+        broadcaster.last_id = 11
+        self.assertEqual([id for id, _ in broadcaster.settled(self.frames(12, 13))], [12, 13])
+
+    @override_settings(EVENTS_GAP_TIMEOUT=0)
+    def test_gaps_that_never_fill_are_skipped(self):
+        broadcaster = Broadcaster(None)
+        broadcaster.last_id = 10
+
+        self.assertEqual([id for id, _ in broadcaster.settled(self.frames(13, 14, 20))], [13, 14, 20])
+
+
+@override_settings(EVENTS_POLL_INTERVAL=0.01)
+class EventStreamTest(TestCase):
+
+    async def read(self, stream):
+        return await asyncio.wait_for(anext(stream), 5)
+
+    async def connect(self, **headers):
+        response = await self.async_client.get(reverse('events'), headers=headers)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        stream = response.streaming_content
+        self.assertEqual(await self.read(stream), b'retry: 2000\n\n')
+        return stream
+
+    async def test_new_events_are_pushed(self):
+        stream = await self.connect()
+
+        event = await sync_to_async(CatalogEvent.objects.create)(kind='game', action='updated', data={'id': 7})
+        get_broadcaster().wake()
+
+        self.assertEqual(
+            await self.read(stream),
+            f'id: {event.id}\nevent: game.updated\ndata: {{"id":7}}\n\n'.encode()
+        )
+
+        # A client disconnect cancels the task sending the response
+        sending = asyncio.ensure_future(anext(stream))
+        await asyncio.sleep(0.05)
+        sending.cancel()
+        with self.assertRaises(asyncio.CancelledError):
+            await sending
+        self.assertEqual(get_broadcaster().subscribers, 0)
+
+    async def test_reconnect_with_last_event_id(self):
+        first = await self.connect()
+        events = [
+            await sync_to_async(CatalogEvent.objects.create)(kind='publisher', action='created', data={'id': number})
+            for number in range(3)
+        ]
+        get_broadcaster().wake()
+        await self.read(first)
+
+        second = await self.connect(**{'Last-Event-ID': str(events[0].id)})
+
+        chunk = await self.read(second)
+        self.assertNotIn(f'id: {events[0].id}\n'.encode(), chunk)
+        self.assertIn(f'id: {events[1].id}\n'.encode(), chunk)
+        self.assertIn(f'id: {events[2].id}\n'.encode(), chunk)
+
+        await first.aclose()
+        await second.aclose()
+
+    @override_settings(EVENTS_BUFFER=2)
+    async def test_lagging_subscriber_gets_resync(self):
+        broadcaster = get_broadcaster()
+        stream = broadcaster.stream()
+        await self.read(stream)
+
+        start = broadcaster.last_id
+        broadcaster.publish([(start + n, encode_event(start + n, 'game', 'updated', {'id': n})) for n in range(1, 11)])
+
+        self.assertEqual(await self.read(stream), f'id: {start + 10}\nevent: resync\ndata: {{}}\n\n'.encode())
+        await stream.aclose()
+
+    async def test_idle_subscribers_share_one_wakeup(self):
+        broadcaster = get_broadcaster()
+        streams = [broadcaster.stream() for _ in range(1000)]
+        for stream in streams:
+            await self.read(stream)
+        self.assertEqual(broadcaster.subscribers, 1000)
+
+        pending = [asyncio.ensure_future(anext(stream)) for stream in streams]
+        await asyncio.sleep(0)
+        start = broadcaster.last_id
+        frame = encode_event(start + 1, 'game', 'deleted', {'id': 1})
+        broadcaster.publish([(start + 1, frame)])
+
+        self.assertEqual(set(await asyncio.wait_for(asyncio.gather(*pending), 5)), {frame})
+        for stream in streams:
+            await stream.aclose()
+        self.assertEqual(broadcaster.subscribers, 0)
+
+    async def test_invalid_last_event_id(self):
+        response = await self.async_client.get(reverse('events'), headers={'Last-Event-ID': 'latest'})
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_wsgi_is_refused(self):
+        response = self.client.get(reverse('events'))
+
+        self.assertEqual(response.status_code, status.HTTP_501_NOT_IMPLEMENTED)
@@ -0,0 +1,150 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.core.management import call_command
+from django.test import override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from Games.models import Game, IdempotencyKey, Publisher
+
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+# Tests for Idempotency-Key support on the create and update views
+
+
+class IdempotencyKeyTest(APITestCase):
+
+    def setUp(self):
+        self.publisher = Publisher.objects.create(name="Valve", location="USA", website="http://valve.com")
+        self.game = {
+            'title': 'Portal',
+            'description': 'Sample description.',
+            'release_date': '2007-10-10',
+            'genre': 'Puzzle',
+            'onWindows': True,
+            'onMac': False,
+            'onLinux': False,
+            'publisher': [self.publisher.id],
+        }
+
+    def post_game(self, data, key):
+        return self.client.post(reverse('game'), data, format='json', HTTP_IDEMPOTENCY_KEY=key)
+
+    def test_retry_replays_first_response(self):
+        first = self.post_game(self.game, 'retry-1')
+
+        with mock.patch('Games.views.GameSerializer') as serializer:
+            second = self.post_game(self.game, 'retry-1')
+            serializer.assert_not_called()
+
+        self.assertEqual(first.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(second.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(second.json(), first.json())
+        self.assertEqual(second['Idempotent-Replayed'], 'true')
+        self.assertEqual(Game.objects.count(), 1)
+        self.assertEqual(Game.publisher.through.objects.count(), 1)
+
+    def test_different_keys_are_independent(self):
+        self.post_game(self.game, 'a')
+        response = self.post_game({**self.game, 'title': 'Portal 2'}, 'b')
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertNotIn('Idempotent-Replayed', response)
+        self.assertEqual(Game.objects.count(), 2)
+
+    def test_key_reused_with_different_body(self):
+        self.post_game(self.game, 'same')
+        response = self.post_game({**self.game, 'title': 'Portal 2'}, 'same')
+
+        self.assertEqual(response.status_code, status.HTTP_422_UNPROCESSABLE_ENTITY)
+        self.assertEqual(Game.objects.count(), 1)
+
+    def test_keys_are_scoped_by_path(self):
+        self.post_game(self.game, 'shared')
+        response = self.client.put(
+            reverse('publisher-id', args=[self.publisher.id]), {'location': 'Bellevue'},
+            format='json', HTTP_IDEMPOTENCY_KEY='shared'
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(Publisher.objects.get(id=self.publisher.id).location, 'Bellevue')
+
+    def test_put_replays_first_response(self):
+        url = reverse('publisher-id', args=[self.publisher.id])
+        first = self.client.put(url, {'location': 'Bellevue'}, format='json', HTTP_IDEMPOTENCY_KEY='put')
+        Publisher.objects.filter(id=self.publisher.id).update(location='Seattle')
+        second = self.client.put(url, {'location': 'Bellevue'}, format='json', HTTP_IDEMPOTENCY_KEY='put')
+
+        self.assertEqual(second.json(), first.json())
+        self.assertEqual(Publisher.objects.get(id=self.publisher.id).location, 'Seattle')
+
+    def test_validation_failure_is_replayed(self):
+        invalid = {**self.game, 'release_date': 'soon'}
+        first = self.post_game(invalid, 'invalid')
+        second = self.post_game(invalid, 'invalid')
+
+        self.assertEqual(first.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(second.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(second['Idempotent-Replayed'], 'true')
+
+    def test_server_error_releases_key(self):
+        with mock.patch('Games.views.GameSerializer', side_effect=RuntimeError('boom')):
+            failed = self.post_game(self.game, 'flaky')
+
+        response = self.post_game(self.game, 'flaky')
+
+        self.assertEqual(failed.status_code, status.HTTP_500_INTERNAL_SERVER_ERROR)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertNotIn('Idempotent-Replayed', response)
+
+    def test_request_in_progress(self):
+        self.post_game(self.game, 'busy')
+        IdempotencyKey.objects.update(status_code=None)
+
+        response = self.post_game(self.game, 'busy')
+
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+        self.assertEqual(response['Retry-After'], '1')
+
+    def test_abandoned_request_can_be_retried(self):
+        self.post_game(self.game, 'abandoned')
+        IdempotencyKey.objects.update(status_code=None, created_at=timezone.now() - timedelta(minutes=5))
+        Game.objects.all().delete()
+
+        response = self.post_game(self.game, 'abandoned')
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(Game.objects.count(), 1)
+
+    def test_expired_key_runs_the_view_again(self):
+        self.post_game(self.game, 'old')
+        IdempotencyKey.objects.update(created_at=timezone.now() - timedelta(days=2))
+
+        response = self.post_game({**self.game, 'title': 'Portal 2'}, 'old')
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(Game.objects.count(), 2)
+
+    def test_invalid_key(self):
+        response = self.post_game(self.game, 'x' * 300)
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(Game.objects.count(), 0)
+
+    def test_purge(self):
+        self.post_game(self.game, 'fresh')
+        IdempotencyKey.objects.create(key='stale', fingerprint='', created_at=timezone.now() - timedelta(days=2))
+
+        call_command('purge_idempotency_keys', stdout=mock.Mock())
+
+        self.assertEqual(IdempotencyKey.objects.count(), 1)
+
+    @override_settings(IDEMPOTENCY_PURGE_INTERVAL=0)
+    def test_expired_keys_are_purged_from_requests(self):
+        IdempotencyKey.objects.create(key='stale', fingerprint='', created_at=timezone.now() - timedelta(days=2))
+
+        self.post_game(self.game, 'fresh')
+
+        self.assertFalse(IdempotencyKey.objects.filter(key='stale').exists())
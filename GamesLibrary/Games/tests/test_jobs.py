@@ -0,0 +1,180 @@
+import json
+import tempfile
+import time
+from datetime import date, timedelta
+
+from django.test import TransactionTestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from Games.jobs import claim_job, register_job, work, JOB_HANDLERS
+from Games.models import Publisher, Game, Job
+
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+# Tests for the background job queue and its endpoints
+
+
+class JobsTest(APITestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.settings_override = override_settings(JOBS_RESULT_DIR=self.tmpdir.name, JOBS_RETRY_DELAY=0)
+        self.settings_override.enable()
+
+        for i in range(3):
+            Game.objects.create(
+                title=f"Game {i}",
+                description="Sample description.",
+                release_date=date(2022, 1, 1),
+                genre="Action" if i else "RPG",
+                onWindows=True,
+                onMac=False,
+                onLinux=True
+            )
+
+
+    def tearDown(self):
+        self.settings_override.disable()
+        self.tmpdir.cleanup()
+        JOB_HANDLERS.pop('always_fails', None)
+        JOB_HANDLERS.pop('outlived', None)
+
+
+    def test_export_job_lifecycle(self):
+        response = self.client.post(reverse('jobs'), {'kind': 'export_games', 'params': {'genre': 'Action'}}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual(response.data['status'], Job.QUEUED)
+
+        work(once=True)
+
+        job_url = reverse('job-id', args=[response.data['id']])
+        job = self.client.get(job_url).data
+        self.assertEqual(job['status'], Job.DONE)
+        self.assertEqual(job['progress'], 1)
+
+        result = self.client.get(reverse('job-result', args=[job['id']]))
+        self.assertEqual(result.status_code, status.HTTP_200_OK)
+        exported = json.loads(b''.join(result.streaming_content))
+        self.assertEqual([game['title'] for game in exported], ['Game 1', 'Game 2'])
+
+
+    def test_submit_unknown_kind(self):
+        response = self.client.post(reverse('jobs'), {'kind': 'drop_tables'}, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+    def test_submit_invalid_params(self):
+        for params in ({'colour': 'red'}, ['Action'], {}):
+            response = self.client.post(
+                reverse('jobs'), {'kind': 'delete_publisher', 'params': params}, format='json'
+            )
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST, params)
+
+        self.assertFalse(Job.objects.exists())
+
+
+    def test_stored_invalid_params_fail_without_retries(self):
+        job = Job.objects.create(kind='export_games', params={'colour': 'red'}, max_attempts=3)
+
+        work(once=True)
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.FAILED)
+        self.assertEqual(job.attempts, 1)
+        self.assertIn('colour', job.error)
+
+
+    def test_failed_job_is_retried_then_marked_failed(self):
+        @register_job('always_fails')
+        def always_fails(context):
+            raise RuntimeError('boom')
+
+        job = Job.objects.create(kind='always_fails', max_attempts=2)
+
+        work(once=True)
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.FAILED)
+        self.assertEqual(job.attempts, 2)
+        self.assertIn('boom', job.error)
+
+
+    def test_delete_publisher_job(self):
+        publisher = Publisher.objects.create(name="Sample Publisher", location="Sample Location", website="http://samplepublisher.com")
+        publisher.games.set(Game.objects.all())
+
+        self.client.post(reverse('jobs'), {'kind': 'delete_publisher', 'params': {'publisher_id': publisher.id}}, format='json')
+        work(once=True)
+
+        self.assertFalse(Publisher.objects.filter(id=publisher.id).exists())
+        self.assertEqual(Game.objects.count(), 3)
+
+
+    def test_delete_missing_publisher_fails_without_retries(self):
+        job = Job.objects.create(kind='delete_publisher', params={'publisher_id': 999}, max_attempts=3)
+
+        work(once=True)
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.FAILED)
+        self.assertEqual(job.attempts, 1)
+        self.assertIn('Publisher 999 does not exist', job.error)
+
+
+    def test_reclaimed_job_keeps_new_owners_outcome(self):
+        @register_job('outlived')
+        def outlived(context):
+            # Another worker reclaims the job and finishes it while this handler still runs
+            Job.objects.filter(id=context.job.id).update(worker='new-worker', status=Job.DONE, progress=1)
+            raise RuntimeError('boom')
+
+        job = Job.objects.create(kind='outlived', max_attempts=3)
+
+        work(once=True)
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.DONE)
+        self.assertEqual(job.worker, 'new-worker')
+        self.assertEqual(job.error, '')
+
+
+    def test_stale_running_job_is_reclaimed(self):
+        job = Job.objects.create(
+            kind='rebuild_game_documents',
+            status=Job.RUNNING,
+            worker='dead-worker',
+            heartbeat_at=timezone.now() - timedelta(hours=1)
+        )
+
+        claimed = claim_job('new-worker')
+
+        self.assertEqual(claimed.id, job.id)
+        self.assertEqual(claimed.worker, 'new-worker')
+        self.assertIsNone(claim_job('other-worker'))
+
+
+@override_settings(JOBS_HEARTBEAT_INTERVAL=0.05)
+class JobHeartbeatTest(TransactionTestCase):
+
+    def tearDown(self):
+        JOB_HANDLERS.pop('slow', None)
+
+    def test_heartbeat_while_handler_runs(self):
+        heartbeats = []
+
+        @register_job('slow')
+        def slow(context):
+            for _ in range(2):
+                time.sleep(0.3)
+                heartbeats.append(Job.objects.get(id=context.job.id).heartbeat_at)
+
+        job = Job.objects.create(kind='slow')
+        work(once=True)
+
+        claimed_at = heartbeats[0]
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.DONE)
+        self.assertGreater(heartbeats[1], claimed_at)
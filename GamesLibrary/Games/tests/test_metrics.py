@@ -0,0 +1,103 @@
+import tempfile
+from datetime import date
+from pathlib import Path
+
+from django.test import override_settings
+from django.urls import reverse
+
+from Games.metrics import ValueFile, _key, collect, render
+from Games.models import Game
+
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+# Tests for the /metrics endpoint and its per-process value files
+
+
+class MetricsTest(APITestCase):
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = Path(directory.name)
+
+        settings_override = override_settings(METRICS_DIR=self.directory)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        self.game = Game.objects.create(
+            title="Portal",
+            description="Sample description.",
+            release_date=date(2007, 10, 10),
+            genre="Puzzle",
+            onWindows=True,
+            onMac=False,
+            onLinux=False
+        )
+
+    def metrics(self):
+        response = self.client.get(reverse('metrics'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response['Content-Type'].startswith('text/plain'))
+        return response.content.decode().splitlines()
+
+    def test_requests_are_counted_per_url_name(self):
+        self.client.get(reverse('game'))
+        self.client.get(reverse('game'))
+        self.client.get(reverse('game-id', args=[self.game.id]))
+        self.client.get(reverse('game-id', args=[999]))
+
+        lines = self.metrics()
+
+        self.assertIn('http_requests_total{method="GET",status="200",view="game"} 2', lines)
+        self.assertIn('http_requests_total{method="GET",status="404",view="game-id"} 1', lines)
+        self.assertIn('http_request_duration_seconds_bucket{le="+Inf",view="game"} 2', lines)
+        self.assertIn('http_request_duration_seconds_count{view="game-id"} 2', lines)
+        self.assertIn('# TYPE http_request_duration_seconds histogram', lines)
+        self.assertTrue(any(line.startswith('db_queries_total{view="game"} ') for line in lines))
+        self.assertIn('cache_hit_ratio{cache="game_documents"} 1', lines)
+
+    def test_buckets_are_cumulative_and_ordered(self):
+        for _ in range(3):
+            self.client.get(reverse('game'))
+
+        buckets = [line for line in self.metrics() if line.startswith('http_request_duration_seconds_bucket{le=')
+                   and 'view="game"' in line]
+        counts = [int(line.rsplit(' ', 1)[1]) for line in buckets]
+
+        self.assertEqual(counts, sorted(counts))
+        self.assertTrue(buckets[-1].startswith('http_request_duration_seconds_bucket{le="+Inf"'))
+        self.assertEqual(counts[-1], 3)
+
+    def test_files_of_all_processes_are_summed(self):
+        self.client.get(reverse('game'))
+
+        # Another worker's file, growing past its initial size
+        other = ValueFile(self.directory / 'metrics-1.db')
+        other.inc(_key('http_requests_total', {'view': 'game', 'method': 'GET', 'status': '200'}), 4)
+        for number in range(3000):
+            other.inc(_key('db_queries_total', {'view': f'view-{number}'}), 1)
+
+        totals = collect(self.directory)
+
+        self.assertEqual(
+            totals[('http_requests_total', (('method', 'GET'), ('status', '200'), ('view', 'game')))], 5
+        )
+        self.assertEqual(totals[('db_queries_total', (('view', 'view-2999'),))], 1)
+
+        # Reopening a file keeps its slots
+        reopened = ValueFile(self.directory / 'metrics-1.db')
+        reopened.inc(_key('db_queries_total', {'view': 'view-2999'}), 1)
+        self.assertEqual(collect(self.directory)[('db_queries_total', (('view', 'view-2999'),))], 2)
+
+    def test_label_values_are_escaped(self):
+        text = render({('cache_requests_total', (('cache', 'a"b'), ('result', 'hit'))): 1.0})
+
+        self.assertIn('cache_requests_total{cache="a\\"b",result="hit"} 1', text.splitlines())
+
+    @override_settings(METRICS_ENABLED=False)
+    def test_disabled(self):
+        self.client.get(reverse('game'))
+
+        self.assertEqual(self.client.get(reverse('metrics')).status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(list(self.directory.iterdir()), [])
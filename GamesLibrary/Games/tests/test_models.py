@@ -1,5 +1,9 @@
-from django.test import TestCase
-from Games.models import Publisher, Game
+import zlib
+
+from django.db import connection
+from django.db.migrations.executor import MigrationExecutor
+from django.test import TestCase, TransactionTestCase, override_settings
+from Games.models import Publisher, Game, GameDescription, GameDocument
 from django.db.utils import IntegrityError
 from datetime import date
 
@@ -31,6 +35,25 @@ class PublisherModelTest(TestCase):
         with self.assertRaises(IntegrityError):
             Publisher.objects.create(name="Another Publisher", location="Another Location", website="http://samplepublisher.com")
 
+    def test_publisher_location_key_updated_on_save(self):
+        # The normalized location key follows the location on every save
+        self.assertEqual(self.publisher.location_key, "sample location")
+
+        self.publisher.location = "  Brasília "
+        self.publisher.save(update_fields=["location"])
+        self.publisher.refresh_from_db()
+        self.assertEqual(self.publisher.location_key, "brasilia")
+
+    def test_publisher_location_key_fits_lengthened_locations(self):
+        # Casefolding can make the key longer than the location itself
+        self.publisher.location = "ß" * 100
+        self.publisher.save()
+
+        self.assertEqual(len(self.publisher.location_key), 200)
+        self.assertLessEqual(
+            len(self.publisher.location_key), Publisher._meta.get_field('location_key').max_length
+        )
+
 
 class GameModelTest(TestCase):
 
@@ -79,3 +102,74 @@ class GameModelTest(TestCase):
         self.assertIn("Windows", platforms)
         self.assertIn("Linux", platforms)
         self.assertNotIn("Mac", platforms)
+
+    def test_description_stored_compressed(self):
+        # The description lives compressed in its own table and is only read when accessed
+        stored = GameDescription.objects.get(game=self.game)
+        self.assertEqual(zlib.decompress(stored.data).decode(), '"This is a sample game description."')
+
+        game = Game.objects.get(id=self.game.id)
+        with self.assertNumQueries(1):
+            self.assertEqual(game.description, "This is a sample game description.")
+            self.assertEqual(game.description, "This is a sample game description.")
+
+        game.description = "Changed."
+        game.save()
+        self.assertEqual(Game.objects.get(id=self.game.id).description, "Changed.")
+
+    def test_game_without_description(self):
+        game = Game(title="Untitled", release_date=date(2022, 1, 1), genre="Action",
+                    onWindows=True, onMac=False, onLinux=False)
+        game.save()
+
+        self.assertEqual(Game.objects.get(id=game.id).description, "")
+        self.assertFalse(GameDescription.objects.filter(game=game).exists())
+
+
+class CompressDescriptionsMigrationTest(TransactionTestCase):
+    # Converts the descriptions of existing rows and back, in batches
+
+    before = [('Games', '0013_idempotency_keys')]
+    after = [('Games', '0014_compressed_descriptions')]
+
+    def migrate(self, targets):
+        executor = MigrationExecutor(connection)
+        executor.loader.build_graph()
+        executor.migrate(targets)
+        return executor.loader.project_state(targets).apps
+
+    def tearDown(self):
+        self.migrate(MigrationExecutor(connection).loader.graph.leaf_nodes())
+
+    def test_forward_and_backward(self):
+        apps = self.migrate(self.before)
+        OldGame = apps.get_model('Games', 'Game')
+        OldGame.objects.bulk_create([
+            OldGame(title=f"Game {i}", description=f"Description {i} " * i, release_date=date(2022, 1, 1),
+                    genre="Action", onWindows=True, onMac=False, onLinux=False)
+            for i in range(1500)
+        ])
+        apps.get_model('Games', 'GameDocument').objects.create(game_id=OldGame.objects.first().id, data='{}')
+
+        apps = self.migrate(self.after)
+
+        self.assertEqual(GameDescription.objects.count(), 1500)
+        game = apps.get_model('Games', 'Game').objects.get(title="Game 7")
+        self.assertEqual(GameDescription.objects.get(game_id=game.id).text, "Description 7 " * 7)
+        self.assertFalse(GameDocument.objects.exists())
+
+        apps = self.migrate(self.before)
+        self.assertEqual(apps.get_model('Games', 'Game').objects.get(title="Game 1499").description,
+                         "Description 1499 " * 1499)
+
+    @override_settings(GAME_DESCRIPTION_COMPRESSION_LEVEL=0)
+    def test_encoding_does_not_follow_settings(self):
+        apps = self.migrate(self.before)
+        OldGame = apps.get_model('Games', 'Game')
+        game = OldGame.objects.create(title="Game", description="Description " * 10, release_date=date(2022, 1, 1),
+                                      genre="Action", onWindows=True, onMac=False, onLinux=False)
+
+        self.migrate(self.after)
+
+        self.assertEqual(bytes(GameDescription.objects.get(game_id=game.id).data),
+                         zlib.compress(b'"' + b"Description " * 10 + b'"', 6))
@@ -0,0 +1,83 @@
+from datetime import date
+
+from django.test import override_settings
+from django.urls import reverse
+
+from Games.models import Publisher, Game
+from Games.nplusone import NPlusOneError, assert_no_n_plus_one, fingerprint
+
+from rest_framework.test import APITestCase
+
+# Tests for the N+1 query detector
+
+
+class NPlusOneTest(APITestCase):
+
+    def setUp(self):
+        self.publisher = Publisher.objects.create(
+            name="Sample Publisher",
+            location="Sample Location",
+            website="http://samplepublisher.com"
+        )
+
+        for i in range(10):
+            Game.objects.create(
+                title=f"Game {i}",
+                description="Sample description.",
+                release_date=date(2022, 1, 1),
+                genre="Action",
+                onWindows=True,
+                onMac=False,
+                onLinux=True
+            ).publisher.add(self.publisher)
+
+
+    def test_fingerprint_ignores_literals(self):
+        self.assertEqual(
+            fingerprint("SELECT * FROM t WHERE id = 5 AND name = 'x' AND pk IN (%s, %s, %s)"),
+            fingerprint("SELECT * FROM t WHERE id = 7 AND name = 'y' AND pk IN (%s)"),
+        )
+
+
+    def test_detects_repeated_queries(self):
+        with self.assertRaises(NPlusOneError) as error:
+            with assert_no_n_plus_one(threshold=5):
+                for game in Game.objects.all():
+                    list(game.publisher.all())
+
+        self.assertIn('test_nplusone.py', str(error.exception))
+
+
+    @override_settings(NPLUSONE_DETECTION='raise')
+    def test_list_views_have_no_n_plus_one(self):
+        ids = ','.join(str(id) for id in Game.objects.values_list('id', flat=True))
+
+        for url, params in (
+            (reverse('game'), {}),
+            (reverse('game-genre', args=['Action']), {}),
+            (reverse('game-batch'), {'ids': ids}),
+            (reverse('publisher-games', args=[self.publisher.id]), {}),
+        ):
+            self.assertEqual(self.client.get(url, params).status_code, 200)
+
+
+    @override_settings(NPLUSONE_DETECTION='raise')
+    def test_game_with_many_publishers_has_no_n_plus_one(self):
+        # Co-publisher pairs and rollups are written per batch, not per pair
+        publishers = [
+            Publisher.objects.create(name=f"Publisher {i}", location="Tokyo", website=f"http://publisher{i}.com").id
+            for i in range(4)
+        ]
+
+        response = self.client.post(reverse('game'), {
+            'title': 'Shared Game',
+            'description': 'Sample description.',
+            'release_date': '2022-01-01',
+            'genre': 'Action',
+            'onWindows': True,
+            'onMac': False,
+            'onLinux': True,
+            'publisher': publishers,
+        }, format='json')
+
+        self.assertEqual(response.status_code, 201)
@@ -0,0 +1,154 @@
+from datetime import date
+
+from django.db import connection
+from django.db.models.signals import m2m_changed
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from Games.copublishers import LINKS_TABLE, rebuild_copublishers
+from Games.models import CatalogEvent, CoPublisher, Game, Publisher, ReleaseRollup
+from Games.rollups import rebuild_rollups
+
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+# Tests for the bulk Game <-> Publisher links endpoint
+
+
+class PublisherLinksTest(APITestCase):
+
+    def setUp(self):
+        self.valve = Publisher.objects.create(name="Valve", location="USA", website="http://valve.com")
+        self.ea = Publisher.objects.create(name="EA", location="USA", website="http://ea.com")
+        self.sega = Publisher.objects.create(name="Sega", location="Japan", website="http://sega.com")
+
+        self.games = [
+            Game.objects.create(
+                title=f"Game {n}",
+                description="Sample description.",
+                release_date=date(2000 + n % 3, 1, 1),
+                genre="Puzzle",
+                onWindows=True,
+                onMac=False,
+                onLinux=False
+            )
+            for n in range(6)
+        ]
+        for game in self.games[:4]:
+            game.publisher.add(self.valve)
+        self.games[0].publisher.add(self.ea)
+
+    def post(self, data):
+        return self.client.post(reverse('publisher-links'), data, format='json')
+
+    def links(self):
+        return sorted(Game.publisher.through.objects.values_list('game_id', 'publisher_id'))
+
+    def assert_derived_data_matches_rebuild(self):
+        graph = sorted(CoPublisher.objects.values_list('publisher_id', 'other_id', 'shared_games'))
+        rollups = sorted(ReleaseRollup.objects.values_list('dimension', 'year', 'key', 'count'))
+        rebuild_copublishers()
+        rebuild_rollups()
+        self.assertEqual(graph, sorted(CoPublisher.objects.values_list('publisher_id', 'other_id', 'shared_games')))
+        self.assertEqual(rollups, sorted(ReleaseRollup.objects.values_list('dimension', 'year', 'key', 'count')))
+
+    def test_add(self):
+        ids = [game.id for game in self.games]
+
+        response = self.post({'action': 'add', 'games': ids, 'publishers': [self.ea.id, self.sega.id]})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        # Game 0 was already linked to EA
+        self.assertEqual(response.data, {'added': 11, 'removed': 0, 'games': 6})
+        self.assertEqual(Game.publisher.through.objects.filter(publisher=self.sega).count(), 6)
+        self.assert_derived_data_matches_rebuild()
+
+        # Stored documents and versions follow the new links
+        game = self.client.get(reverse('game-id', args=[self.games[5].id])).json()
+        self.assertEqual(sorted(game['publisher']), [self.ea.id, self.sega.id])
+        self.assertEqual(game['version'], 2)
+        self.assertEqual(Game.objects.get(id=self.games[0].id).version, 2)
+
+    def test_remove(self):
+        response = self.post({
+            'action': 'remove', 'games': [game.id for game in self.games[:3]], 'publishers': [self.valve.id]
+        })
+
+        self.assertEqual(response.data, {'added': 0, 'removed': 3, 'games': 3})
+        self.assertEqual(self.links(), sorted([
+            (self.games[0].id, self.ea.id), (self.games[3].id, self.valve.id),
+        ]))
+        self.assertEqual(Game.objects.get(id=self.games[4].id).version, 1)
+        self.assert_derived_data_matches_rebuild()
+
+    def test_move_all_games(self):
+        response = self.post({'action': 'move', 'from_publisher': self.valve.id, 'to_publisher': self.ea.id})
+
+        # Game 0 keeps its existing EA link
+        self.assertEqual(response.data, {'added': 3, 'removed': 4, 'games': 4})
+        self.assertFalse(self.valve.games.exists())
+        self.assertEqual(sorted(self.ea.games.values_list('id', flat=True)), [game.id for game in self.games[:4]])
+        self.assert_derived_data_matches_rebuild()
+
+    def test_move_some_games(self):
+        response = self.post({
+            'action': 'move', 'from_publisher': self.valve.id, 'to_publisher': self.sega.id,
+            'games': [self.games[1].id, self.games[5].id],
+        })
+
+        # Game 5 is not linked to Valve and stays unlinked
+        self.assertEqual(response.data, {'added': 1, 'removed': 1, 'games': 1})
+        self.assertEqual(list(self.sega.games.values_list('id', flat=True)), [self.games[1].id])
+        self.assertFalse(self.games[5].publisher.exists())
+        self.assert_derived_data_matches_rebuild()
+
+    def test_through_table_is_written_in_bulk(self):
+        received = []
+        m2m_changed.connect(
+            lambda **kwargs: received.append(kwargs), sender=Game.publisher.through, weak=False, dispatch_uid='test'
+        )
+        self.addCleanup(m2m_changed.disconnect, sender=Game.publisher.through, dispatch_uid='test')
+
+        with CaptureQueriesContext(connection) as queries:
+            self.post({
+                'action': 'add', 'games': [game.id for game in self.games], 'publishers': [self.ea.id, self.sega.id]
+            })
+
+        statements = [query['sql'] for query in queries if LINKS_TABLE in query['sql']]
+        self.assertEqual(sum(sql.startswith('INSERT') for sql in statements), 1)
+        self.assertEqual(received, [])
+
+    def test_one_event_per_request(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.post({'action': 'move', 'from_publisher': self.valve.id, 'to_publisher': self.sega.id})
+
+        events = list(CatalogEvent.objects.filter(kind=CatalogEvent.LINK).values_list('action', 'data'))
+        self.assertEqual(events, [('changed', {
+            'added': [[game.id, self.sega.id] for game in self.games[:4]],
+            'removed': [[game.id, self.valve.id] for game in self.games[:4]],
+        })])
+
+    def test_nothing_to_change(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.post({'action': 'remove', 'games': [self.games[5].id], 'publishers': [self.sega.id]})
+
+        self.assertEqual(response.data, {'added': 0, 'removed': 0, 'games': 0})
+        self.assertFalse(CatalogEvent.objects.filter(kind=CatalogEvent.LINK).exists())
+
+    def test_unknown_ids(self):
+        response = self.post({'action': 'add', 'games': [self.games[0].id, 999], 'publishers': [self.ea.id, 998]})
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data['missing'], {'publishers': [998], 'games': [999]})
+        self.assertEqual(self.ea.games.count(), 1)
+
+    def test_invalid_requests(self):
+        for data in (
+            {'action': 'replace', 'games': [self.games[0].id], 'publishers': [self.ea.id]},
+            {'action': 'add', 'games': [self.games[0].id]},
+            {'action': 'remove', 'games': [], 'publishers': [self.ea.id]},
+            {'action': 'move', 'from_publisher': self.ea.id},
+            {'action': 'move', 'from_publisher': self.ea.id, 'to_publisher': self.ea.id},
+        ):
+            self.assertEqual(self.post(data).status_code, status.HTTP_400_BAD_REQUEST, data)
+
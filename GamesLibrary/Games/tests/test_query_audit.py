@@ -0,0 +1,97 @@
+import json
+import tempfile
+from io import StringIO
+from pathlib import Path
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase
+
+from Games.query_audit import audit, postgresql_findings, regressions, seed_catalog, sqlite_findings
+
+# Tests for the query plan audit of the read endpoints
+
+
+class PlanFindingsTest(TestCase):
+
+    def test_sqlite_plans(self):
+        findings = sqlite_findings([
+            'SCAN Games_game',
+            'SCAN TABLE Games_publisher',
+            'SCAN Games_game USING INDEX game_title_idx',
+            'SCAN CONSTANT ROW',
+            'SEARCH Games_gamedocument USING INTEGER PRIMARY KEY (rowid=?)',
+            'USE TEMP B-TREE FOR ORDER BY',
+        ])
+
+        self.assertEqual(
+            findings, ['full scan Games_game', 'full scan Games_publisher', 'temp b-tree for ORDER BY']
+        )
+
+    def test_postgresql_plans(self):
+        plan = {
+            'Node Type': 'Sort', 'Sort Key': ['title'],
+            'Plans': [{'Node Type': 'Hash Join', 'Plans': [
+                {'Node Type': 'Seq Scan', 'Relation Name': 'Games_game'},
+                {'Node Type': 'Index Scan', 'Relation Name': 'Games_publisher'},
+            ]}],
+        }
+
+        self.assertEqual(postgresql_findings(plan), ['sort on title', 'full scan Games_game'])
+
+    def test_only_new_findings_are_regressions(self):
+        results = {
+            'game': {'findings': ['Games_game: full scan Games_game']},
+            'game-genre': {'findings': ['Games_game: temp b-tree for ORDER BY']},
+            'publisher': {'findings': []},
+        }
+        baseline = {'game': ['Games_game: full scan Games_game'], 'publisher': ['gone']}
+
+        self.assertEqual(regressions(results, baseline), {'game-genre': ['Games_game: temp b-tree for ORDER BY']})
+
+
+class AuditQueriesCommandTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        seed_catalog(games=40)
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.baseline = Path(directory.name) / 'baseline.json'
+
+    def run_audit(self, **options):
+        output = StringIO()
+        call_command('audit_queries', current=True, baseline=self.baseline, stdout=output, **options)
+        return output.getvalue()
+
+    def test_every_read_endpoint_is_audited(self):
+        results, skipped = audit()
+
+        for key in ('publisher', 'publisher-id', 'publisher-games', 'game', 'game-id', 'game-genre',
+                    'game-similar', 'job-id', 'stats-genres', 'game-batch?ids={game_ids}&include=description'):
+            self.assertIn(key, results)
+            self.assertEqual(results[key]['status'], 200, key)
+            self.assertTrue(results[key]['statements'], key)
+        self.assertEqual(set(skipped), {'events', 'job-result'})
+
+        # Ordered listings walk an index instead of sorting
+        self.assertNotIn('Games_game: temp b-tree for ORDER BY', results['game?ordering=title']['findings'])
+
+    def test_baseline_round_trip(self):
+        self.assertIn('Stored the sqlite baseline', self.run_audit(update_baseline=True))
+        self.assertIn('No query plan regressions', self.run_audit())
+
+    def test_new_finding_fails(self):
+        self.run_audit(update_baseline=True)
+        baselines = json.loads(self.baseline.read_text())
+        baselines['sqlite']['game'] = []
+        self.baseline.write_text(json.dumps(baselines))
+
+        with self.assertRaisesMessage(CommandError, '1 query plan regressions in 1 requests.'):
+            self.run_audit()
+
+    def test_missing_baseline(self):
+        with self.assertRaisesMessage(CommandError, 'run with --update-baseline first'):
+            self.run_audit()
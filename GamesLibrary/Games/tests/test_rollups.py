@@ -0,0 +1,83 @@
+from datetime import date
+
+from django.urls import reverse
+
+from Games.models import Publisher, Game, ReleaseRollup
+from Games.rollups import rebuild_rollups
+
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from helpers import create_game
+
+# Tests for the incrementally maintained release rollups and the stats endpoints
+
+
+class ReleaseRollupTest(APITestCase):
+
+    def rollups(self):
+        return sorted(ReleaseRollup.objects.values_list('dimension', 'year', 'key', 'count'))
+
+    def assert_matches_rebuild(self):
+        incremental = self.rollups()
+        rebuild_rollups()
+        self.assertEqual(incremental, self.rollups())
+
+    def setUp(self):
+        self.valve = Publisher.objects.create(name="Valve", location="USA", website="http://valve.com")
+        self.sega = Publisher.objects.create(name="Sega", location="Japan", website="http://sega.com")
+
+        self.portal = create_game("Portal", "Puzzle", date(2007, 1, 1))
+        self.portal.publisher.add(self.valve)
+        self.sonic = create_game("Sonic", "Platformer", date(1991, 1, 1), onMac=True)
+        self.sonic.publisher.add(self.sega, self.valve)
+
+    def test_incremental_rollups_match_rebuild(self):
+        self.assert_matches_rebuild()
+
+        self.portal.release_date = date(2008, 1, 1)
+        self.portal.genre = "Action"
+        self.portal.save()
+        self.assert_matches_rebuild()
+
+        self.sonic.publisher.remove(self.valve, self.sega)
+        self.valve.games.add(self.sonic)
+        self.sega.games.clear()
+        self.assert_matches_rebuild()
+
+        self.client.put(reverse('game-id', args=[self.sonic.id]), {'release_date': '1992-06-23'}, format='json')
+        self.assert_matches_rebuild()
+
+        self.valve.delete()
+        self.portal.delete()
+        self.assert_matches_rebuild()
+
+    def test_date_and_publishers_changed_together(self):
+        response = self.client.put(
+            reverse('game-id', args=[self.portal.id]),
+            {'release_date': '2010-05-05', 'publisher': [self.sega.id]}, format='json'
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn((ReleaseRollup.PUBLISHER, 2010, str(self.sega.id), 1), self.rollups())
+        self.assert_matches_rebuild()
+
+    def test_stats_endpoints(self):
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('stats-genres'), {'from': 2000})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data, [{'year': 2007, 'genre': 'Puzzle', 'count': 1}])
+
+        response = self.client.get(reverse('stats-publishers'), {'key': self.valve.id})
+        self.assertEqual([(row['year'], row['publisher']) for row in response.data], [(1991, self.valve.id), (2007, self.valve.id)])
+
+        response = self.client.get(reverse('stats-platforms'), {'to': 1991})
+        self.assertEqual(
+            [(row['platform'], row['share']) for row in response.data],
+            [('Mac', 1.0), ('Windows', 1.0)]
+        )
+
+    def test_stats_invalid_year(self):
+        response = self.client.get(reverse('stats-genres'), {'from': 'last year'})
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
@@ -0,0 +1,149 @@
+import json
+import tempfile
+from pathlib import Path
+
+from django.core.management import call_command
+from django.db import connections
+from django.test import override_settings
+from django.urls import reverse
+
+from Games.models import Game, GameDocument, Publisher, ReleaseRollup
+from Games.rollups import rebuild_rollups
+from Games.sharding import allocate_game_ids, shard_for
+
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+# Tests for hash-sharded game storage, using temporary SQLite files as shards
+
+SHARDS = ['games_shard_0', 'games_shard_1', 'games_shard_2']
+
+
+@override_settings(GAME_SHARDS=SHARDS)
+class ShardingTest(APITestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        # The shards are registered here rather than in settings, so other tests never see them
+        cls.shard_directory = tempfile.TemporaryDirectory()
+        cls.databases = {'default', *SHARDS}
+
+        with override_settings(GAME_SHARDS=SHARDS):
+            for alias in SHARDS:
+                connections.settings[alias] = dict(
+                    connections.settings['default'], NAME=str(Path(cls.shard_directory.name) / f'{alias}.sqlite3')
+                )
+                call_command('migrate', 'Games', database=alias, verbosity=0)
+
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+
+        for alias in SHARDS:
+            connections[alias].close()
+            del connections[alias]
+            del connections.settings[alias]
+        cls.shard_directory.cleanup()
+
+    def create_game(self, title, genre, release_date, publishers):
+        response = self.client.post(reverse('game'), {
+            'title': title,
+            'description': 'Sample description.',
+            'release_date': release_date,
+            'genre': genre,
+            'onWindows': True,
+            'onMac': False,
+            'onLinux': True,
+            'publisher': [publisher.id for publisher in publishers],
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        return response.data['id']
+
+    def setUp(self):
+        self.valve = Publisher.objects.create(name="Valve", location="USA", website="http://valve.com")
+        self.sega = Publisher.objects.create(name="Sega", location="Japan", website="http://sega.com")
+
+        self.ids = [
+            self.create_game(f"Game {number:02}", "Action" if number % 2 else "Puzzle",
+                             f"20{number:02}-01-01", [self.valve] if number % 3 else [self.valve, self.sega])
+            for number in range(1, 13)
+        ]
+
+    def test_games_are_spread_over_shards(self):
+        self.assertEqual(len(set(self.ids)), len(self.ids))
+        self.assertEqual(Game.objects.using('default').count(), 0)
+
+        for id in self.ids:
+            alias = shard_for(id)
+            self.assertTrue(Game.objects.using(alias).filter(id=id).exists())
+            self.assertTrue(GameDocument.objects.using(alias).filter(game_id=id).exists())
+
+        self.assertEqual(sum(Game.objects.using(alias).count() for alias in SHARDS), 12)
+        self.assertGreater(sum(1 for alias in SHARDS if Game.objects.using(alias).exists()), 1)
+
+    def test_allocated_ids_are_unique(self):
+        first, second = allocate_game_ids(5), allocate_game_ids(5)
+
+        self.assertEqual(len(set(first) | set(second) | set(self.ids)), 22)
+
+    def test_publishers_are_replicated(self):
+        for alias in SHARDS:
+            self.assertEqual(Publisher.objects.using(alias).get(id=self.sega.id).name, "Sega")
+
+        self.client.put(reverse('publisher-id', args=[self.sega.id]), {'location': 'Tokyo'}, format='json')
+
+        for alias in SHARDS:
+            self.assertEqual(Publisher.objects.using(alias).get(id=self.sega.id).location, "Tokyo")
+
+    def test_list_merges_ordered_shards(self):
+        response = self.client.get(reverse('game'))
+        self.assertEqual([game['id'] for game in response.json()], sorted(self.ids))
+
+        response = self.client.get(reverse('game'), {'ordering': '-release_date'})
+        self.assertEqual([game['id'] for game in response.json()], sorted(self.ids, reverse=True))
+
+        response = self.client.get(reverse('game'), {'ordering': '-release_date', 'stream': 'true'})
+        streamed = json.loads(b''.join(response.streaming_content))
+        self.assertEqual([game['id'] for game in streamed], sorted(self.ids, reverse=True))
+
+        response = self.client.get(reverse('game-genre', args=['Puzzle']), {'ordering': 'genre,-title'})
+        self.assertEqual([game['title'] for game in response.json()], [f"Game {n:02}" for n in (12, 10, 8, 6, 4, 2)])
+
+    def test_game_by_id_routes_to_shard(self):
+        id = self.ids[0]
+
+        response = self.client.put(reverse('game-id', args=[id]), {'genre': 'Strategy', 'publisher': [self.sega.id]},
+                                   format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        response = self.client.get(reverse('game-id', args=[id]))
+        self.assertEqual(response.json()['genre'], 'Strategy')
+        self.assertEqual(response.json()['publisher'], [self.sega.id])
+
+        response = self.client.get(reverse('game-batch'), {'ids': f'{self.ids[1]},{id},999'})
+        self.assertEqual([game['id'] for game in response.data['results']], [self.ids[1], id])
+        self.assertEqual(response.data['missing'], [999])
+
+        self.client.delete(reverse('game-id', args=[id]))
+        self.assertFalse(Game.objects.using(shard_for(id)).filter(id=id).exists())
+
+    def test_publisher_games_and_delete(self):
+        response = self.client.get(reverse('publisher-games', args=[self.sega.id]))
+        self.assertEqual([game['id'] for game in response.json()], [self.ids[n] for n in (2, 5, 8, 11)])
+
+        self.client.delete(reverse('publisher-id', args=[self.sega.id]))
+
+        for alias in SHARDS:
+            self.assertFalse(Publisher.objects.using(alias).filter(id=self.sega.id).exists())
+        response = self.client.get(reverse('game-id', args=[self.ids[2]]))
+        self.assertEqual(response.json()['publisher'], [self.valve.id])
+
+    def test_rollups_match_rebuild(self):
+        Game.objects.using(shard_for(self.ids[0])).get(id=self.ids[0]).publisher.add(self.sega)
+        incremental = sorted(ReleaseRollup.objects.values_list('dimension', 'year', 'key', 'count'))
+
+        rebuild_rollups()
+
+        self.assertEqual(incremental, sorted(ReleaseRollup.objects.values_list('dimension', 'year', 'key', 'count')))
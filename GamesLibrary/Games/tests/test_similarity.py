@@ -0,0 +1,127 @@
+from datetime import date
+from unittest import mock
+
+import numpy as np
+from scipy import sparse
+
+from django.core.management import call_command
+from django.urls import reverse
+
+from Games.models import Publisher, Game, SimilarGame, SimilarityRefresh
+from Games.similarity import build_feature_matrix, refresh_similar_games, top_k_similar
+
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from helpers import create_game
+
+# Tests for the precomputed similar games and their endpoint
+
+
+class SimilarGamesTest(APITestCase):
+
+    def setUp(self):
+        self.valve = Publisher.objects.create(name="Valve", location="USA", website="http://valve.com")
+        self.sega = Publisher.objects.create(name="Sega", location="Japan", website="http://sega.com")
+
+        self.portal = create_game("Portal", "Puzzle", publishers=[self.valve])
+        self.portal_2 = create_game("Portal 2", "Puzzle", publishers=[self.valve])
+        self.puzzle = create_game("Puzzle Quest", "Puzzle", publishers=[self.sega], onMac=True)
+        self.sonic = create_game("Sonic", "Platformer", publishers=[self.sega], onMac=True)
+
+    def test_full_refresh_ranks_by_similarity(self):
+        call_command('compute_similar_games', '--full', '--k', '2', stdout=open('/dev/null', 'w'))
+
+        similar = list(
+            SimilarGame.objects.filter(game=self.portal).order_by('rank').values_list('similar_id', flat=True)
+        )
+        self.assertEqual(similar, [self.portal_2.id, self.puzzle.id])
+        self.assertFalse(SimilarityRefresh.objects.exists())
+
+    def test_incremental_refresh_only_recomputes_changed_games(self):
+        refresh_similar_games(full=True, k=1)
+        sonic_rows = list(SimilarGame.objects.filter(game=self.sonic).values_list('id', flat=True))
+
+        self.portal_2.genre = "Platformer"
+        self.portal_2.save()
+
+        # Portal 2 itself plus Portal, whose list points at it
+        self.assertEqual(refresh_similar_games(k=1), 2)
+
+        self.assertEqual(
+            list(SimilarGame.objects.filter(game=self.sonic).values_list('id', flat=True)), sonic_rows
+        )
+        self.assertEqual(
+            SimilarGame.objects.get(game=self.portal_2, rank=1).similar_id, self.portal.id
+        )
+
+    def test_game_queued_again_during_a_refresh_stays_queued(self):
+        refresh_similar_games(full=True, k=1)
+        self.portal_2.genre = "Platformer"
+        self.portal_2.save()
+
+        def changed_meanwhile():
+            # Saved again after the queue was read, so this run may miss the change
+            self.portal_2.genre = "Puzzle"
+            self.portal_2.save()
+            self.sonic.save()
+            return build_feature_matrix()
+
+        with mock.patch('Games.similarity.build_feature_matrix', side_effect=changed_meanwhile):
+            refresh_similar_games(k=1)
+
+        self.assertEqual(
+            set(SimilarityRefresh.objects.values_list('game_id', flat=True)), {self.portal_2.id, self.sonic.id}
+        )
+
+    def test_ties_at_the_cutoff_keep_the_lowest_ids(self):
+        # The last 20 of 40 games are identical, so each of them ties with the 19 others
+        ids = np.arange(100, 140, dtype=np.int64)
+        matrix = sparse.csr_matrix(np.repeat([[0.0, 1.0], [1.0, 0.0]], 20, axis=0))
+
+        results = dict(top_k_similar(ids, matrix, np.arange(20, 40), k=3, batch_size=8))
+
+        self.assertEqual([id for id, _ in results[139]], [120, 121, 122])
+        self.assertEqual([id for id, _ in results[121]], [120, 122, 123])
+
+    def test_links_of_games_created_during_the_build_are_skipped(self):
+        links = Game.publisher.through.objects
+        values_list = links.values_list
+
+        def created_meanwhile(*fields):
+            # A game and its link committed after the games were read
+            newcomer = Game.objects.create(
+                title="Portal 3",
+                description="Sample description.",
+                release_date=date(2022, 1, 1),
+                genre="Puzzle",
+                onWindows=True,
+                onMac=False,
+                onLinux=False
+            )
+            links.create(game=newcomer, publisher=self.valve)
+            return values_list(*fields)
+
+        with mock.patch.object(links, 'values_list', side_effect=created_meanwhile):
+            ids, matrix = build_feature_matrix()
+
+        self.assertEqual(ids.tolist(), [self.portal.id, self.portal_2.id, self.puzzle.id, self.sonic.id])
+        self.assertEqual(matrix.shape[0], 4)
+
+        # Its save queued it for the next incremental run
+        self.assertTrue(SimilarityRefresh.objects.filter(game_id=Game.objects.get(title="Portal 3").id).exists())
+
+    def test_get_similar_games(self):
+        refresh_similar_games(full=True, k=2)
+
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('game-similar', args=[self.portal.id]))
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([row['title'] for row in response.data], ["Portal 2", "Puzzle Quest"])
+
+    def test_get_similar_games_not_found(self):
+        response = self.client.get(reverse('game-similar', args=[9999]))
+
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(response.data['detail'], 'Game with given ID(9999) not found.')
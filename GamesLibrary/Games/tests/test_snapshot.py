@@ -0,0 +1,140 @@
+import tempfile
+from datetime import date
+from pathlib import Path
+
+from django.test import override_settings
+from django.urls import reverse
+
+from Games import coalescing
+from Games.coalescing import _Flight, flights
+from Games.models import Publisher, Game
+from Games.serializers import GameSerializer, GameSummarySerializer, PublisherSerializer
+from Games.snapshot import get_snapshot, write_snapshot
+
+from rest_framework import status
+from rest_framework.test import APIClient, APITestCase
+
+# Tests for the memory-mapped catalog snapshot and the views reading from it
+
+
+class CatalogSnapshotTest(APITestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = Path(self.tmpdir.name) / 'catalog.snapshot'
+
+        self.publisher = Publisher.objects.create(
+            name="Sample Publisher",
+            location="São Paulo",
+            website="http://samplepublisher.com"
+        )
+        self.other = Publisher.objects.create(
+            name="Other Publisher",
+            location="Tokyo",
+            website="http://otherpublisher.com"
+        )
+
+        self.games = []
+        for i, genre in enumerate(("Action", "RPG", "Action")):
+            game = Game.objects.create(
+                title=f"Game {i} ✓",
+                description=f"Description {i}",
+                release_date=date(2020 + i, 1, 1),
+                genre=genre,
+                onWindows=True,
+                onMac=bool(i % 2),
+                onLinux=False
+            )
+            game.publisher.set([self.publisher] if i else [self.publisher, self.other])
+            self.games.append(game)
+
+        write_snapshot(self.path)
+
+        self.settings_override = override_settings(CATALOG_SNAPSHOT_READS=True, CATALOG_SNAPSHOT_PATH=self.path)
+        self.settings_override.enable()
+
+
+    def tearDown(self):
+        self.settings_override.disable()
+        self.tmpdir.cleanup()
+
+
+    def test_get_games_from_snapshot(self):
+        with self.assertNumQueries(0):
+            response = self.client.get(reverse('game'))
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data, GameSummarySerializer(Game.objects.order_by('id'), many=True).data)
+
+
+    def test_get_games_with_descriptions_from_snapshot(self):
+        with self.assertNumQueries(0):
+            response = self.client.get(reverse('game'), {'include': 'description'})
+
+        self.assertEqual(response.data, GameSerializer(Game.objects.order_by('id'), many=True).data)
+
+
+    def test_get_game_and_genre_from_snapshot(self):
+        with self.assertNumQueries(0):
+            response = self.client.get(reverse('game-id', args=[self.games[1].id]))
+            missing = self.client.get(reverse('game-id', args=[9999]))
+            genre = self.client.get(reverse('game-genre', args=['Action']))
+
+        self.assertEqual(response.data, GameSerializer(self.games[1]).data)
+        self.assertEqual(missing.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual([game['id'] for game in genre.data], [self.games[0].id, self.games[2].id])
+
+
+    def test_get_publishers_from_snapshot(self):
+        with self.assertNumQueries(0):
+            publishers = self.client.get(reverse('publisher'))
+            location = self.client.get(reverse('publisher-location', args=['sao paulo']))
+            games = self.client.get(reverse('publisher-games', args=[self.other.id]))
+
+        self.assertEqual(publishers.data, PublisherSerializer(Publisher.objects.order_by('id'), many=True).data)
+        self.assertEqual([publisher['id'] for publisher in location.data], [self.publisher.id])
+        self.assertEqual([game['id'] for game in games.data], [self.games[0].id])
+
+
+    def test_snapshot_swapped_on_rewrite(self):
+        first = get_snapshot()
+        self.assertIs(get_snapshot(), first)
+
+        Game.objects.filter(id=self.games[0].id).delete()
+        write_snapshot(self.path)
+
+        second = get_snapshot()
+        self.assertIsNot(second, first)
+        self.assertIsNone(second.get_game(self.games[0].id))
+        self.assertIsNotNone(first.get_game(self.games[0].id))
+
+
+    def test_writer_reads_its_own_writes(self):
+        url = reverse('game-id', args=[self.games[1].id])
+        response = self.client.put(url, {'title': 'Renamed'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        # Until the rebuild, the writer reads from the database and other clients from the snapshot
+        self.assertEqual(self.client.get(url).json()['title'], 'Renamed')
+        with self.assertNumQueries(0):
+            self.assertEqual(APIClient().get(url).json()['title'], 'Game 1 ✓')
+
+        write_snapshot(self.path)
+
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get(url).json()['title'], 'Renamed')
+
+
+    def test_writer_does_not_join_a_snapshot_flight(self):
+        url = reverse('game')
+        self.client.put(reverse('game-id', args=[self.games[1].id]), {'title': 'Renamed'}, format='json')
+
+        # A non-writer's flight started after the commit, answered from the stale snapshot
+        flight = _Flight()
+        flight.payload = (200, b'[{"title": "stale"}]', 'application/json')
+        flight.done.set()
+        flights._flights[(coalescing._generation, f'GET {url}?')] = flight
+        self.addCleanup(flights._flights.clear)
+
+        self.assertEqual(APIClient().get(url).json(), [{'title': 'stale'}])
+        self.assertEqual(self.client.get(url).json()[1]['title'], 'Renamed')
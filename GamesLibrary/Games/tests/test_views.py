@@ -1,8 +1,18 @@
+import subprocess
+import sys
+import tempfile
 from datetime import date
+from pathlib import Path
+from unittest import mock
+
+from django.db import DatabaseError, IntegrityError, connection, transaction
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 
 from Games.models import Publisher, Game
-from Games.serializers import PublisherSerializer, GameSerializer
+from Games.serializers import PublisherSerializer, GameSerializer, GameSummarySerializer
+from Games.suggest import prefix_query, title_index
 
 from rest_framework import status
 from rest_framework.test import APITestCase
@@ -115,6 +125,15 @@ class PublisherViewIdTest(APITestCase):
             self.assertEqual(response.data['location'], data['location'])
 
 
+        def test_put_publisher_if_match_conflict(self):
+            response = self.client.put(self.url, {'location': 'São Paulo'}, format='json', HTTP_IF_MATCH='W/"1"')
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertEqual(Publisher.objects.get(id=self.publisher.id).location_key, 'sao paulo')
+
+            response = self.client.put(self.url, {'location': 'Tokyo'}, format='json', HTTP_IF_MATCH='1')
+            self.assertEqual(response.status_code, status.HTTP_412_PRECONDITION_FAILED)
+
+
         def test_put_publisher_not_found(self):
             data = {
                 'name': 'Non Existent Publisher', 
@@ -144,6 +163,108 @@ class PublisherViewIdTest(APITestCase):
             self.assertEqual(response.data['detail'], 'Publisher with given ID(9999) not found.')
 
 
+class PublisherViewLocationTest(APITestCase):
+
+    def setUp(self):
+        self.publisher = Publisher.objects.create(
+            name='New Publisher',
+            location='São Paulo',
+            website='https://newpublisher.com'
+        )
+
+        Publisher.objects.create(
+            name='Sample Publisher',
+            location='sao paulo',
+            website='https://samplepublisher.com'
+        )
+
+        Publisher.objects.create(
+            name='Another Publisher',
+            location='Tokyo',
+            website='https://anotherpublisher.com'
+        )
+
+
+    def test_get_publishers_by_location_ignores_case_and_accents(self):
+        url = reverse('publisher-location', args=['SAO PAULO'])
+        response = self.client.get(url)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data), 2)
+        self.assertNotIn('location_key', response.data[0])
+
+
+    def test_get_publishers_by_location_not_found(self):
+        url = reverse('publisher-location', args=['Berlin'])
+        response = self.client.get(url)
+
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(response.data['detail'], 'Publisher with given Location(Berlin) not found.')
+
+
+    def test_get_publisher_locations(self):
+        response = self.client.get(reverse('publisher-locations'))
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([row['count'] for row in response.data], [2, 1])
+
+
+    def test_fixed_routes_do_not_shadow_locations(self):
+        for name in ('locations', 'links'):
+            Publisher.objects.create(name=f'{name} Publisher', location=name, website=f'https://{name}.com')
+
+            response = self.client.get(reverse('publisher-location', args=[name]))
+
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertEqual([row['name'] for row in response.data], [f'{name} Publisher'])
+
+
+class PublisherViewBatchTest(APITestCase):
+
+    def setUp(self):
+        self.publishers = [
+            Publisher.objects.create(
+                name=f'Publisher {i}',
+                location='Sample Location',
+                website=f'https://publisher{i}.com'
+            ) for i in range(3)
+        ]
+
+        self.url = reverse('publisher-batch')
+
+
+    def test_get_publishers_batch_keeps_order_and_reports_missing(self):
+        ids = [self.publishers[2].id, 9999, self.publishers[0].id]
+
+        with self.assertNumQueries(1):
+            response = self.client.get(self.url, {'ids': ','.join(map(str, ids))})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([row['id'] for row in response.data['results']], [ids[0], ids[2]])
+        self.assertEqual(response.data['missing'], [9999])
+
+
+    @override_settings(BATCH_MAX_IDS=2)
+    def test_get_publishers_batch_too_many_ids(self):
+        response = self.client.get(self.url, {'ids': '1,2,3'})
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+    def test_get_publishers_batch_invalid_ids(self):
+        response = self.client.get(self.url, {'ids': '1,abc'})
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data['error'], 'ids must be a comma separated list of integers.')
+
+
+    def test_get_publishers_batch_documented_url(self):
+        response = self.client.get(f'/api/publisher/batch?ids={self.publishers[0].id}')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([row['id'] for row in response.data['results']], [self.publishers[0].id])
+
+
 # -=-=- Game Urls -=-=-
 
 
@@ -171,11 +292,32 @@ class GameViewTest(APITestCase):
 
     def test_get_games_success(self):
         response = self.client.get(self.url)
+        serializer = GameSummarySerializer(Game.objects.all(), many=True)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.json()), 1)
+        self.assertEqual(response.json(), serializer.data)
+
+
+    def test_get_games_skips_descriptions(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.url)
+
+        self.assertNotIn('description', response.json()[0])
+        self.assertFalse(any('gamedescription' in query['sql'] for query in queries))
+
+
+    def test_get_games_with_descriptions(self):
+        response = self.client.get(self.url, {'include': 'description'})
+        streamed = self.client.get(self.url, {'include': 'description', 'stream': 'true'})
         serializer = GameSerializer(Game.objects.all(), many=True)
 
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(response.data), 1)
-        self.assertEqual(response.data, serializer.data)
+        self.assertEqual(response.json(), serializer.data)
+        self.assertEqual(b''.join(streamed.streaming_content), response.content)
+
+        response = self.client.get(self.url, {'include': 'reviews'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
 
 
     def test_get_games_empty(self):
@@ -203,6 +345,7 @@ class GameViewTest(APITestCase):
 
         self.assertEqual(response.status_code, status.HTTP_201_CREATED)
         self.assertEqual(response.data['title'], 'New Game')
+        self.assertEqual(Game.objects.get(title='New Game').description, 'New description')
 
 
     def test_post_game_exists(self):
@@ -250,7 +393,7 @@ class GameViewIdTestCase(APITestCase):
         serializer = GameSerializer(self.game)
         
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(response.data, serializer.data)
+        self.assertEqual(response.json(), serializer.data)
 
 
     def test_get_game_not_found(self):
@@ -270,6 +413,49 @@ class GameViewIdTestCase(APITestCase):
         self.assertEqual(response.data['title'], 'Updated Game Name')
 
 
+    def test_put_game_description(self):
+        response = self.client.put(self.url, {'description': 'Updated description.'}, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['description'], 'Updated description.')
+        self.assertEqual(response.data['version'], 2)
+        self.assertEqual(self.client.get(self.url).json()['description'], 'Updated description.')
+
+
+    def test_put_game_writes_only_changed_columns(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.put(self.url, {'genre': 'Adventure'}, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['version'], 2)
+
+        updates = [query['sql'] for query in queries if query['sql'].startswith('UPDATE "Games_game"')]
+        self.assertEqual(len(updates), 1)
+        self.assertIn('"genre"', updates[0])
+        self.assertNotIn('"description"', updates[0])
+
+
+    def test_put_game_if_match(self):
+        response = self.client.put(self.url, {'genre': 'Adventure'}, format='json', HTTP_IF_MATCH='"1"')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        response = self.client.put(self.url, {'genre': 'Puzzle'}, format='json', HTTP_IF_MATCH='"1"')
+        self.assertEqual(response.status_code, status.HTTP_412_PRECONDITION_FAILED)
+        self.assertEqual(response.data['version'], 2)
+
+        self.game.refresh_from_db()
+        self.assertEqual(self.game.genre, 'Adventure')
+
+
+    def test_put_game_publishers_bumps_version(self):
+        response = self.client.put(self.url, {'publisher': [self.publisher.id]}, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['publisher'], [self.publisher.id])
+        self.assertEqual(response.data['version'], 2)
+        self.assertEqual(self.client.get(self.url).json()['publisher'], [self.publisher.id])
+
+
     def test_put_game_not_found(self):
         data = {
             'title': 'Non Existent Game', 
@@ -303,3 +489,309 @@ class GameViewIdTestCase(APITestCase):
         
         self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
         self.assertEqual(response.data['detail'], 'Game with given ID(9999) not found.')
+
+
+class GameViewBatchTest(APITestCase):
+
+    def setUp(self):
+        self.publisher = Publisher.objects.create(
+            name="Sample Publisher",
+            location="Sample Location",
+            website="http://samplepublisher.com"
+        )
+
+        self.games = []
+        for i in range(5):
+            game = Game.objects.create(
+                title=f"Game {i}",
+                description="Sample description.",
+                release_date=date(2022, 1, 1),
+                genre="Action",
+                onWindows=True,
+                onMac=False,
+                onLinux=True
+            )
+            game.publisher.add(self.publisher)
+            self.games.append(game)
+
+        self.url = reverse('game-batch')
+
+
+    def test_get_games_batch(self):
+        ids = [game.id for game in reversed(self.games)] + [9999]
+
+        with self.assertNumQueries(2):
+            response = self.client.get(self.url, {'ids': ','.join(map(str, ids))})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([row['id'] for row in response.data['results']], ids[:-1])
+        self.assertEqual(response.data['results'][0]['publisher'], [self.publisher.id])
+        self.assertNotIn('description', response.data['results'][0])
+        self.assertEqual(response.data['missing'], [9999])
+
+
+    def test_get_games_batch_documented_url(self):
+        response = self.client.get(f'/api/game/batch?ids={self.games[0].id}')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([row['id'] for row in response.data['results']], [self.games[0].id])
+
+
+    def test_get_games_batch_with_descriptions(self):
+        ids = [game.id for game in self.games]
+
+        with self.assertNumQueries(2):
+            response = self.client.get(self.url, {'ids': ','.join(map(str, ids)), 'include': 'description'})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['results'][0]['description'], 'Sample description.')
+
+
+@override_settings(SUGGEST_INDEX_ASYNC_BUILD=False)
+class GameViewSuggestTest(APITestCase):
+
+    def setUp(self):
+        title_index.clear()
+
+        for title in ('Portal', 'Portal 2', 'Half-Life'):
+            Game.objects.create(
+                title=title,
+                description='Sample description.',
+                release_date=date(2022, 1, 1),
+                genre='Puzzle',
+                onWindows=True,
+                onMac=False,
+                onLinux=True
+            )
+
+        self.url = reverse('game-suggest')
+
+
+    def tearDown(self):
+        title_index.clear()
+
+
+    def test_suggest_by_prefix(self):
+        response = self.client.get(self.url, {'q': 'por'})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([row['title'] for row in response.data], ['Portal', 'Portal 2'])
+        self.assertTrue(title_index.ready)
+
+
+    def test_suggest_documented_url(self):
+        response = self.client.get('/api/game/suggest?q=half')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([row['title'] for row in response.data], ['Half-Life'])
+
+
+    def test_suggest_follows_saves_and_deletes(self):
+        self.client.get(self.url, {'q': 'p'})
+
+        with self.captureOnCommitCallbacks(execute=True):
+            game = Game.objects.get(title='Portal 2')
+            game.title = 'Half-Life 2'
+            game.save()
+            Game.objects.get(title='Portal').delete()
+
+        response = self.client.get(self.url, {'q': 'half'})
+        self.assertEqual([row['title'] for row in response.data], ['Half-Life', 'Half-Life 2'])
+
+        response = self.client.get(self.url, {'q': 'portal'})
+        self.assertEqual(response.data, [])
+
+
+    def test_suggest_cold_index_falls_back_to_database(self):
+        title_index._building = True
+
+        response = self.client.get(self.url, {'q': 'half', 'limit': 5})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([row['title'] for row in response.data], ['Half-Life'])
+        self.assertFalse(title_index.ready)
+
+
+    def test_suggest_cold_and_warm_agree(self):
+        for title in ('portal 3', 'PORTAL 4', 'Portals'):
+            Game.objects.create(
+                title=title,
+                description='Sample description.',
+                release_date=date(2022, 1, 1),
+                genre='Puzzle',
+                onWindows=True,
+                onMac=False,
+                onLinux=True
+            )
+
+        title_index._building = True
+        cold = self.client.get(self.url, {'q': 'PORT'}).data
+        title_index.clear()
+        warm = self.client.get(self.url, {'q': 'PORT'}).data
+
+        self.assertEqual([row['title'] for row in cold], ['Portal', 'Portal 2', 'portal 3', 'PORTAL 4', 'Portals'])
+        self.assertEqual(cold, warm)
+
+
+    def test_suggest_cold_query_uses_index(self):
+        sql, params = prefix_query('default', 'por')[:10].query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}', params)
+            plan = ' '.join(str(row) for row in cursor.fetchall())
+
+        self.assertIn('game_title_key_idx', plan)
+        self.assertNotIn('TEMP B-TREE', plan)
+
+
+    def test_changes_during_build_are_replayed(self):
+        title_index._building = True
+        pairs = title_index.load()
+
+        # Saved and deleted after the titles were read, before the index is installed
+        with self.captureOnCommitCallbacks(execute=True):
+            game = Game.objects.get(title='Portal 2')
+            game.title = 'Half-Life 2'
+            game.save()
+            Game.objects.get(title='Portal').delete()
+
+        title_index.install(pairs)
+
+        self.assertEqual([row['title'] for row in title_index.search('half', 10)], ['Half-Life', 'Half-Life 2'])
+        self.assertEqual(title_index.search('portal', 10), [])
+
+
+    def test_rolled_back_save_leaves_no_suggestion(self):
+        self.client.get(self.url, {'q': 'p'})
+
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            try:
+                with transaction.atomic():
+                    game = Game.objects.get(title='Portal 2')
+                    game.title = 'Phantom'
+                    game.save()
+                    raise IntegrityError
+            except IntegrityError:
+                pass
+
+        self.assertEqual(callbacks, [])
+        self.assertEqual(self.client.get(self.url, {'q': 'phantom'}).data, [])
+        self.assertEqual([row['title'] for row in self.client.get(self.url, {'q': 'portal 2'}).data], ['Portal 2'])
+
+
+    def test_failed_build_is_retried(self):
+        with mock.patch.object(title_index, 'load', side_effect=DatabaseError('unavailable')):
+            response = self.client.get(self.url, {'q': 'half'})
+
+        # Answered from the database, and the next lookup builds the index
+        self.assertEqual([row['title'] for row in response.data], ['Half-Life'])
+        self.assertFalse(title_index.ready)
+
+        self.client.get(self.url, {'q': 'half'})
+        self.assertTrue(title_index.ready)
+
+
+# -=-=- Schema Tests -=-=-
+
+
+class SchemaViewTest(APITestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.schema_file = Path(self.tmpdir.name) / 'schema.yml'
+        self.url = reverse('schema')
+
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+
+    def test_get_schema_from_file_with_cache_headers(self):
+        self.schema_file.write_text('openapi: 3.0.3\n')
+
+        with override_settings(API_SCHEMA_FILE=self.schema_file):
+            response = self.client.get(self.url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertEqual(response.content, b'openapi: 3.0.3\n')
+            self.assertIn('max-age=3600', response['Cache-Control'])
+
+            response = self.client.get(self.url, HTTP_IF_NONE_MATCH=response['ETag'])
+            self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+
+    def test_get_schema_generated_when_file_missing(self):
+        with override_settings(API_SCHEMA_FILE=self.schema_file):
+            response = self.client.get(self.url)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn(b'GamesLibraryAPI', response.content)
+        # The views' deferred annotations are applied
+        self.assertIn(b'Get a game by ID', response.content)
+        self.assertIn(b'Idempotency-Key', response.content)
+
+
+    def test_schema_generator_not_imported_at_startup(self):
+        code = (
+            'import sys, gamesLibrary.wsgi; from django.urls import resolve; resolve("/api/game/"); '
+            'print(sorted(m for m in sys.modules if m.startswith("drf_spectacular.")))'
+        )
+        output = subprocess.run(
+            [sys.executable, '-c', code], cwd=Path(__file__).resolve().parents[2],
+            capture_output=True, text=True, check=True
+        ).stdout
+
+        self.assertNotIn('drf_spectacular.openapi', output)
+        self.assertNotIn('drf_spectacular.utils', output)
+
+
+# -=-=- Ordering Tests -=-=-
+
+
+class OrderingTest(APITestCase):
+
+    def setUp(self):
+        self.publisher = Publisher.objects.create(
+            name="Sample Publisher",
+            location="Sample Location",
+            website="http://samplepublisher.com"
+        )
+
+        for title, release_date in (('B', date(2020, 1, 1)), ('A', date(2020, 1, 1)), ('C', date(2021, 1, 1))):
+            Game.objects.create(
+                title=title,
+                description="Sample description.",
+                release_date=release_date,
+                genre="Action",
+                onWindows=True,
+                onMac=False,
+                onLinux=True
+            ).publisher.add(self.publisher)
+
+
+    def test_get_games_ordered(self):
+        response = self.client.get(reverse('game'), {'ordering': '-release_date,title'})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([game['title'] for game in response.json()], ['C', 'A', 'B'])
+
+        response = self.client.get(reverse('game-genre', args=['Action']), {'ordering': 'title'})
+        self.assertEqual([game['title'] for game in response.json()], ['A', 'B', 'C'])
+
+
+    def test_get_games_invalid_ordering(self):
+        response = self.client.get(reverse('game'), {'ordering': 'description'})
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+    def test_ordered_listing_uses_index(self):
+        for queryset in (
+            Game.objects.order_by('-release_date', 'title'),
+            Game.objects.filter(genre='Action').order_by('-release_date', 'title'),
+            Publisher.objects.order_by('location', 'name'),
+        ):
+            with connection.cursor() as cursor:
+                sql, params = queryset.query.sql_with_params()
+                cursor.execute(f'EXPLAIN QUERY PLAN {sql}', params)
+                plan = ' '.join(str(row) for row in cursor.fetchall())
+
+            self.assertNotIn('TEMP B-TREE', plan)
@@ -0,0 +1,87 @@
+import re
+
+from django.db import router, transaction
+from django.db.models import F
+from django.db.models.signals import post_save, pre_save
+
+from .exceptions import VersionConflictException
+
+# Single-statement partial updates with optimistic concurrency.
+#
+# Only the changed columns are written, in one UPDATE ... WHERE id = ? [AND
+# version = ?] that also bumps the version, so concurrent writers cannot
+# silently overwrite each other and no row lock is held between read and write.
+# pre_save and post_save are sent by hand because QuerySet.update() skips them.
+
+_IF_MATCH = re.compile(r'^\s*(?:W/)?"?(\d+)"?\s*$')
+
+
+def parse_if_match(request):
+    # Expected version from If-Match ("3", W/"3" or 3); None when the header is absent
+    header = request.headers.get('If-Match')
+    if header is None or header.strip() == '*':
+        return None
+
+    match = _IF_MATCH.match(header)
+    if match is None:
+        raise ValueError('If-Match must be a resource version, e.g. "3".')
+
+    return int(match.group(1))
+
+
+def versioned_update(instance, validated_data, expected_version=None):
+    model = type(instance)
+    many_to_many = {field.name for field in model._meta.many_to_many}
+    columns = {field.name for field in model._meta.concrete_fields}
+
+    changes = {
+        field: value for field, value in validated_data.items()
+        if field not in many_to_many and getattr(instance, field) != value
+    }
+    relations = {field: value for field, value in validated_data.items() if field in many_to_many}
+
+    if hasattr(instance, 'derived_changes'):
+        changes.update(instance.derived_changes(changes))
+
+    using = router.db_for_write(model, instance=instance)
+    rows = model._default_manager.using(using).filter(id=instance.id)
+    if expected_version is not None:
+        rows = rows.filter(version=expected_version)
+
+    update_fields = frozenset(changes) | {'version'}
+
+    with transaction.atomic(using=using):
+        # Links change before the row, so their signal handlers see the stored
+        # columns (e.g. the release year) and post_save moves them like any link
+        for field, value in relations.items():
+            getattr(instance, field).set(value)
+
+        for field, value in changes.items():
+            setattr(instance, field, value)
+
+        pre_save.send(sender=model, instance=instance, raw=False, using=rows.db, update_fields=update_fields)
+        updated = rows.update(
+            **{field: value for field, value in changes.items() if field in columns}, version=F('version') + 1
+        )
+
+        if not updated:
+            current_version = model._default_manager.using(using).filter(id=instance.id).values_list('version', flat=True).first()
+            if current_version is None:
+                raise model.DoesNotExist
+            raise VersionConflictException(current_version)
+
+        if expected_version is not None:
+            instance.version = expected_version + 1
+        else:
+            instance.refresh_from_db(fields=['version'])
+
+        # Attributes stored outside the row, like Game.description
+        if hasattr(instance, 'save_description'):
+            instance.save_description()
+
+        post_save.send(
+            sender=model, instance=instance, created=False,
+            update_fields=update_fields, raw=False, using=rows.db
+        )
+
+    return instance
@@ -1,16 +1,38 @@
 from django.urls import path
 from . import views
+from .events import events_view
 
 # Register your urls here.
+# The batch and suggest routes keep the URLs clients were given and are listed
+# before the <str:...> lookups, which they take precedence over. Other fixed
+# routes beside a lookup end with a slash, which the lookup never matches, so
+# no location name can be shadowed by them.
 
 urlpatterns = [    
     path('publisher/', views.PublisherView.as_view(), name='publisher'),
     path('publisher/<int:id>', views.PublisherViewId.as_view(), name='publisher-id'),
+    path('publisher/batch', views.PublisherViewBatch.as_view(), name='publisher-batch'),
+    path('publisher/locations/', views.PublisherViewLocations.as_view(), name='publisher-locations'),
+    path('publisher/links/', views.PublisherViewLinks.as_view(), name='publisher-links'),
     path('publisher/<str:location>', views.PublisherViewLocation.as_view(), name='publisher-location'),
     path('publisher/<int:id>/games', views.PublisherViewGames.as_view(), name='publisher-games'),
+    path('publisher/<int:id>/related', views.PublisherViewRelated.as_view(), name='publisher-related'),
     
     path('game/', views.GameView.as_view(), name='game'),
+    path('game/batch', views.GameViewBatch.as_view(), name='game-batch'),
+    path('game/suggest', views.GameViewSuggest.as_view(), name='game-suggest'),
     path('game/<int:id>', views.GameViewId.as_view(), name='game-id'),
+    path('game/<int:id>/similar', views.GameViewSimilar.as_view(), name='game-similar'),
     path('game/<str:genre>', views.GameViewGenre.as_view(), name='game-genre'),
+
+    path('jobs/', views.JobView.as_view(), name='jobs'),
+    path('jobs/<int:id>', views.JobViewId.as_view(), name='job-id'),
+    path('jobs/<int:id>/result', views.JobViewResult.as_view(), name='job-result'),
+
+    path('stats/genres', views.ReleaseStatsView.as_view(dimension='genre'), name='stats-genres'),
+    path('stats/publishers', views.ReleaseStatsView.as_view(dimension='publisher'), name='stats-publishers'),
+    path('stats/platforms', views.ReleaseStatsView.as_view(dimension='platform'), name='stats-platforms'),
+
+    path('events', events_view, name='events'),
     
 ]
@@ -1,13 +1,33 @@
 import logging
 
-from .models import Game, Publisher
-from .serializers import GameSerializer, PublisherSerializer 
+from django.conf import settings
+from django.http import FileResponse
+from django.urls import reverse
+from django.db.models import Count, Min, Sum
+
+from .coalescing import coalesced
+from .exceptions import VersionConflictException
+from .idempotency import idempotent
+from .documents import (
+    gather_game_fragments, game_fragments, iter_game_fragments,
+    json_array_response, json_array_stream, json_object_response,
+)
+from .jobs import submit_job
+from .links import change_links, existing_game_ids, move_links
+from .models import CoPublisher, Game, Job, Publisher, ReleaseRollup, SimilarGame, normalize_location
+from .serializers import (
+    GameSerializer, GameSummarySerializer, JobSerializer, PublisherLinksSerializer, PublisherSerializer,
+)
+from .sharding import ids_by_shard, shard_games
+from .snapshot import get_snapshot
+from .suggest import suggest_titles
+from .updates import parse_if_match, versioned_update
 
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from rest_framework import status
 
-from drf_spectacular.utils import extend_schema
+from gamesLibrary.docs import OpenApiParameter, extend_schema
 
 # Create your views here.
 
@@ -15,17 +35,116 @@ logger = logging.getLogger('ViewsLog: ')
 
 # TODO : Improve the logging, error handling, and response consistency.
 
+
+def parse_batch_ids(request):
+    # Parses ?ids=1,2,3 keeping the requested order and dropping duplicates
+    raw = request.query_params.get('ids', '')
+
+    try:
+        ids = [int(value) for value in raw.split(',') if value.strip()]
+    except ValueError:
+        raise ValueError('ids must be a comma separated list of integers.') from None
+
+    ids = list(dict.fromkeys(ids))
+    if not ids:
+        raise ValueError('At least one id is required.')
+
+    if len(ids) > settings.BATCH_MAX_IDS:
+        raise ValueError(f'At most {settings.BATCH_MAX_IDS} ids can be requested at once.')
+
+    return ids
+
+
+def batch_response(ids, objects, serializer_class):
+    found = {obj.id: obj for obj in objects}
+    ordered = [found[id] for id in ids if id in found]
+
+    return Response({
+        'results': serializer_class(ordered, many=True).data,
+        'missing': [id for id in ids if id not in found],
+    })
+
+
+BATCH_IDS_PARAMETER = OpenApiParameter('ids', str, description='Comma separated ids')
+
+
+# Whitelisted ?ordering= fields, each backed by an index in models.py
+GAME_ORDERING_FIELDS = ('id', 'title', 'release_date', 'genre')
+GAME_UNIQUE_FIELDS = ('id', 'title')
+
+PUBLISHER_ORDERING_FIELDS = ('id', 'name', 'location')
+PUBLISHER_UNIQUE_FIELDS = ('id', 'name')
+
+DEFAULT_ORDERING = ['id']
+
+ORDERING_PARAMETER = OpenApiParameter(
+    'ordering', str, description='Comma separated fields, prefix with - for descending (e.g. -release_date,title)'
+)
+
+
+def parse_ordering(request, allowed_fields, unique_fields):
+    # Parses ?ordering=-release_date,title and appends id as a tie-breaker when needed
+    raw = request.query_params.get('ordering', '')
+    ordering = [value.strip() for value in raw.split(',') if value.strip()]
+
+    for value in ordering:
+        if value.lstrip('-') not in allowed_fields:
+            raise ValueError(f'Invalid ordering field: {value}. Allowed: {", ".join(allowed_fields)}.')
+
+    if not any(value.lstrip('-') in unique_fields for value in ordering):
+        ordering.append('id')
+
+    return ordering
+
+
+STREAM_PARAMETER = OpenApiParameter(
+    'stream', bool, description='Stream the JSON array while reading the games in chunks, for very large lists'
+)
+
+INCLUDE_PARAMETER = OpenApiParameter(
+    'include', str, description='Set to description to add the game descriptions, left out of lists by default'
+)
+
+IDEMPOTENCY_KEY_PARAMETER = OpenApiParameter(
+    'Idempotency-Key', str, OpenApiParameter.HEADER,
+    description='Client-chosen key; retries with the same key and body replay the first response'
+)
+
+
+def wants_stream(request):
+    return request.query_params.get('stream', '').lower() in ('1', 'true', 'yes')
+
+
+def wants_description(request):
+    include = {value.strip() for value in request.query_params.get('include', '').split(',') if value.strip()}
+    if include - {'description'}:
+        raise ValueError('include only accepts description.')
+    return 'description' in include
+
+
+def ordered_snapshot(ordering):
+    # The snapshot keeps rows in id order, so it only serves the default ordering
+    return get_snapshot() if ordering == DEFAULT_ORDERING else None
+
+
 # -=-=- Publisher Urls -=-=-
 
 
 # Views for Publisher
 @extend_schema(tags=['Publisher'])
 class PublisherView(APIView):
-    @extend_schema(summary='List all publishers')
+    @extend_schema(summary='List all publishers', parameters=[ORDERING_PARAMETER])
+    @coalesced
     def get(self, request):
         try:
 
-            publishers = Publisher.objects.all()
+            ordering = parse_ordering(request, PUBLISHER_ORDERING_FIELDS, PUBLISHER_UNIQUE_FIELDS)
+
+            snapshot = ordered_snapshot(ordering)
+            if snapshot is not None:
+                return Response(snapshot.all_publishers())
+
+            publishers = Publisher.objects.order_by(*ordering)
 
             if not publishers:
                 logger.debug('No publishers found.')
@@ -34,6 +153,11 @@ class PublisherView(APIView):
             serializer = PublisherSerializer(publishers, many=True)
             return Response(serializer.data)
 
+        except ValueError as e:
+
+            logger.debug(f'Invalid ordering: {e}')
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
         except Exception as e:
 
             logger.error(f"Error while listing publishers: {e}")
@@ -43,7 +167,8 @@ class PublisherView(APIView):
             )
     
 
-    @extend_schema(summary='Create a new publisher')
+    @extend_schema(summary='Create a new publisher', parameters=[IDEMPOTENCY_KEY_PARAMETER])
+    @idempotent
     def post(self, request):
         try:
 
@@ -73,6 +198,13 @@ class PublisherViewId(APIView):
     def get(self, request, id):
         try:
 
+            snapshot = get_snapshot()
+            if snapshot is not None:
+                publisher = snapshot.get_publisher(id)
+                if publisher is None:
+                    raise(Publisher.DoesNotExist)
+                return Response(publisher)
+
             publisher = Publisher.objects.get(id=id)
             serializer = PublisherSerializer(publisher)
             return Response(serializer.data)
@@ -95,16 +227,18 @@ class PublisherViewId(APIView):
             )
         
 
-    @extend_schema(summary='Update a publisher by ID')
+    @extend_schema(summary='Update a publisher by ID', parameters=[IDEMPOTENCY_KEY_PARAMETER])
+    @idempotent
     def put(self, request, id):
         try:
 
+            expected_version = parse_if_match(request)
             publisher = Publisher.objects.get(id=id)
             serializer = PublisherSerializer(publisher, data=request.data, partial=True)
         
             if serializer.is_valid():
-                serializer.save()
-                return Response(serializer.data, status=status.HTTP_200_OK)
+                versioned_update(publisher, serializer.validated_data, expected_version)
+                return Response(PublisherSerializer(publisher).data, status=status.HTTP_200_OK)
         
             else:
                 logger.error('Error while updating publisher.')
@@ -115,6 +249,19 @@ class PublisherViewId(APIView):
             logger.error(f'Publisher with given ID({id}) not found.')
             return Response({'detail': f'Publisher with given ID({id}) not found.'}, status=status.HTTP_404_NOT_FOUND)
         
+        except VersionConflictException as e:
+
+            logger.debug(f'Publisher with given ID({id}) was modified concurrently.')
+            return Response(
+                {'detail': e.detail, 'version': e.current_version},
+                status=status.HTTP_412_PRECONDITION_FAILED
+            )
+
+        except ValueError as e:
+
+            logger.debug(f'Invalid If-Match header: {e}')
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
         except Exception as e:
             logger.error('Error while updating publisher.')
             return Response(
@@ -155,14 +302,114 @@ class PublisherViewId(APIView):
             )
 
 
+# Views for a batch of Publishers
+@extend_schema(tags=['Publisher'])
+class PublisherViewBatch(APIView):
+    @extend_schema(summary='Get several publishers by ID', parameters=[BATCH_IDS_PARAMETER])
+    def get(self, request):
+        try:
+
+            ids = parse_batch_ids(request)
+            publishers = Publisher.objects.filter(id__in=ids)
+            return batch_response(ids, publishers, PublisherSerializer)
+
+        except ValueError as e:
+
+            logger.debug(f'Invalid publisher batch request: {e}')
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        except Exception as e:
+
+            logger.error(e)
+            return Response(
+                {
+                    'status': 'error',
+                    'message': 'Error while fetching publishers.',
+                    'error': str(e)
+                }, status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+
+
+# View for bulk changes to the Game <-> Publisher links
+@extend_schema(tags=['Publisher'])
+class PublisherViewLinks(APIView):
+    @extend_schema(
+        summary='Add, remove or move publisher links of many games',
+        request=PublisherLinksSerializer,
+        parameters=[IDEMPOTENCY_KEY_PARAMETER],
+    )
+    @idempotent
+    def post(self, request):
+        try:
+
+            serializer = PublisherLinksSerializer(data=request.data)
+
+            if not serializer.is_valid():
+                logger.error(f'Publisher links validation failed: {serializer.errors}')
+                return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+            data = serializer.validated_data
+            publisher_ids = data.get('publishers', []) + [
+                data[field] for field in ('from_publisher', 'to_publisher') if field in data
+            ]
+            game_ids = data.get('games')
+
+            found = set(Publisher.objects.filter(id__in=publisher_ids).values_list('id', flat=True))
+            missing = {
+                'publishers': [id for id in publisher_ids if id not in found],
+                'games': [],
+            }
+            if game_ids is not None:
+                found = existing_game_ids(game_ids)
+                missing['games'] = [id for id in game_ids if id not in found]
+
+            if missing['publishers'] or missing['games']:
+                logger.debug(f'Publisher links request with unknown ids: {missing}')
+                return Response(
+                    {'error': 'Unknown publisher or game ids.', 'missing': missing},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+
+            if data['action'] == 'move':
+                added, removed = move_links(data['from_publisher'], data['to_publisher'], game_ids)
+            elif data['action'] == 'add':
+                added, removed = change_links(game_ids, add=data['publishers'])
+            else:
+                added, removed = change_links(game_ids, remove=data['publishers'])
+
+            return Response({
+                'added': len(added),
+                'removed': len(removed),
+                'games': len({game_id for game_id, _ in added + removed}),
+            })
+
+        except Exception as e:
+
+            logger.error(f'Error while changing publisher links: {e}')
+            return Response(
+                {'status': 'error', 'message': 'Error while changing publisher links', 'error': str(e)},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+
+
 @extend_schema(tags=['Publisher'])
 # View for Publisher with Location
 class PublisherViewLocation(APIView):
-    @extend_schema(summary='Get a publisher by Location')
+    @extend_schema(summary='Get a publisher by Location', parameters=[ORDERING_PARAMETER])
+    @coalesced
     def get(self, request, location):
         try:
 
-            publishers = Publisher.objects.filter(location=location)
+            ordering = parse_ordering(request, PUBLISHER_ORDERING_FIELDS, PUBLISHER_UNIQUE_FIELDS)
+
+            snapshot = ordered_snapshot(ordering)
+            if snapshot is not None:
+                publishers = snapshot.publishers_by_location_key(normalize_location(location))
+                if not publishers:
+                    raise(Publisher.DoesNotExist)
+                return Response(publishers)
+
+            publishers = Publisher.objects.filter(location_key=normalize_location(location)).order_by(*ordering)
 
             if not publishers:
                 raise(Publisher.DoesNotExist)
@@ -175,6 +422,11 @@ class PublisherViewLocation(APIView):
             logger.debug(f'Publisher with given Location({location}) not found.')
             return Response({'detail': f'Publisher with given Location({location}) not found.'}, status=status.HTTP_404_NOT_FOUND)
         
+        except ValueError as e:
+
+            logger.debug(f'Invalid ordering: {e}')
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
         except Exception as e:
 
             logger.error(e)
@@ -187,24 +439,79 @@ class PublisherViewLocation(APIView):
             )
 
 
+@extend_schema(tags=['Publisher'])
+# View for distinct Publisher Locations
+class PublisherViewLocations(APIView):
+    @extend_schema(summary='List distinct publisher locations with counts')
+    @coalesced
+    def get(self, request):
+        try:
+
+            locations = (
+                Publisher.objects
+                .values('location_key')
+                .annotate(location=Min('location'), count=Count('id'))
+                .order_by('location_key')
+            )
+
+            return Response([
+                {'location': row['location'], 'count': row['count']}
+                for row in locations
+            ])
+
+        except Exception as e:
+
+            logger.error(e)
+            return Response(
+                {
+                    'status': 'error',
+                    'message': 'Error while listing publisher locations.',
+                    'error': str(e)
+                }, status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+
+
 @extend_schema(tags=['Publisher'])
 # View for Publisher with Location
 class PublisherViewGames(APIView):
-    @extend_schema(summary='Get games from a publisher by ID')
+    @extend_schema(
+        summary='Get games from a publisher by ID',
+        parameters=[ORDERING_PARAMETER, STREAM_PARAMETER, INCLUDE_PARAMETER],
+    )
+    @coalesced
     def get(self, request, id):
         try:
 
+            ordering = parse_ordering(request, GAME_ORDERING_FIELDS, GAME_UNIQUE_FIELDS)
+            descriptions = wants_description(request)
+
+            snapshot = ordered_snapshot(ordering)
+            if snapshot is not None:
+                row = snapshot.publisher_row(id)
+                if row is None:
+                    raise(Publisher.DoesNotExist)
+                return Response(snapshot.publisher_games(row, descriptions))
+
             publisher = Publisher.objects.get(id=id)
-            games = publisher.games.all()
-            serializer = GameSerializer(games, many=True)
-            return Response(serializer.data)
+            games = Game.objects.filter(publisher=publisher)
+
+            if wants_stream(request):
+                return json_array_stream(
+                    iter_game_fragments(games, ordering, settings.LIST_STREAM_CHUNK_SIZE, descriptions)
+                )
+
+            return json_array_response(gather_game_fragments(games, ordering, descriptions))
         
         except Publisher.DoesNotExist:
 
             logger.debug(f'Publisher with given ID({id}) not found.')
             return Response({'detail': f'Publisher with given ID({id}) not found.'}, status=status.HTTP_404_NOT_FOUND)
 
-        
+        except ValueError as e:
+
+            logger.debug(f'Invalid list parameters: {e}')
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
         except Exception as e:
 
             logger.error(e)
@@ -217,24 +524,116 @@ class PublisherViewGames(APIView):
             )
         
 
+# Views for Publishers sharing games with a Publisher
+@extend_schema(tags=['Publisher'])
+class PublisherViewRelated(APIView):
+    @extend_schema(
+        summary='Get publishers that co-publish games with a publisher by ID',
+        parameters=[
+            OpenApiParameter('limit', int, description='Maximum number of neighbors per hop'),
+            OpenApiParameter('hops', int, description='1, or 2 to also list the neighbors of the neighbors'),
+        ],
+    )
+    @coalesced
+    def get(self, request, id):
+        try:
+
+            try:
+                limit = max(1, min(int(request.query_params.get('limit', 10)), 100))
+                hops = int(request.query_params.get('hops', 1))
+            except ValueError:
+                return Response({'error': 'limit and hops must be integers.'}, status=status.HTTP_400_BAD_REQUEST)
+
+            if hops not in (1, 2):
+                return Response({'error': 'hops must be 1 or 2.'}, status=status.HTTP_400_BAD_REQUEST)
+
+            if not Publisher.objects.filter(id=id).exists():
+                raise(Publisher.DoesNotExist)
+
+            neighbors = list(
+                CoPublisher.objects
+                .filter(publisher_id=id)
+                .order_by('-shared_games', 'other_id')
+                .values('other_id', 'other__name', 'shared_games')[:limit]
+            )
+            result = {
+                'related': [
+                    {'id': row['other_id'], 'name': row['other__name'], 'shared_games': row['shared_games']}
+                    for row in neighbors
+                ]
+            }
+
+            if hops == 2:
+                # Ranked by how many of the neighbors lead to them, then by the games shared with those
+                neighbor_ids = [row['other_id'] for row in neighbors]
+                second = (
+                    CoPublisher.objects
+                    .filter(publisher_id__in=neighbor_ids)
+                    .exclude(other_id__in=[id, *neighbor_ids])
+                    .values('other_id', 'other__name')
+                    .annotate(via=Count('publisher_id'), shared_games=Sum('shared_games'))
+                    .order_by('-via', '-shared_games', 'other_id')[:limit]
+                )
+                result['two_hop'] = [
+                    {'id': row['other_id'], 'name': row['other__name'], 'via': row['via'],
+                     'shared_games': row['shared_games']}
+                    for row in second
+                ]
+
+            return Response(result)
+
+        except Publisher.DoesNotExist:
+
+            logger.debug(f'Publisher with given ID({id}) not found.')
+            return Response({'detail': f'Publisher with given ID({id}) not found.'}, status=status.HTTP_404_NOT_FOUND)
+
+        except Exception as e:
+
+            logger.error(e)
+            return Response(
+                {
+                    'status': 'error',
+                    'message': 'Error while listing related publishers.',
+                    'error': str(e)
+                }, status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+
+
 # -=-=- Games Urls -=-=-
 
 # Views for Game
 @extend_schema(tags=['Games'])
 class GameView(APIView):
-    @extend_schema(summary='List all games')
+    @extend_schema(summary='List all games', parameters=[ORDERING_PARAMETER, STREAM_PARAMETER, INCLUDE_PARAMETER])
+    @coalesced
     def get(self, request):
         try:
 
-            games = Game.objects.all()
+            ordering = parse_ordering(request, GAME_ORDERING_FIELDS, GAME_UNIQUE_FIELDS)
+            descriptions = wants_description(request)
+
+            snapshot = ordered_snapshot(ordering)
+            if snapshot is not None:
+                return Response(snapshot.all_games(descriptions))
+
+            if wants_stream(request):
+                return json_array_stream(
+                    iter_game_fragments(Game.objects.all(), ordering, settings.LIST_STREAM_CHUNK_SIZE, descriptions)
+                )
+
+            fragments = gather_game_fragments(Game.objects.all(), ordering, descriptions)
             
-            if not games:
+            if not fragments:
                 logger.debug('No games found.')
                 return Response([], status=status.HTTP_200_OK)
             
-            serializer = GameSerializer(games, many=True)
-            return Response(serializer.data)
+            return json_array_response(fragments)
         
+        except ValueError as e:
+
+            logger.debug(f'Invalid list parameters: {e}')
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
         except Exception as e:
 
             logger.error(e)
@@ -247,7 +646,8 @@ class GameView(APIView):
             )
     
 
-    @extend_schema(summary='Create a new game')
+    @extend_schema(summary='Create a new game', parameters=[IDEMPOTENCY_KEY_PARAMETER])
+    @idempotent
     def post(self, request):
         try:
 
@@ -272,6 +672,81 @@ class GameView(APIView):
             )
 
 
+# Views for Game title suggestions
+@extend_schema(tags=['Games'])
+class GameViewSuggest(APIView):
+    @extend_schema(
+        summary='Suggest game titles by prefix',
+        parameters=[
+            OpenApiParameter('q', str, description='Title prefix'),
+            OpenApiParameter('limit', int, description='Maximum number of suggestions'),
+        ],
+    )
+    def get(self, request):
+        try:
+
+            prefix = request.query_params.get('q', '').strip()
+            if not prefix:
+                return Response([], status=status.HTTP_200_OK)
+
+            try:
+                limit = int(request.query_params.get('limit', 10))
+            except ValueError:
+                return Response({'error': 'limit must be an integer.'}, status=status.HTTP_400_BAD_REQUEST)
+
+            limit = max(1, min(limit, 50))
+            return Response(suggest_titles(prefix, limit))
+
+        except Exception as e:
+
+            logger.error(e)
+            return Response(
+                {
+                    'status': 'error',
+                    'message': 'Error while suggesting games.',
+                    'error': str(e)
+                }, status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+
+
+# Views for a batch of Games
+@extend_schema(tags=['Games'])
+class GameViewBatch(APIView):
+    @extend_schema(summary='Get several games by ID', parameters=[BATCH_IDS_PARAMETER, INCLUDE_PARAMETER])
+    def get(self, request):
+        try:
+
+            ids = parse_batch_ids(request)
+            games = Game.objects.prefetch_related('publisher')
+
+            if wants_description(request):
+                games, serializer_class = games.select_related('compressed_description'), GameSerializer
+            else:
+                serializer_class = GameSummarySerializer
+
+            games = [
+                game for alias, shard_ids in ids_by_shard(ids).items()
+                for game in games.using(alias).filter(id__in=shard_ids)
+            ]
+            return batch_response(ids, games, serializer_class)
+
+        except ValueError as e:
+
+            logger.debug(f'Invalid game batch request: {e}')
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        except Exception as e:
+
+            logger.error(e)
+            return Response(
+                {
+                    'status': 'error',
+                    'message': 'Error while fetching games.',
+                    'error': str(e)
+                }, status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+
+
 # Views for Game with Id
 @extend_schema(tags=['Games'])
 class GameViewId(APIView):
@@ -279,9 +754,19 @@ class GameViewId(APIView):
     def get(self, request, id):
         try:
 
-            game = Game.objects.get(id=id)
-            serializer = GameSerializer(game)
-            return Response(serializer.data)
+            snapshot = get_snapshot()
+            if snapshot is not None:
+                game = snapshot.get_game(id)
+                if game is None:
+                    raise(Game.DoesNotExist)
+                return Response(game)
+
+            fragments = game_fragments(shard_games(id).filter(id=id), descriptions=True)
+
+            if not fragments:
+                raise(Game.DoesNotExist)
+
+            return json_object_response(fragments[0])
         
         except Game.DoesNotExist:
 
@@ -300,16 +785,18 @@ class GameViewId(APIView):
             )
     
 
-    @extend_schema(summary='Update a game by ID')
+    @extend_schema(summary='Update a game by ID', parameters=[IDEMPOTENCY_KEY_PARAMETER])
+    @idempotent
     def put(self, request, id):
         try:
 
-            game = Game.objects.get(id=id)
+            expected_version = parse_if_match(request)
+            game = shard_games(id).get(id=id)
             serializer = GameSerializer(game, data=request.data, partial=True)
             
             if serializer.is_valid():
-                serializer.save()
-                return Response(serializer.data, status=status.HTTP_200_OK)
+                versioned_update(game, serializer.validated_data, expected_version)
+                return Response(GameSerializer(game).data, status=status.HTTP_200_OK)
             
             else:
                 logger.error('Error while updating game.')
@@ -320,6 +807,19 @@ class GameViewId(APIView):
             logger.error(f'Game with given ID({id}) not found.')
             return Response({'detail': f'Game with given ID({id}) not found.'}, status=status.HTTP_404_NOT_FOUND)
         
+        except VersionConflictException as e:
+
+            logger.debug(f'Game with given ID({id}) was modified concurrently.')
+            return Response(
+                {'detail': e.detail, 'version': e.current_version},
+                status=status.HTTP_412_PRECONDITION_FAILED
+            )
+
+        except ValueError as e:
+
+            logger.debug(f'Invalid If-Match header: {e}')
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
         except Exception as e:
             logger.error(e)
             return Response(
@@ -335,7 +835,7 @@ class GameViewId(APIView):
     def delete(self, request, id):
         try:
 
-            game = Game.objects.get(id=id)
+            game = shard_games(id).get(id=id)
             game.delete()
             
             return Response(
@@ -359,26 +859,80 @@ class GameViewId(APIView):
             )
 
 
+# Views for Games similar to a Game
+@extend_schema(tags=['Games'])
+class GameViewSimilar(APIView):
+    @extend_schema(summary='Get games similar to a game by ID')
+    def get(self, request, id):
+        try:
+
+            similar = list(
+                SimilarGame.objects
+                .filter(game_id=id)
+                .order_by('rank')
+                .values('similar_id', 'similar__title', 'score')
+            )
+
+            if not similar and not shard_games(id).filter(id=id).exists():
+                raise(Game.DoesNotExist)
+
+            return Response([
+                {'id': row['similar_id'], 'title': row['similar__title'], 'score': row['score']}
+                for row in similar
+            ])
+
+        except Game.DoesNotExist:
+
+            logger.debug(f'Game with given ID ({id}) not found.')
+            return Response({'detail': f'Game with given ID({id}) not found.'}, status=status.HTTP_404_NOT_FOUND)
+
+        except Exception as e:
+
+            logger.error(e)
+            return Response(
+                {
+                    'status': 'error',
+                    'message': 'Error while listing similar games.',
+                    'error': str(e)
+                }, status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+
+
 @extend_schema(tags=['Games'])
 # Views for Game with Genre
 class GameViewGenre(APIView):
-    @extend_schema(summary='Get games by Genre')
+    @extend_schema(summary='Get games by Genre', parameters=[ORDERING_PARAMETER, INCLUDE_PARAMETER])
+    @coalesced
     def get(self, request, genre):
         try:
 
-            games = Game.objects.filter(genre=genre)
+            ordering = parse_ordering(request, GAME_ORDERING_FIELDS, GAME_UNIQUE_FIELDS)
+            descriptions = wants_description(request)
+
+            snapshot = ordered_snapshot(ordering)
+            if snapshot is not None:
+                games = snapshot.games_by_genre(genre, descriptions)
+                if not games:
+                    raise(Game.DoesNotExist)
+                return Response(games)
 
-            if not games:
+            fragments = gather_game_fragments(Game.objects.filter(genre=genre), ordering, descriptions)
+
+            if not fragments:
                 raise(Game.DoesNotExist)
 
-            serializer = GameSerializer(games, many=True)
-            return Response(serializer.data)
+            return json_array_response(fragments)
         
         except Game.DoesNotExist:
 
             logger.debug(f'No games found with given genre({genre}).')
             return Response({'detail': f'No games found with given genre({genre}).'}, status=status.HTTP_404_NOT_FOUND)
         
+        except ValueError as e:
+
+            logger.debug(f'Invalid list parameters: {e}')
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
         except Exception as e:
 
             logger.error(e)
@@ -389,3 +943,164 @@ class GameViewGenre(APIView):
                     'error': str(e)
                 }, status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
+
+
+# -=-=- Jobs Urls -=-=-
+
+# Views for Jobs
+@extend_schema(tags=['Jobs'])
+class JobView(APIView):
+    @extend_schema(summary='Submit a background job', request=JobSerializer)
+    def post(self, request):
+        try:
+
+            serializer = JobSerializer(data=request.data)
+
+            if not serializer.is_valid():
+                logger.error(f'Job validation failed: {serializer.errors}')
+                return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+            job = submit_job(serializer.validated_data['kind'], serializer.validated_data.get('params'))
+            return Response(JobSerializer(job).data, status=status.HTTP_202_ACCEPTED)
+
+        except ValueError as e:
+
+            logger.debug(f'Invalid job submission: {e}')
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        except Exception as e:
+
+            logger.error(e)
+            return Response(
+                {
+                    'status': 'error',
+                    'message': 'Error while submitting job.',
+                    'error': str(e)
+                }, status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+
+
+# Views for Job with Id
+@extend_schema(tags=['Jobs'])
+class JobViewId(APIView):
+    @extend_schema(summary='Get the status of a job by ID')
+    def get(self, request, id):
+        try:
+
+            job = Job.objects.get(id=id)
+            data = JobSerializer(job).data
+            if job.result_file:
+                data['result'] = request.build_absolute_uri(reverse('job-result', args=[job.id]))
+
+            return Response(data)
+
+        except Job.DoesNotExist:
+
+            logger.debug(f'Job with given ID ({id}) not found.')
+            return Response({'detail': f'Job with given ID({id}) not found.'}, status=status.HTTP_404_NOT_FOUND)
+
+        except Exception as e:
+
+            logger.error(e)
+            return Response(
+                {
+                    'status': 'error',
+                    'message': 'Error while fetching job.',
+                    'error': str(e)
+                }, status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+
+
+# Views for the result file of a Job
+@extend_schema(tags=['Jobs'])
+class JobViewResult(APIView):
+    @extend_schema(summary='Download the result file of a job by ID')
+    def get(self, request, id):
+        try:
+
+            job = Job.objects.get(id=id, status=Job.DONE)
+            if not job.result_file:
+                raise(Job.DoesNotExist)
+
+            return FileResponse(open(job.result_file, 'rb'), as_attachment=True)
+
+        except (Job.DoesNotExist, FileNotFoundError):
+
+            logger.debug(f'Result of job with given ID ({id}) not found.')
+            return Response({'detail': f'Result of job with given ID({id}) not found.'}, status=status.HTTP_404_NOT_FOUND)
+
+        except Exception as e:
+
+            logger.error(e)
+            return Response(
+                {
+                    'status': 'error',
+                    'message': 'Error while fetching job result.',
+                    'error': str(e)
+                }, status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+
+
+# -=-=- Stats Urls -=-=-
+
+# Views for release trends, read only from the rollups
+@extend_schema(tags=['Stats'])
+class ReleaseStatsView(APIView):
+    dimension = None
+
+    @extend_schema(
+        summary='Games released per year',
+        parameters=[
+            OpenApiParameter('from', int, description='First year'),
+            OpenApiParameter('to', int, description='Last year'),
+            OpenApiParameter('key', str, description='Only this genre, publisher ID or platform'),
+        ],
+    )
+    @coalesced
+    def get(self, request):
+        try:
+
+            rollups = ReleaseRollup.objects.filter(dimension=self.dimension)
+
+            if 'from' in request.query_params:
+                rollups = rollups.filter(year__gte=int(request.query_params['from']))
+            if 'to' in request.query_params:
+                rollups = rollups.filter(year__lte=int(request.query_params['to']))
+            if 'key' in request.query_params:
+                rollups = rollups.filter(key=request.query_params['key'])
+
+            rows = [
+                {'year': year, self.dimension: key, 'count': count}
+                for year, key, count in rollups.order_by('year', 'key').values_list('year', 'key', 'count')
+            ]
+
+            if self.dimension == ReleaseRollup.PUBLISHER:
+                for row in rows:
+                    row['publisher'] = int(row['publisher'])
+
+            elif self.dimension == ReleaseRollup.PLATFORM:
+                # Every game has exactly one genre, so the genre rollups give the yearly totals
+                totals = dict(
+                    ReleaseRollup.objects.filter(dimension=ReleaseRollup.GENRE, year__in={row['year'] for row in rows})
+                    .values('year').annotate(total=Sum('count')).values_list('year', 'total')
+                )
+                for row in rows:
+                    row['share'] = row['count'] / totals[row['year']] if totals.get(row['year']) else 0
+
+            return Response(rows)
+
+        except ValueError:
+
+            logger.debug('Invalid year range for stats.')
+            return Response({'error': 'from and to must be years.'}, status=status.HTTP_400_BAD_REQUEST)
+
+        except Exception as e:
+
+            logger.error(e)
+            return Response(
+                {
+                    'status': 'error',
+                    'message': 'Error while listing stats.',
+                    'error': str(e)
+                }, status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
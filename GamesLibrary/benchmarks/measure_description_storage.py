@@ -0,0 +1,177 @@
+"""
+Measure database size and listing latency before and after compressing Game.description.
+
+Fills a temporary SQLite database with --games games at the schema before the
+change (migration 0013, descriptions inline in the game row and in the stored
+documents), then applies 0014_compressed_descriptions and rebuilds the
+documents. For both states it reports the database size after VACUUM and the
+median time of the query behind GET /api/game/ (ids and stored documents, in
+id order); after the change it also times the endpoint itself, with and
+without ?include=description.
+
+Usage:
+    python benchmarks/measure_description_storage.py [--games 50000] [--words 150] [--runs 5]
+"""
+
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+
+BEFORE = ('Games', '0013_idempotency_keys')
+AFTER = ('Games', '0014_compressed_descriptions')
+
+WORDS = (
+    'explore build fight survive craft world dungeon ancient kingdom hero quest story puzzle city space '
+    'ship alien planet race track driver season team league strategy empire army battle tactical turn '
+    'real time open procedurally generated roguelike dark fantasy magic sword dragon forest island ocean '
+    'mystery detective clue horror zombie night light shadow retro pixel art soundtrack chapter friends '
+    'online multiplayer cooperative campaign levels secrets upgrade skills weapons vehicles farm village'
+).split()
+
+LIST_QUERY = (
+    'SELECT g.id, d.data FROM "Games_game" g '
+    'LEFT OUTER JOIN "Games_gamedocument" d ON d.game_id = g.id ORDER BY g.id'
+)
+
+
+def setup_django(database):
+    sys.path.insert(0, str(BASE_DIR))
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'gamesLibrary.settings')
+
+    from django.conf import settings
+
+    settings.DATABASES['default']['NAME'] = database
+    settings.METRICS_ENABLED = False
+
+    import django
+
+    django.setup()
+
+
+def migrate(target):
+    from django.db import connection
+    from django.db.migrations.executor import MigrationExecutor
+
+    executor = MigrationExecutor(connection)
+    start = time.perf_counter()
+    executor.migrate([target])
+    elapsed = time.perf_counter() - start
+
+    return executor.loader.project_state([target]).apps, elapsed
+
+
+def populate(apps, games, words):
+    # Old-schema rows and documents, as GameSerializer rendered them before the change
+    Game = apps.get_model('Games', 'Game')
+    GameDocument = apps.get_model('Games', 'GameDocument')
+    generator = random.Random(0)
+
+    Game.objects.bulk_create(
+        [
+            Game(
+                title=f'Game {n:06}',
+                description=' '.join(generator.choices(WORDS, k=words)).capitalize() + '.',
+                release_date=date(2000, 1, 1) + timedelta(days=n % 9000),
+                genre=('Action', 'Puzzle', 'Strategy', 'Racing')[n % 4],
+                onWindows=True,
+                onMac=n % 2 == 0,
+                onLinux=n % 3 == 0,
+            )
+            for n in range(games)
+        ],
+        batch_size=5000,
+    )
+
+    documents = []
+    for game in Game.objects.order_by('id').iterator(chunk_size=5000):
+        platforms = [name for name, enabled in (('Windows', game.onWindows), ('Mac', game.onMac),
+                                                ('Linux', game.onLinux)) if enabled]
+        data = {
+            'id': game.id, 'platforms': platforms, 'description': game.description, 'title': game.title,
+            'release_date': game.release_date.isoformat(), 'genre': game.genre, 'onWindows': game.onWindows,
+            'onMac': game.onMac, 'onLinux': game.onLinux, 'version': game.version, 'publisher': [],
+        }
+        documents.append(GameDocument(game_id=game.id, data=json.dumps(data, separators=(',', ':'))))
+    GameDocument.objects.bulk_create(documents, batch_size=5000)
+
+
+def database_size(database):
+    from django.db import connection
+
+    with connection.cursor() as cursor:
+        cursor.execute('VACUUM')
+    return os.path.getsize(database)
+
+
+def median_time(function, runs):
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings)
+
+
+def time_list_query(runs):
+    from django.db import connection
+
+    def run():
+        with connection.cursor() as cursor:
+            cursor.execute(LIST_QUERY)
+            cursor.fetchall()
+
+    return median_time(run, runs)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--games', type=int, default=50_000)
+    parser.add_argument('--words', type=int, default=150, help='Words per description.')
+    parser.add_argument('--runs', type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        database = str(Path(directory) / 'benchmark.sqlite3')
+        setup_django(database)
+
+        from django.core.management import call_command
+        from django.test import Client
+
+        from Games.documents import rebuild_game_documents
+
+        apps, _ = migrate(BEFORE)
+        populate(apps, args.games, args.words)
+        before_size = database_size(database)
+        before_query = time_list_query(args.runs)
+
+        _, migration_time = migrate(AFTER)
+        call_command('migrate', verbosity=0)
+        rebuild_game_documents()
+        after_size = database_size(database)
+        after_query = time_list_query(args.runs)
+
+        client = Client(SERVER_NAME='localhost')
+        endpoint = median_time(lambda: client.get('/api/game/'), args.runs)
+        endpoint_descriptions = median_time(lambda: client.get('/api/game/?include=description'), args.runs)
+
+    print(f'{args.games} games, {args.words} words per description')
+    print(f'database size   before {before_size / 2 ** 20:8.1f} MiB   after {after_size / 2 ** 20:8.1f} MiB')
+    print(f'list query      before {before_query * 1000:8.1f} ms    after {after_query * 1000:8.1f} ms')
+    print(f'GET /api/game/                                   {endpoint * 1000:8.1f} ms')
+    print(f'GET /api/game/?include=description               {endpoint_descriptions * 1000:8.1f} ms')
+    print(f'migration 0014                                   {migration_time:8.1f} s')
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,151 @@
+"""
+Measure peak memory of the game list endpoint, full vs streamed.
+
+Fills a temporary SQLite database with --games games (documents included),
+then, in a fresh interpreter per mode, requests /api/game/ and reads the whole
+body, reporting the Python heap peak (tracemalloc) and the growth of the
+process' max RSS during the request.
+
+Usage:
+    python benchmarks/measure_list_memory.py [--games 100000] [--chunk-size 2000]
+"""
+
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import date, timedelta
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+
+
+def setup_django(database):
+    sys.path.insert(0, str(BASE_DIR))
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'gamesLibrary.settings')
+
+    from django.conf import settings
+
+    settings.DATABASES['default']['NAME'] = database
+
+    import django
+
+    django.setup()
+
+
+def populate(database, games):
+    setup_django(database)
+
+    from django.core.management import call_command
+
+    from Games.documents import rebuild_game_documents
+    from Games.models import Game, GameDescription, Publisher
+
+    call_command('migrate', verbosity=0)
+
+    publishers = Publisher.objects.bulk_create(
+        [Publisher(name=f'Publisher {n}', location='Somewhere', website=f'http://publisher{n}.com') for n in range(50)]
+    )
+    Game.objects.bulk_create(
+        [
+            Game(
+                title=f'Game {n:06}',
+                release_date=date(2000, 1, 1) + timedelta(days=n % 9000),
+                genre=('Action', 'Puzzle', 'Strategy', 'Racing')[n % 4],
+                onWindows=True,
+                onMac=n % 2 == 0,
+                onLinux=n % 3 == 0,
+            )
+            for n in range(games)
+        ],
+        batch_size=5000,
+    )
+    description = GameDescription.compress('A fairly ordinary game description that is long enough to matter. ' * 3)
+    GameDescription.objects.bulk_create(
+        [GameDescription(game_id=id, data=description) for id in Game.objects.values_list('id', flat=True)],
+        batch_size=5000,
+    )
+    links = Game.publisher.through
+    links.objects.bulk_create(
+        [links(game_id=id, publisher_id=publishers[id % 50].id) for id in Game.objects.values_list('id', flat=True)],
+        batch_size=5000,
+    )
+    rebuild_game_documents()
+
+
+def measure(database, mode, chunk_size):
+    setup_django(database)
+
+    from django.test import Client
+    from django.test.utils import override_settings
+
+    client = Client(SERVER_NAME='localhost')
+    path = '/api/game/?stream=true' if mode == 'stream' else '/api/game/'
+
+    with override_settings(LIST_STREAM_CHUNK_SIZE=chunk_size):
+        # Imports and connects before measuring
+        client.get('/api/game/1')
+
+        rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        tracemalloc.start()
+        start = time.perf_counter()
+
+        response = client.get(path)
+        size = sum(len(chunk) for chunk in response.streaming_content) if response.streaming else len(response.content)
+
+        elapsed = time.perf_counter() - start
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        rss_growth = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - rss_before
+
+    print(json.dumps({'bytes': size, 'heap_peak': peak, 'rss_growth_kb': rss_growth, 'seconds': elapsed}))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--games', type=int, default=100_000)
+    parser.add_argument('--chunk-size', type=int, default=2000)
+    parser.add_argument('--populate', action='store_true', help=argparse.SUPPRESS)
+    parser.add_argument('--measure', choices=['full', 'stream'], help=argparse.SUPPRESS)
+    parser.add_argument('--database', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.populate:
+        populate(args.database, args.games)
+        return 0
+
+    if args.measure:
+        measure(args.database, args.measure, args.chunk_size)
+        return 0
+
+    with tempfile.TemporaryDirectory() as directory:
+        database = str(Path(directory) / 'benchmark.sqlite3')
+        subprocess.run(
+            [sys.executable, __file__, '--populate', '--database', database, '--games', str(args.games)],
+            cwd=BASE_DIR, check=True,
+        )
+
+        for mode in ('full', 'stream'):
+            output = subprocess.run(
+                [sys.executable, __file__, '--measure', mode, '--database', database,
+                 '--chunk-size', str(args.chunk_size)],
+                cwd=BASE_DIR, check=True, capture_output=True, text=True,
+            ).stdout
+            result = json.loads(output.strip().splitlines()[-1])
+            print(
+                f'{mode:<7} {result["bytes"] / 2 ** 20:7.1f} MiB body  '
+                f'heap peak {result["heap_peak"] / 2 ** 20:7.1f} MiB  '
+                f'max RSS +{result["rss_growth_kb"] / 1024:7.1f} MiB  '
+                f'{result["seconds"]:.2f} s'
+            )
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
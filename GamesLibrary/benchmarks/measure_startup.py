@@ -0,0 +1,94 @@
+"""
+Measure cold-start time of the project.
+
+Times, in fresh interpreters, the WSGI import (`import gamesLibrary.wsgi`),
+the first request through the URLconf and `manage.py check`, and optionally
+compares the medians against a stored baseline. Store the baseline with --save
+first; when the --baseline file does not exist yet, it is written instead of
+compared against.
+
+Usage:
+    python benchmarks/measure_startup.py [--runs 10] [--baseline startup.json] [--save] [--tolerance 0.2]
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+
+WSGI_IMPORT = (
+    'import time; start = time.perf_counter(); '
+    'import gamesLibrary.wsgi; '
+    'print(time.perf_counter() - start)'
+)
+
+FIRST_REQUEST = (
+    'import time; start = time.perf_counter(); '
+    'from gamesLibrary.wsgi import application; '
+    'from django.urls import resolve; resolve("/api/game/"); '
+    'print(time.perf_counter() - start)'
+)
+
+
+def time_snippet(code):
+    output = subprocess.run(
+        [sys.executable, '-c', code],
+        cwd=BASE_DIR, capture_output=True, text=True, check=True, env=os.environ.copy()
+    ).stdout
+    return float(output.strip().splitlines()[-1])
+
+
+def time_command(args):
+    start = time.perf_counter()
+    subprocess.run([sys.executable, *args], cwd=BASE_DIR, capture_output=True, check=True)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--runs', type=int, default=10)
+    parser.add_argument('--baseline', type=Path, default=None, help='JSON file with stored medians.')
+    parser.add_argument('--save', action='store_true', help='Write the measured medians to --baseline.')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='Allowed relative slowdown before failing.')
+    args = parser.parse_args()
+
+    measurements = {
+        'wsgi_import': lambda: time_snippet(WSGI_IMPORT),
+        'first_request_urlconf': lambda: time_snippet(FIRST_REQUEST),
+        'manage_check': lambda: time_command(['manage.py', 'check']),
+    }
+
+    results = {}
+    for name, measure in measurements.items():
+        samples = [measure() for _ in range(args.runs)]
+        results[name] = statistics.median(samples)
+        print(f'{name:<24} median {results[name] * 1000:8.1f} ms  (min {min(samples) * 1000:.1f} ms, {args.runs} runs)')
+
+    if args.baseline is None:
+        return 0
+
+    if args.save or not args.baseline.exists():
+        args.baseline.write_text(json.dumps(results, indent=2))
+        print(f'Baseline written to {args.baseline}')
+        return 0
+
+    baseline = json.loads(args.baseline.read_text())
+    regressions = [
+        name for name, value in results.items()
+        if name in baseline and value > baseline[name] * (1 + args.tolerance)
+    ]
+
+    for name in regressions:
+        print(f'REGRESSION {name}: {results[name] * 1000:.1f} ms vs baseline {baseline[name] * 1000:.1f} ms')
+
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
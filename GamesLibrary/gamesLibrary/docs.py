@@ -0,0 +1,145 @@
+import hashlib
+import threading
+from functools import cache
+from importlib import import_module
+from pathlib import Path
+
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseNotModified
+from django.utils.cache import patch_cache_control
+from django.views.decorators.http import require_safe
+
+# Views for the API documentation.
+#
+# drf_spectacular's views pull in the whole schema generator, so they are only
+# imported when a docs URL is actually hit (see API_DOCS_LAZY), and the schema
+# itself is served from the file written by `manage.py build_schema` when present.
+#
+# The views are annotated with the extend_schema and OpenApiParameter below
+# instead of drf_spectacular's: they only record their arguments, and the
+# SchemaGenerator in gamesLibrary/schema.py hands them to drf_spectacular before
+# the first schema is generated. drf_spectacular's own extend_schema resolves
+# the schema class (and imports drf_spectacular.openapi) as soon as a view
+# module is imported, which would put the schema generator back into startup.
+
+_annotations = []
+_annotations_lock = threading.Lock()
+_annotations_applied = False
+
+
+class OpenApiParameter:
+    # Arguments of a drf_spectacular.utils.OpenApiParameter, built when the annotations are applied
+    QUERY = 'query'
+    PATH = 'path'
+    HEADER = 'header'
+    COOKIE = 'cookie'
+
+    def __init__(self, *args, **kwargs):
+        self.args = args
+        self.kwargs = kwargs
+
+    def build(self):
+        from drf_spectacular.utils import OpenApiParameter
+
+        return OpenApiParameter(*self.args, **self.kwargs)
+
+
+def extend_schema(**kwargs):
+    # Records drf_spectacular's extend_schema for a view class or method, in decoration order
+
+    def decorator(target):
+        _annotations.append((target, kwargs))
+        return target
+
+    return decorator
+
+
+def apply_schema_annotations():
+    # Applies the recorded annotations once; methods come before their class, as with eager decorators
+    global _annotations_applied
+
+    with _annotations_lock:
+        if _annotations_applied:
+            return
+
+        from drf_spectacular.utils import extend_schema
+
+        for target, kwargs in _annotations:
+            if 'parameters' in kwargs:
+                kwargs = {
+                    **kwargs,
+                    'parameters': [
+                        parameter.build() if isinstance(parameter, OpenApiParameter) else parameter
+                        for parameter in kwargs['parameters']
+                    ],
+                }
+            extend_schema(**kwargs)(target)
+
+        _annotations_applied = True
+
+
+def lazy_view(dotted_path, **initkwargs):
+    # Imports the class based view on first request instead of at URLconf load
+
+    @cache
+    def load():
+        module_path, class_name = dotted_path.rsplit('.', 1)
+        view_class = getattr(import_module(module_path), class_name)
+        return view_class.as_view(**initkwargs)
+
+    def view(request, *args, **kwargs):
+        return load()(request, *args, **kwargs)
+
+    view.csrf_exempt = True
+    return view
+
+
+def docs_view(dotted_path, **initkwargs):
+    if getattr(settings, 'API_DOCS_LAZY', True):
+        return lazy_view(dotted_path, **initkwargs)
+
+    module_path, class_name = dotted_path.rsplit('.', 1)
+    return getattr(import_module(module_path), class_name).as_view(**initkwargs)
+
+
+_dynamic_schema_view = lazy_view('drf_spectacular.views.SpectacularAPIView')
+
+
+@cache
+def _read_schema_file(path, mtime_ns):
+    with open(path, 'rb') as schema_file:
+        content = schema_file.read()
+
+    return content, f'"{hashlib.sha256(content).hexdigest()[:32]}"'
+
+
+def _content_type(path):
+    if str(path).endswith('.json'):
+        return 'application/vnd.oai.openapi+json'
+    return 'application/vnd.oai.openapi'
+
+
+@require_safe
+def schema_view(request, *args, **kwargs):
+    path = getattr(settings, 'API_SCHEMA_FILE', None)
+    path = Path(path) if path else None
+
+    try:
+        mtime_ns = path.stat().st_mtime_ns if path else None
+    except OSError:
+        mtime_ns = None
+
+    if mtime_ns is None:
+        # No pre-generated schema: build it on the fly
+        return _dynamic_schema_view(request, *args, **kwargs)
+
+    content, etag = _read_schema_file(path, mtime_ns)
+
+    if request.headers.get('If-None-Match') == etag:
+        response = HttpResponseNotModified()
+    else:
+        response = HttpResponse(content, content_type=_content_type(path))
+
+    response['ETag'] = etag
+    patch_cache_control(response, public=True, max_age=settings.API_SCHEMA_CACHE_SECONDS)
+    return response
@@ -0,0 +1,13 @@
+from drf_spectacular.generators import SchemaGenerator as SpectacularSchemaGenerator
+
+from .docs import apply_schema_annotations
+
+# Schema generator for /api/schema/, the docs views and `manage.py spectacular`.
+# Only imported through SPECTACULAR_SETTINGS when a schema is generated.
+
+
+class SchemaGenerator(SpectacularSchemaGenerator):
+
+    def get_schema(self, *args, **kwargs):
+        apply_schema_annotations()
+        return super().get_schema(*args, **kwargs)
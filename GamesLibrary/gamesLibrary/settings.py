@@ -42,6 +42,7 @@ INSTALLED_APPS = [
     'drf_spectacular',
 ]
 
+# Imported by REST framework on first use, when a schema is generated
 REST_FRAMEWORK = {
     'DEFAULT_SCHEMA_CLASS': 'drf_spectacular.openapi.AutoSchema',
 }
@@ -50,8 +51,87 @@ SPECTACULAR_SETTINGS = {
     'TITLE': 'GamesLibraryAPI',
     'DESCRIPTION': 'API for storing and managing games.',
     'VERSION': '1.3',
+    # Applies the views' deferred annotations (gamesLibrary/docs.py) first
+    'DEFAULT_GENERATOR_CLASS': 'gamesLibrary.schema.SchemaGenerator',
 }
 
+# Pre-generated schema written by `manage.py build_schema` and served by /api/schema/
+API_SCHEMA_FILE = BASE_DIR / 'openapi-schema.yml'
+API_SCHEMA_CACHE_SECONDS = 3600
+
+# Import drf_spectacular's views only when a docs URL is first requested
+API_DOCS_LAZY = True
+
+# Maximum number of ids accepted by the game/batch and publisher/batch endpoints
+BATCH_MAX_IDS = 200
+
+# Maximum number of games changed by one POST to publisher/links/
+PUBLISHER_LINKS_MAX_GAMES = 10000
+
+# Build the in-process title suggest index in a background thread on first use
+SUGGEST_INDEX_ASYNC_BUILD = True
+
+# Memory-mapped catalog snapshot shared by all workers (`manage.py build_catalog_snapshot`).
+# When reads are enabled, catalog changes rebuild it after REBUILD_DELAY seconds, and until
+# then other clients read the catalog as it was (the writing client reads from the database).
+CATALOG_SNAPSHOT_PATH = BASE_DIR / 'catalog.snapshot'
+CATALOG_SNAPSHOT_READS = False
+CATALOG_SNAPSHOT_REBUILD_DELAY = 2.0
+
+# Background jobs run by `manage.py run_workers`
+JOBS_RESULT_DIR = BASE_DIR / 'job_results'
+JOBS_MAX_ATTEMPTS = 3
+JOBS_RETRY_DELAY = 30
+JOBS_POLL_INTERVAL = 1.0
+JOBS_STALE_AFTER = 600
+# Seconds between heartbeats of a running job; must stay well below JOBS_STALE_AFTER
+JOBS_HEARTBEAT_INTERVAL = 60
+
+# Optional hash-sharded storage for games: database aliases (declared in
+# DATABASES) holding the games, their publisher links and documents by id hash.
+# Publishers are replicated to every shard. Empty keeps everything in 'default'
+GAME_SHARDS = []
+
+# Single-flight coalescing of identical concurrent GET requests on the list views
+REQUEST_COALESCING = True
+# Seconds a request waits for an in-flight identical one before computing itself
+REQUEST_COALESCING_WAIT = 10.0
+# Also coalesce across processes through a lock in the cache backend (needs a shared cache)
+REQUEST_COALESCING_CACHE_LOCK = False
+REQUEST_COALESCING_RESULT_TTL = 5
+
+# Rows read per chunk by list views in streaming mode (?stream=true)
+LIST_STREAM_CHUNK_SIZE = 2000
+
+# Request metrics served at /metrics. Every worker writes its counters to a
+# memory-mapped file in METRICS_DIR and the endpoint sums all of them
+METRICS_ENABLED = True
+METRICS_DIR = BASE_DIR / 'metrics'
+
+# Idempotency-Key support on the create and update views: seconds a first
+# response is replayed for, seconds before an unfinished request with the same
+# key may be retried, and seconds between purges of expired keys in each process
+IDEMPOTENCY_KEY_TTL = 86400
+IDEMPOTENCY_LOCK_TIMEOUT = 60
+IDEMPOTENCY_PURGE_INTERVAL = 3600
+
+# zlib level for Game descriptions, which are stored compressed in their own table
+GAME_DESCRIPTION_COMPRESSION_LEVEL = 6
+
+# Server-Sent Events stream of catalog changes at /api/events (ASGI only).
+# Each process polls the CatalogEvent table every POLL_INTERVAL seconds and
+# keeps the last BUFFER events for reconnecting and slow subscribers; events
+# older than RETENTION seconds are purged. Events after a gap in the ids are
+# held back up to GAP_TIMEOUT seconds, until the commit filling it is visible
+EVENTS_POLL_INTERVAL = 0.5
+EVENTS_BUFFER = 1000
+EVENTS_HEARTBEAT = 15
+EVENTS_RETENTION = 3600
+EVENTS_GAP_TIMEOUT = 2.0
+
+# Known query plan findings per database vendor for `manage.py audit_queries`
+QUERY_AUDIT_BASELINE = BASE_DIR / 'query_audit_baseline.json'
+
 LOGGING = {
     "version": 1,
     "disable_existing_loggers": False,
@@ -90,6 +170,8 @@ LOGGING = {
 }
 
 MIDDLEWARE = [
+    'Games.metrics.MetricsMiddleware',
+    'Games.snapshot.SnapshotWriteMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -97,8 +179,13 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'Games.nplusone.NPlusOneMiddleware',
 ]
 
+# N+1 query detection per request: 'off', 'log' or 'raise'
+NPLUSONE_DETECTION = 'off'
+NPLUSONE_THRESHOLD = 5
+
 ROOT_URLCONF = 'gamesLibrary.urls'
 
 TEMPLATES = [
@@ -130,6 +217,8 @@ DATABASES = {
     }
 }
 
+DATABASE_ROUTERS = ['Games.sharding.GameShardRouter']
+
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
 
@@ -1,7 +1,9 @@
 from django.contrib import admin
 from django.urls import path, include
 
-from drf_spectacular.views import SpectacularAPIView, SpectacularSwaggerView
+from Games.metrics import metrics_view
+
+from .docs import docs_view, schema_view
 
 # URL configuration for gamesLibrary project.
 
@@ -9,6 +11,8 @@ urlpatterns = [
     path('admin/', admin.site.urls),
     path('api/', include('Games.urls')),
 
-    path('api/schema/', SpectacularAPIView.as_view(), name='schema'),
-    path('api/docs/', SpectacularSwaggerView.as_view(url_name='schema'), name='swagger-ui'),
+    path('api/schema/', schema_view, name='schema'),
+    path('api/docs/', docs_view('drf_spectacular.views.SpectacularSwaggerView', url_name='schema'), name='swagger-ui'),
+
+    path('metrics', metrics_view, name='metrics'),
 ]